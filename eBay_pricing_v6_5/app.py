@@ -1,38 +1,16 @@
 
 from __future__ import annotations
-import os, asyncio, re
-from typing import List, Dict
-from flask import Flask, render_template, request
-from scraping import scrape_multi, detect_pack_qty
-from pricing import compute_suggestion, choose_and_suggest, tokens, jaccard, within_range
+import json, os, queue, time
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context, url_for
+from scraping import scrape_multi
+from decision import decide, filter_rows_by_upc, row_matches_upc  # noqa: F401  (re-exported for callers/tests)
+from runtime import get_runtime, runtime_stats, JOB_TIMEOUT_S
+from cache import get_cache
+from jobs import JobQueue, QueueFull
+import metrics, httpfetch
 
 app = Flask(__name__)
 
-TITLE_SIM_THRESHOLD = 0.75  # title guard for exact UPC matches
-
-PRICE_CLUSTER_WINDOW = 8.0   # dollars spanned by the densest cluster window (try 6–10)
-AMAZON_RANGE_PCT = 0.25      # eBay listing must be within 25% of Amazon
-
-
-def _norm_digits(x: str) -> str:
-    return re.sub(r"[^0-9]", "", x or "")
-
-
-def row_matches_upc(r: Dict, user_code: str) -> bool:
-    if not user_code:
-        return True
-    for k in ("upc", "code", "barcode", "item_upc"):
-        v = r.get(k)
-        if v:
-            rc = _norm_digits(str(v))
-            if rc and rc != user_code:
-                return False
-    return True
-
-
-def filter_rows_by_upc(rows: List[Dict], user_code: str) -> List[Dict]:
-    return [r for r in rows if row_matches_upc(r, user_code)]
-
 def default_ctx():
     return {
         "form": {
@@ -46,6 +24,7 @@ def default_ctx():
             "pages": "1",
             "retries": "3",
             "attempts": "6",
+            "refresh": "",
         },
         "error": None,
         "amazon": None,
@@ -64,32 +43,107 @@ def default_ctx():
 def clear():
     return render_template("index.html", **default_ctx())
 
+def _flag(v) -> bool:
+    """Checkbox / query-string / JSON boolean: "0", "false", "" and missing are all false."""
+    return str(v).strip().lower() in ("1", "true", "yes", "on")
+
+def _number(src, key: str, cast, default):
+    v = src.get(key)
+    if v is None or v == "":
+        return default
+    try:
+        return cast(v)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a number, got {v!r}.") from None
+
+def read_params(src) -> dict:
+    """
+    Lookup parameters from a form (POST /), query string (GET /stream) or
+    JSON body (POST /api/jobs).  Raises ValueError, with a message for the
+    user, when the body is not an object or a numeric field is not a number.
+    """
+    if not isinstance(src, dict):   # form and query-string MultiDicts are dicts too
+        raise ValueError("Expected an object with the lookup fields.")
+    return {
+        "code": str(src.get("code") or "").strip(),
+        "title": str(src.get("title") or "").strip() or None,
+        "req": str(src.get("req") or "").strip(),
+        "condition": str(src.get("condition") or "new").strip().lower(),
+        "iqr_mult": _number(src, "iqr_mult", float, 1.5),
+        "min_price": _number(src, "min_price", float, None),
+        "max_price": _number(src, "max_price", float, None),
+        "pages": max(1, _number(src, "pages", int, 1)),
+        "retries": max(1, _number(src, "retries", int, 3)),
+        "attempts": max(1, _number(src, "attempts", int, 6)),
+        "refresh": _flag(src.get("refresh")),
+    }
+
+def scrape_job(p: dict, on_event=None):
+    """Job for the shared runtime (see runtime.py) running scrape_multi with the request's parameters."""
+    return lambda pool: scrape_multi(
+        p["code"], p["title"],
+        condition=p["condition"],
+        prefer_amazon_first=True,
+        use_amazon=True,
+        pages=p["pages"],
+        retries=p["retries"],
+        attempts=p["attempts"],
+        visible=False,
+        pool=pool,
+        cache=get_cache(),
+        force_refresh=p["refresh"],
+        on_event=on_event,
+    )
+
+def result_ctx(data: dict, code: str) -> dict:
+    """Template fields for one scrape_multi() result (also the JSON sent by /stream)."""
+    with metrics.span("app.decide"):
+        res = data.get("decision") or decide(data, code)   # "ebay" progress events carry their incremental decision
+    amazon = res["amazon"]
+    amz_total = res["amazon_total"]
+    raw_rows = res["raw_rows"]
+    comp_rows = res["comp_rows"]
+    pick = res["pick"]
+
+    out = {"amazon": amazon, "amazon_note": None, "results": comp_rows, "results_raw": raw_rows,
+           "counts": {"raw": len(raw_rows), "used": len(comp_rows)},
+           "suggestion": None, "suggestion_source": None, "reference": None, "error": None}
+    if amazon and amz_total is not None:
+        pack_msg = f" (pack qty detected: {amazon.get('pack_qty')})" if amazon and amazon.get("pack_qty") else ""
+        out["amazon_note"] = "Amazon price from product page; if missing, pulled from Offer Listings (New)" + pack_msg + "."
+
+    if pick["suggested"] is not None:
+        out["suggestion"] = f"{pick['suggested']:.2f}"
+        out["suggestion_source"] = pick["source"]
+        out["reference"] = res["reference"]
+    else:
+        out["error"] = "Not enough clean data to suggest a price."
+    return out
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     ctx = default_ctx()
     if request.method == "POST":
-        code = (request.form.get("code") or "").strip()
-        title = (request.form.get("title") or "").strip() or None
-        req_tokens = (request.form.get("req") or "").strip()
-        condition = (request.form.get("condition") or "new").strip().lower()
-        iqr_mult = float(request.form.get("iqr_mult") or 1.5)
-        min_price = float(request.form.get("min_price")) if request.form.get("min_price") else None
-        max_price = float(request.form.get("max_price")) if request.form.get("max_price") else None
-        pages = max(1, int(request.form.get("pages") or 1))
-        retries = max(1, int(request.form.get("retries") or 3))
-        attempts = max(1, int(request.form.get("attempts") or 6))
+        try:
+            p = read_params(request.form)
+        except ValueError as e:
+            ctx["form"].update({k: v for k, v in request.form.items() if k in ctx["form"]})
+            ctx["error"] = str(e)
+            return render_template("index.html", **ctx), 400
+        code = p["code"]
 
         ctx["form"].update({
             "code": code or "",
-            "title": title or "",
-            "req": req_tokens,
-            "condition": condition,
-            "iqr_mult": str(iqr_mult),
-            "min_price": "" if min_price is None else str(min_price),
-            "max_price": "" if max_price is None else str(max_price),
-            "pages": str(pages),
-            "retries": str(retries),
-            "attempts": str(attempts),
+            "title": p["title"] or "",
+            "req": p["req"],
+            "condition": p["condition"],
+            "iqr_mult": str(p["iqr_mult"]),
+            "min_price": "" if p["min_price"] is None else str(p["min_price"]),
+            "max_price": "" if p["max_price"] is None else str(p["max_price"]),
+            "pages": str(p["pages"]),
+            "retries": str(p["retries"]),
+            "attempts": str(p["attempts"]),
+            "refresh": "1" if p["refresh"] else "",
         })
 
         if not code:
@@ -97,123 +151,159 @@ def index():
             return render_template("index.html", **ctx)
 
         try:
-            data = asyncio.run(scrape_multi(
-                code, title,
-                condition=condition,
-                prefer_amazon_first=True,
-                use_amazon=True,
-                pages=pages,
-                retries=retries,
-                attempts=attempts,
-                visible=False,
-            ))
+            # runs on the shared background loop / browser pool (see runtime.py)
+            data = get_runtime().run(scrape_job(p))
         except Exception as e:
             ctx["error"] = f"Search failed: {e}"
             return render_template("index.html", **ctx)
 
-        raw_rows = data.get("rows", [])
-        amazon = data.get("amazon")
-
-        rows = data.get("filtered_rows") or raw_rows
-        user_code = _norm_digits(code)
-        comp_rows = filter_rows_by_upc(rows, user_code)
-
-        # ---------- Amazon context ----------
-        amz_title = (amazon.get("title") if amazon else "") or ""
-        amz_toks = tokens(amz_title)
-
-        # ---------- Exact-UPC-first with title guard (>= 0.75) ----------
-        ebay_exact_row = None
-        ebay_exact_total = None
-        exacts: List[Dict] = []
-
-        if comp_rows and user_code:
-            def row_code_match(r):
-                for k in ("upc","code","barcode","item_upc"):
-                    v = r.get(k)
-                    if v and _norm_digits(str(v)) == user_code:
-                        return True
-                if r.get("has_code") and r.get("code"):
-                    return _norm_digits(str(r["code"])) == user_code
-                return False
-
-            def sim_ok_title(r):
-                if not amz_toks:
-                    return True
-                s = jaccard(amz_toks, tokens(r.get("title") or ""))
-                return s >= TITLE_SIM_THRESHOLD
-
-            exacts = [r for r in comp_rows if row_code_match(r) and r.get("total") is not None and sim_ok_title(r)]
-            if exacts:
-                ebay_exact_row = min(exacts, key=lambda r: r["total"])
-                ebay_exact_total = float(ebay_exact_row["total"])
-
-        # ---------- If no exact code+title match, use absolute-low from comp_rows ----------
-        ebay_abs_row = None
-        ebay_abs_total = None
-        if not exacts and comp_rows:
-            valids = [r for r in comp_rows if r.get("total") is not None]
-            pool = []
-
-            if valids:
-                if amz_toks:
-                    strict = [r for r in valids if jaccard(amz_toks, tokens(r.get("title") or "")) >= TITLE_SIM_THRESHOLD]
-                    if strict:
-                        pool = strict
-                    else:
-                        relaxed = [r for r in valids if jaccard(amz_toks, tokens(r.get("title") or "")) >= 0.45]
-                        pool = relaxed if relaxed else valids
-                else:
-                    pool = valids
-
-            if pool:
-                # <-- CLUSTER here: pick the lowest inside the densest window
-                best_total, best_row, used_rows = compute_suggestion(
-                    pool,
-                    method="mode",               # densest price window
-                    window=PRICE_CLUSTER_WINDOW, # tighten/loosen cluster span
-                    # min_price=None, max_price=None   # you can add hard caps if you want
-                )
-                if best_row:
-                    ebay_abs_row = best_row
-                    ebay_abs_total = float(best_row["total"])
-
-
-        # Amazon total
-        amz_total = float(amazon["total"]) if (amazon and amazon.get("total") is not None) else None
-
-        # Prefer exact eBay if available
-        ebay_to_use = ebay_exact_total if ebay_exact_total is not None else ebay_abs_total
-        ebay_row_ref = ebay_exact_row if ebay_exact_row is not None else ebay_abs_row
-
-        if amz_total is not None and ebay_to_use is not None and not within_range(ebay_to_use, amz_total, pct=AMAZON_RANGE_PCT):
-            ebay_to_use = None
-            ebay_row_ref = None
-
-        pick = choose_and_suggest(amz_total, ebay_to_use)
-
-        ctx["amazon"] = amazon
-        if amazon and amz_total is not None:
-            pack_msg = f" (pack qty detected: {amazon.get('pack_qty')})" if amazon and amazon.get("pack_qty") else ""
-            ctx["amazon_note"] = "Amazon price from product page; if missing, pulled from Offer Listings (New)" + pack_msg + "."
-
-        ctx["results"] = comp_rows
-        ctx["results_raw"] = raw_rows
-        ctx["counts"] = {"raw": len(raw_rows), "used": len(comp_rows)}
-
-        if pick["suggested"] is not None:
-            ctx["suggestion"] = f"{pick['suggested']:.2f}"
-            ctx["suggestion_source"] = pick["source"]
-            if pick["source"] == "Amazon":
-                ctx["reference"] = amazon.get("url") if amazon else None
-            else:
-                ctx["reference"] = ebay_row_ref.get("url") if ebay_row_ref else None
-        else:
-            ctx["error"] = "Not enough clean data to suggest a price."
-
+        ctx.update(result_ctx(data, code))
         return render_template("index.html", **ctx)
 
     return render_template("index.html", **ctx)
 
+def lookup_events(p: dict):
+    """
+    Run one lookup on the shared runtime and yield its progress as
+    (kind, payload): "amazon", then "ebay" with a result_ctx() snapshot per
+    batch, then ("done", result_ctx).  Raw payloads are queued from the
+    runtime loop and decided here, on the consumer's thread.  Raises
+    TimeoutError after JOB_TIMEOUT_S, or the scrape's own error; the scrape
+    is cancelled if the consumer stops early.
+    """
+    code = p["code"]
+    events: "queue.Queue" = queue.Queue()
+    fut = get_runtime().submit(scrape_job(p, on_event=lambda kind, payload: events.put((kind, payload))))
+    deadline = time.monotonic() + JOB_TIMEOUT_S
+    try:
+        while not (fut.done() and events.empty()):
+            if time.monotonic() > deadline:
+                raise TimeoutError("timed out")
+            try:
+                kind, payload = events.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            yield kind, ({"amazon": payload.get("amazon")} if kind == "amazon" else result_ctx(payload, code))
+        yield "done", result_ctx(fut.result(), code)
+    finally:
+        if not fut.done():
+            fut.cancel()   # timed out, or the client went away
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.route("/stream", methods=["GET"])
+def stream():
+    """
+    Server-sent events for one lookup (same parameters as the form, as a
+    query string): "amazon" as soon as the Amazon side is settled, "ebay"
+    with the provisional table/suggestion after each eBay batch, then
+    "done" with the final result (or "error").
+    """
+    try:
+        p = read_params(request.args)
+        error = None if p["code"] else "Enter a product code, ASIN, or Amazon URL."
+    except ValueError as e:
+        p, error = None, str(e)
+
+    def gen():
+        if error:
+            yield sse("error", {"error": error})
+            return
+        try:
+            for kind, payload in lookup_events(p):
+                yield sse(kind, payload)
+        except Exception as e:
+            yield sse("error", {"error": f"Search failed: {e}"})
+
+    return Response(stream_with_context(gen()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+JOB_RETRY_AFTER_S = 5   # Retry-After sent with 429 when the job queue is full
+JOB_MAX_WAIT_S = 60     # cap on ?wait= long-polling
+
+_jobs = None
+
+def run_pricing_job(p: dict, on_event) -> dict:
+    """JobQueue runner: lookup_events() on the job's thread, progress to on_event, the final result_ctx returned."""
+    for kind, payload in lookup_events(p):
+        if kind == "done":
+            return payload
+        on_event(kind, payload)
+
+def get_jobs() -> JobQueue:
+    global _jobs
+    if _jobs is None:
+        _jobs = JobQueue(run_pricing_job).start()
+    return _jobs
+
+@app.route("/api/jobs", methods=["POST"])
+def api_submit_job():
+    """Queue a lookup (JSON body or form, same fields as the form); 202 with the job id, 429 when the queue is full."""
+    try:
+        p = read_params(request.get_json(silent=True) or request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not p["code"]:
+        return jsonify({"error": "Enter a product code, ASIN, or Amazon URL."}), 400
+    try:
+        job = get_jobs().submit(p)
+    except QueueFull as e:
+        resp = jsonify({"error": f"Too many pricing jobs queued ({e}); retry later."})
+        resp.headers["Retry-After"] = str(JOB_RETRY_AFTER_S)
+        return resp, 429
+    body = job.to_dict()
+    body.update(poll=url_for("api_job", job_id=job.id), events=url_for("api_job_events", job_id=job.id))
+    return jsonify(body), 202
+
+@app.route("/api/jobs", methods=["GET"])
+def api_jobs_stats():
+    return jsonify(get_jobs().stats())
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job(job_id):
+    """Job status/result; `?wait=N` long-polls up to N seconds for it to finish."""
+    jobs = get_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    try:
+        wait = min(float(request.args.get("wait") or 0), JOB_MAX_WAIT_S)
+    except ValueError:
+        return jsonify({"error": f"wait must be a number of seconds, got {request.args['wait']!r}."}), 400
+    if wait > 0:
+        jobs.wait(job, wait)
+    return jsonify(job.to_dict())
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def api_job_events(job_id):
+    """Server-sent events for a job: the /stream events, then "done"/"error" with the job JSON."""
+    jobs = get_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+
+    def gen():
+        for kind, payload in jobs.follow(job, timeout=15.0):
+            if kind is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield sse(kind, payload)
+
+    return Response(stream_with_context(gen()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/metrics", methods=["GET"])
+def metrics_view():
+    """Per-stage latency histograms (ms) plus runtime/pool, cache, job-queue and HTTP fast-path stats."""
+    return jsonify({
+        "stages": metrics.snapshot(),
+        "runtime": runtime_stats(),
+        "cache": get_cache().stats(),
+        "jobs": _jobs.stats() if _jobs is not None else None,
+        "http": httpfetch.stats(),
+    })
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT","5000")), debug=False)
+    get_runtime()  # launch Playwright + browser once, up front
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT","5000")), debug=False, threaded=True)
@@ -0,0 +1,321 @@
+
+"""
+Batch pricing: stream UPCs/ASINs from a CSV or JSONL file through the same
+scrape + decision pipeline the web form uses.
+
+    python batch.py inventory.csv -o priced.jsonl --workers 4
+
+CSV input takes the code from a `code`/`upc`/`asin`/`ean`/`barcode` column
+(else the first column, header row optional) and may have a `title` column;
+JSONL lines are objects with `code` and optional `title`.  Scraped items
+are priced a chunk at a time by the columnar engine (engine.py) and appended
+to the output (CSV when it ends in .csv, else JSONL) as each chunk finishes.
+Finished input lines are recorded in `<output>.ckpt`, so re-running the same
+command resumes where it stopped; lines that failed with an error are not
+recorded and are retried on resume, and their earlier error records are
+dropped from the output first so each line appears once.
+"""
+from __future__ import annotations
+import argparse, asyncio, csv, json, os, statistics as stats, sys, time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from scraping import scrape_multi
+from engine import RowBatch, decide_batch
+import httpfetch
+
+DEFAULT_WORKERS = 4
+DECIDE_CHUNK = 16   # scraped items priced together in one decide_batch() call
+DECIDE_MAX_WAIT_S = 2.0   # ...but a scraped item never waits longer than this to be written
+CODE_COLUMNS = ("code", "upc", "asin", "ean", "barcode")
+
+OUTPUT_FIELDS = [
+    "line", "code", "title", "suggested", "source", "competitor_price",
+    "amazon_price", "amazon_asin", "amazon_title", "ebay_total", "reference",
+    "rows", "cache", "error", "elapsed_s",
+]
+
+
+def read_codes(path: str) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """Yield (line_no, code, title) lazily from a CSV or JSONL file."""
+    if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                obj = json.loads(line)
+                code = str(obj.get("code") or "").strip()
+                if code:
+                    yield n, code, (obj.get("title") or None)
+        return
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        lower = [h.strip().lower() for h in header]
+        named = [c for c in CODE_COLUMNS if c in lower]
+        ti = lower.index("title") if "title" in lower else None
+        if named:
+            ci, start = lower.index(named[0]), 2
+        elif header and any(ch.isdigit() for ch in header[0]):
+            # no header row: first column is the code
+            ci, ti, start = 0, None, 1
+            yield 1, header[0].strip(), None
+        else:
+            ci, start = 0, 2
+        for n, rec in enumerate(reader, start):
+            if len(rec) <= ci:
+                continue
+            code = rec[ci].strip()
+            if not code:
+                continue
+            title = rec[ti].strip() if ti is not None and len(rec) > ti and rec[ti].strip() else None
+            yield n, code, title
+
+
+def load_checkpoint(path: str) -> Set[int]:
+    done: Set[int] = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                head = line.split("\t", 1)[0].strip()
+                if head.isdigit():
+                    done.add(int(head))
+    return done
+
+
+def drop_unfinished(output_path: str, done: Set[int]):
+    """Rewrite `output_path` keeping only records whose line is in `done` (stale errors, half-written items)."""
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return
+    tmp = output_path + ".tmp"
+    with open(output_path, newline="", encoding="utf-8") as src, open(tmp, "w", newline="", encoding="utf-8") as dst:
+        if output_path.lower().endswith(".csv"):
+            w = csv.DictWriter(dst, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(r for r in csv.DictReader(src) if str(r.get("line") or "").isdigit() and int(r["line"]) in done)
+        else:
+            for line in src:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue   # blank, or half-written when the last run died
+                if isinstance(rec, dict) and rec.get("line") in done:
+                    dst.write(line if line.endswith("\n") else line + "\n")
+    os.replace(tmp, output_path)
+
+
+class ResultWriter:
+    """Append-only CSV/JSONL writer that flushes every record."""
+
+    def __init__(self, path: str):
+        self.csv = path.lower().endswith(".csv")
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, "a", newline="", encoding="utf-8")
+        self.w = None
+        if self.csv:
+            self.w = csv.DictWriter(self.f, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+            if new:
+                self.w.writeheader()
+
+    def write(self, rec: Dict):
+        if self.w is not None:
+            self.w.writerow(rec)
+        else:
+            self.f.write(json.dumps(rec) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def price_records(items: List[Tuple[int, str, Optional[str], Dict]]) -> List[Dict]:
+    """Output records for (line, code, title, scrape_multi() result) items, decided together by engine.decide_batch."""
+    picks = decide_batch(RowBatch.from_items([(data, code) for _, code, _, data in items]))
+    recs = []
+    for (line, code, title, data), pick in zip(items, picks):
+        amazon = data.get("amazon") or {}
+        recs.append({
+            "line": line,
+            "code": code,
+            "title": title,
+            "suggested": pick["suggested"],
+            "source": pick["source"],
+            "competitor_price": pick["competitor_price"],
+            "amazon_price": pick["amazon_total"],
+            "amazon_asin": amazon.get("asin"),
+            "amazon_title": amazon.get("title"),
+            "ebay_total": pick["ebay_total"],
+            "reference": pick["reference"],
+            "rows": pick["n_comp_rows"],
+            "cache": ((data.get("meta") or {}).get("cache") or {}).get("ebay"),
+            "error": None if pick["suggested"] is not None else "Not enough clean data to suggest a price.",
+        })
+    return recs
+
+
+def price_record(line: int, code: str, title: Optional[str], data: Dict) -> Dict:
+    return price_records([(line, code, title, data)])[0]
+
+
+async def run_batch(input_path: str, output_path: str, workers: int = DEFAULT_WORKERS,
+                    checkpoint_path: Optional[str] = None, scrape=None, pool=None, cache=None,
+                    chunk: int = DECIDE_CHUNK, **scrape_kwargs) -> Dict:
+    """
+    Price every code in `input_path` with `workers` lookups in flight.
+
+    Scraped items are priced together through the columnar engine
+    (engine.decide_batch): up to `chunk` at a time, but as soon as no other
+    scrape is in flight or the oldest has waited DECIDE_MAX_WAIT_S, and
+    whatever is left when the run stops or is interrupted.  Each record is
+    written and checkpointed as soon as its chunk is decided.
+    `scrape` defaults to scrape_multi with `pool`/`cache`; when no pool is
+    given one BrowserPool is started for the whole run.  Returns run stats.
+    """
+    if scrape is None and pool is None:
+        from playwright.async_api import async_playwright
+        from browser_pool import BrowserPool
+        from routing import policy_from_env
+        async with async_playwright() as play:
+            bp = BrowserPool(play, size=max(workers, 1) * 2, route_policy=policy_from_env())
+            try:
+                return await run_batch(input_path, output_path, workers, checkpoint_path, scrape, bp, cache, chunk, **scrape_kwargs)
+            finally:
+                await bp.close()
+                await httpfetch.aclose()
+    if scrape is None:
+        async def scrape(code, title):
+            return await scrape_multi(code, title, pool=pool, cache=cache, **scrape_kwargs)
+
+    checkpoint_path = checkpoint_path or output_path + ".ckpt"
+    done = load_checkpoint(checkpoint_path)
+    if os.path.exists(checkpoint_path):
+        drop_unfinished(output_path, done)
+    writer = ResultWriter(output_path)
+    ckpt = open(checkpoint_path, "a", encoding="utf-8")
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, workers) * 2)
+    latencies: List[float] = []
+    counts = {"ok": 0, "no_price": 0, "errors": 0, "skipped": 0}
+    t_start = time.perf_counter()
+
+    pending: List[Tuple[int, str, Optional[str], Dict, float]] = []
+    in_flight = [0]          # scrapes currently running
+    oldest = [0.0]           # perf_counter() when the oldest pending item finished scraping
+
+    def finish(rec: Dict, elapsed_s: float, failed: bool):
+        rec["elapsed_s"] = elapsed_s
+        latencies.append(elapsed_s)
+        writer.write(rec)
+        if failed:
+            counts["errors"] += 1
+        else:
+            counts["ok" if rec["suggested"] is not None else "no_price"] += 1
+            ckpt.write(f"{rec['line']}\t{rec['code']}\n")
+            ckpt.flush()
+
+    def flush():
+        if not pending:
+            return
+        items, elapsed = [p[:4] for p in pending], [p[4] for p in pending]
+        pending.clear()
+        try:
+            recs = [(rec, False) for rec in price_records(items)]
+        except Exception:
+            recs = []   # price one by one so a bad item only fails itself
+            for line, code, title, data in items:
+                try:
+                    recs.append((price_record(line, code, title, data), False))
+                except Exception as e:
+                    recs.append(({"line": line, "code": code, "title": title, "error": f"Search failed: {e}"}, True))
+        for (rec, failed), el in zip(recs, elapsed):
+            finish(rec, el, failed)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            line, code, title = item
+            t0 = time.perf_counter()
+            in_flight[0] += 1
+            try:
+                data = await scrape(code, title)
+            except Exception as e:
+                in_flight[0] -= 1
+                finish({"line": line, "code": code, "title": title, "error": f"Search failed: {e}"},
+                       round(time.perf_counter() - t0, 3), failed=True)
+            else:
+                in_flight[0] -= 1
+                now = time.perf_counter()
+                if not pending:
+                    oldest[0] = now
+                pending.append((line, code, title, data, round(now - t0, 3)))
+                if len(pending) >= max(1, chunk) or in_flight[0] == 0 or now - oldest[0] >= DECIDE_MAX_WAIT_S:
+                    flush()
+            queue.task_done()
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(max(1, workers))]
+    try:
+        for line, code, title in read_codes(input_path):
+            if line in done:
+                counts["skipped"] += 1
+                continue
+            await queue.put((line, code, title))
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        flush()   # also on errors / Ctrl-C: finished scrapes are written and checkpointed, not lost
+        writer.close()
+        ckpt.close()
+
+    elapsed = time.perf_counter() - t_start
+    processed = counts["ok"] + counts["no_price"] + counts["errors"]
+    lat = sorted(latencies)
+    return {
+        **counts,
+        "processed": processed,
+        "elapsed_s": round(elapsed, 3),
+        "items_per_min": round(processed / elapsed * 60.0, 2) if elapsed > 0 else 0.0,
+        "latency_avg_s": round(stats.mean(lat), 3) if lat else None,
+        "latency_p50_s": round(lat[len(lat) // 2], 3) if lat else None,
+        "latency_p95_s": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 3) if lat else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Price a CSV/JSONL file of UPCs/ASINs.")
+    ap.add_argument("input", help="CSV (code[,title]) or JSONL ({\"code\": ..., \"title\": ...})")
+    ap.add_argument("-o", "--output", required=True, help="results file (.csv or .jsonl)")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    ap.add_argument("--checkpoint", default=None, help="progress file (default: <output>.ckpt)")
+    ap.add_argument("--chunk", type=int, default=DECIDE_CHUNK, help="items priced together per decision batch")
+    ap.add_argument("--condition", default="new", choices=["new", "all"])
+    ap.add_argument("--pages", type=int, default=1)
+    ap.add_argument("--retries", type=int, default=3)
+    ap.add_argument("--attempts", type=int, default=6)
+    ap.add_argument("--no-cache", action="store_true", help="do not read or write the result cache")
+    args = ap.parse_args(argv)
+
+    cache = None
+    if not args.no_cache:
+        from cache import get_cache
+        cache = get_cache()
+    st = asyncio.run(run_batch(
+        args.input, args.output, workers=args.workers, checkpoint_path=args.checkpoint, cache=cache, chunk=args.chunk,
+        condition=args.condition, pages=max(1, args.pages), retries=max(1, args.retries), attempts=max(1, args.attempts),
+    ))
+    print(f"processed {st['processed']} (priced {st['ok']}, no price {st['no_price']}, errors {st['errors']}, "
+          f"skipped from checkpoint {st['skipped']}) in {st['elapsed_s']:.1f}s "
+          f"= {st['items_per_min']:.1f} items/min; latency avg {st['latency_avg_s']}s "
+          f"p50 {st['latency_p50_s']}s p95 {st['latency_p95_s']}s", file=sys.stderr)
+    return 0 if st["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+
+"""
+Micro-benchmarks for the pure-Python pricing hot paths.
+
+Every case runs on synthetic inputs at 10, 1k and 100k rows (titles built
+from a realistic brand/product/attribute corpus, eBay-style totals, price
+strings and listing hrefs) and reports the best time per call and per row.
+
+    python bench.py                                  # run and print
+    python bench.py --save bench_baseline.json       # store a baseline
+    python bench.py --compare bench_baseline.json    # exit 1 if a case is > --threshold % slower
+    python bench.py --sizes 1000 --only compute_suggestion
+
+Baselines are only comparable on the same machine/Python; regressions must
+exceed both the percentage and NOISE_FLOOR_MS, so tiny cases don't flap.
+"""
+from __future__ import annotations
+import argparse, json, platform, random, sys, time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import tokenizer, packqty
+from tokenizer import tokens, jaccard
+from pricing import _densest_window, compute_suggestion
+from packqty import detect_pack_qty
+from scraping import parse_money, _unwrap_ebay_url
+
+SIZES = (10, 1000, 100000)
+REGRESSION_PCT = 25.0   # compare mode fails when a case is this much slower than baseline
+NOISE_FLOOR_MS = 0.02   # ...and at least this many ms slower
+MIN_RUN_S = 0.2         # keep repeating a case until this much time has been spent
+MAX_REPEATS = 50
+
+BRANDS = ["Brita", "PUR", "ZeroWater", "Acme", "Hamilton Beach", "Cuisinart", "OXO", "Rubbermaid", "3M Filtrete",
+          "Honeywell", "Philips", "Energizer", "Duracell", "Scotch-Brite", "Clorox", "Hefty", "Ziploc", "Lysol"]
+PRODUCTS = ["Water Filter", "Pitcher Replacement Filter", "Coffee Grinder", "Air Purifier Filter", "AA Batteries",
+            "Trash Bags", "Storage Bags", "Disinfecting Wipes", "Sponge", "Blender Jar", "LED Bulb", "Food Container Set"]
+ATTRS = ["Standard", "Elite", "Advanced", "BPA Free", "White", "Blue", "Stainless Steel", "Large", "13 Gallon",
+         "Lemon Scent", "Heavy Duty", "Max", "Original", "Replacement", "Genuine OEM", "Sealed", "NEW"]
+PACKS = ["", "", "", "2 Pack", "Pack of 6", "12ct", "3-pack", "Twin Pack", "24 Count", "x 4", "4pk"]
+
+
+def make_titles(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = [rng.choice(BRANDS), rng.choice(PRODUCTS)] + rng.sample(ATTRS, rng.randint(1, 4))
+        if rng.random() < 0.5:
+            parts.append(f"Model {rng.randint(100, 99999)}")
+        parts.append(rng.choice(PACKS))
+        rng.shuffle(parts[2:])
+        out.append(" ".join(p for p in parts if p))
+    return out
+
+
+def make_rows(n: int, seed: int = 0) -> List[Dict]:
+    """eBay-style rows: a few price clusters plus outliers, some without a total."""
+    rng = random.Random(seed)
+    titles = make_titles(n, seed)
+    centers = [rng.uniform(8, 60) for _ in range(3)]
+    rows = []
+    for i, title in enumerate(titles):
+        if rng.random() < 0.03:
+            total = None
+        elif rng.random() < 0.1:
+            total = round(rng.uniform(1, 400), 2)
+        else:
+            total = round(rng.choice(centers) * rng.uniform(0.85, 1.15), 2)
+        rows.append({"title": title, "total": total, "price": total, "shipping": 0.0,
+                     "url": f"https://www.ebay.com/itm/{200000000000 + i}", "source": "eBay"})
+    return rows
+
+
+def make_price_texts(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    forms = ["${:.2f}", "US ${:.2f}", "+${:.2f} shipping", "${:,.2f}", "${:.2f} to $99.99", "{:.2f}"]
+    return ["Free shipping" if rng.random() < 0.1 else rng.choice(forms).format(rng.uniform(0.5, 4000)) for _ in range(n)]
+
+
+def make_hrefs(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        item = rng.randint(10 ** 11, 10 ** 12 - 1)
+        kind = rng.random()
+        if kind < 0.6:
+            out.append(f"https://www.ebay.com/itm/{item}?hash=item{item:x}:g:AbCdEf&amdata=enc%3AAQ")
+        elif kind < 0.8:
+            out.append(f"https://www.ebay.com/itm/Some-Listing-Title-Words/{item}?_trksid=p2380057.m570.l1313")
+        elif kind < 0.95:
+            out.append(f"https://rover.ebay.com/rover/1/711-53200-19255-0/1?mpre=https%3A%2F%2Fwww.ebay.com%2Fitm%2F{item}&campid=5338")
+        else:
+            out.append(f"https://www.ebay.com/p/{item}?iid={item}")
+    return out
+
+
+# ---------- cases: name -> setup(n) returning the timed callable ----------
+def _tokens_cold(n):
+    titles = make_titles(n)
+    def run():
+        tokenizer._tokens.cache_clear()
+        for t in titles:
+            tokens(t)
+    return run
+
+
+def _tokens_warm(n):
+    titles = make_titles(n, seed=1)[:min(n, tokenizer.TOKEN_CACHE_SIZE)]
+    titles = (titles * (n // len(titles) + 1))[:n]
+    for t in titles:
+        tokens(t)
+    def run():
+        for t in titles:
+            tokens(t)
+    return run
+
+
+def _jaccard(n):
+    ref = tokens(make_titles(1, seed=2)[0])
+    sets = [tokens(t) for t in make_titles(n, seed=3)]
+    def run():
+        for s in sets:
+            jaccard(ref, s)
+    return run
+
+
+def _densest(n):
+    totals = [r["total"] for r in make_rows(n) if r["total"] is not None]
+    return lambda: _densest_window(totals, width=8.0)
+
+
+def _suggestion(method):
+    def setup(n):
+        rows = make_rows(n)
+        return lambda: compute_suggestion(rows, method=method, window=8.0)
+    return setup
+
+
+def _pack_qty(n):
+    titles = make_titles(n, seed=4)
+    def run():
+        packqty._detect.cache_clear()
+        for t in titles:
+            detect_pack_qty(t)
+    return run
+
+
+def _parse_money(n):
+    texts = make_price_texts(n)
+    def run():
+        for t in texts:
+            parse_money(t)
+    return run
+
+
+def _unwrap(n):
+    hrefs = make_hrefs(n)
+    def run():
+        for h in hrefs:
+            _unwrap_ebay_url(h)
+    return run
+
+
+CASES: Dict[str, Callable[[int], Callable[[], object]]] = {
+    "tokens.cold": _tokens_cold,
+    "tokens.warm": _tokens_warm,
+    "jaccard": _jaccard,
+    "_densest_window": _densest,
+    "compute_suggestion.mode": _suggestion("mode"),
+    "compute_suggestion.mad": _suggestion("mad"),
+    "compute_suggestion.iqr": _suggestion("iqr"),
+    "detect_pack_qty": _pack_qty,
+    "parse_money": _parse_money,
+    "_unwrap_ebay_url": _unwrap,
+}
+
+
+def time_call(fn: Callable[[], object], min_run_s: float = MIN_RUN_S, max_repeats: int = MAX_REPEATS) -> Tuple[float, int]:
+    """(best ms per call, repeats): at least 3 calls, more until min_run_s has been spent."""
+    best, spent, repeats = float("inf"), 0.0, 0
+    while repeats < 3 or (spent < min_run_s and repeats < max_repeats):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best, spent, repeats = min(best, dt), spent + dt, repeats + 1
+    return best * 1000.0, repeats
+
+
+def run_suite(sizes=SIZES, only: Optional[str] = None, min_run_s: float = MIN_RUN_S, progress=None) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    for name, setup in CASES.items():
+        if only and only not in name:
+            continue
+        for n in sizes:
+            ms, repeats = time_call(setup(n), min_run_s=min_run_s)
+            key = f"{name}@{n}"
+            results[key] = {"ms": round(ms, 4), "us_per_row": round(ms * 1000.0 / n, 4), "repeats": repeats}
+            if progress:
+                progress(key, results[key])
+    return results
+
+
+def compare(baseline: Dict[str, Dict], current: Dict[str, Dict], pct: float = REGRESSION_PCT,
+            floor_ms: float = NOISE_FLOOR_MS) -> List[Dict]:
+    """Cases present in both runs that got slower than baseline by more than pct % and floor_ms."""
+    out = []
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if not base or not base.get("ms"):
+            continue
+        change = (cur["ms"] - base["ms"]) / base["ms"] * 100.0
+        if change > pct and cur["ms"] - base["ms"] > floor_ms:
+            out.append({"case": key, "baseline_ms": base["ms"], "ms": cur["ms"], "change_pct": round(change, 1)})
+    return out
+
+
+def _meta() -> Dict:
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmarks for the pricing hot paths.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    ap.add_argument("--only", help="run cases whose name contains this")
+    ap.add_argument("--min-time", type=float, default=MIN_RUN_S, help="seconds to spend per case/size")
+    ap.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    ap.add_argument("--compare", metavar="PATH", help="compare against a saved baseline; exit 1 on regression")
+    ap.add_argument("--threshold", type=float, default=REGRESSION_PCT, help="allowed slowdown in percent")
+    ap.add_argument("--floor-ms", type=float, default=NOISE_FLOOR_MS, help="ignore slowdowns smaller than this")
+    args = ap.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    def progress(key, r):
+        line = f"{key:36s} {r['ms']:12.4f} ms  {r['us_per_row']:10.4f} us/row"
+        if baseline and key in baseline and baseline[key].get("ms"):
+            line += f"  ({(r['ms'] - baseline[key]['ms']) / baseline[key]['ms'] * 100.0:+.1f}%)"
+        print(line, flush=True)
+
+    results = run_suite(args.sizes, args.only, args.min_time, progress)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": _meta(), "results": results}, f, indent=1, sort_keys=True)
+        print(f"baseline saved to {args.save}")
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold, args.floor_ms)
+        for r in regressions:
+            print(f"REGRESSION {r['case']}: {r['baseline_ms']} -> {r['ms']} ms ({r['change_pct']:+.1f}%)")
+        if regressions:
+            return 1
+        print(f"no regressions over {args.threshold:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
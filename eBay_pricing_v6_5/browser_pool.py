@@ -0,0 +1,167 @@
+
+from __future__ import annotations
+import asyncio, time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import metrics
+
+POOL_SIZE = 6          # max browser contexts handed out at once
+CONTEXT_MAX_USES = 20  # recycle a context after this many fetches
+
+
+class BrowserPool:
+    """
+    One long-lived Chromium process shared by every fetch.
+
+    Contexts are handed out per profile (e.g. "amazon", "ebay" with their own
+    locale/UA options) and kept warm between fetches.  A context is recycled
+    after `max_uses` acquisitions, or immediately if the fetch that held it
+    raised.  If the browser itself dies it is relaunched on the next acquire.
+    """
+
+    def __init__(self, play, size: int = POOL_SIZE, max_uses: int = CONTEXT_MAX_USES, headless: bool = True, route_policy=None):
+        self.play = play
+        self.route_policy = route_policy  # routing.RoutePolicy installed on each new context
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self._browser = None
+        self._launch_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: Dict[str, List[list]] = {}  # profile -> [[context, uses], ...]
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            "launches": 0,
+            "contexts_created": 0,
+            "contexts_recycled": 0,
+            "contexts_crashed": 0,
+            "acquires": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    async def start(self) -> "BrowserPool":
+        await self._ensure_browser()
+        return self
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            self._idle.clear()
+            with metrics.span("browser.launch"):
+                self._browser = await self.play.chromium.launch(headless=self.headless)
+            self._stats["launches"] += 1
+            return self._browser
+
+    async def _discard(self, ctx):
+        try:
+            await ctx.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def context(self, profile: str = "default", **options):
+        """Borrow an isolated browser context; `options` go to `new_context` when one is created."""
+        if self._closed:
+            raise RuntimeError("browser pool is closed")
+        t0 = time.perf_counter()
+        await self._slots.acquire()
+        waited = (time.perf_counter() - t0) * 1000.0
+        metrics.observe("browser.pool_wait", waited)
+        self._stats["acquires"] += 1
+        self._stats["wait_ms_total"] += waited
+        self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited)
+        if waited >= 1.0:
+            self._stats["waits"] += 1
+        self._in_use += 1
+        entry = None
+        ok = False
+        cancelled = False
+        try:
+            browser = await self._ensure_browser()
+            idle = self._idle.setdefault(profile, [])
+            while idle:
+                cand = idle.pop()
+                if cand[0].browser is browser:
+                    entry = cand
+                    break
+                await self._discard(cand[0])
+            if entry is None:
+                with metrics.span("browser.new_context"):
+                    ctx = await browser.new_context(**options)
+                    if self.route_policy is not None:
+                        await self.route_policy.install(ctx)
+                entry = [ctx, 0]
+                self._stats["contexts_created"] += 1
+            entry[1] += 1
+            try:
+                yield entry[0]
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            ok = True
+        finally:
+            self._in_use -= 1
+            try:
+                if entry is not None:
+                    if not ok and not cancelled:
+                        self._stats["contexts_crashed"] += 1
+                        await self._discard(entry[0])
+                    elif cancelled or entry[1] >= self.max_uses or self._closed:
+                        self._stats["contexts_recycled"] += 1
+                        await self._discard(entry[0])
+                    else:
+                        # close stray pages so the next borrower starts clean
+                        for pg in list(entry[0].pages):
+                            try: await pg.close()
+                            except Exception: pass
+                        self._idle.setdefault(profile, []).append(entry)
+            finally:
+                self._slots.release()
+
+    def stats(self) -> Dict:
+        s = dict(self._stats)
+        s["size"] = self.size
+        s["in_use"] = self._in_use
+        s["idle"] = sum(len(v) for v in self._idle.values())
+        s["browser_connected"] = bool(self._browser is not None and self._browser.is_connected())
+        s["wait_ms_avg"] = (s["wait_ms_total"] / s["acquires"]) if s["acquires"] else 0.0
+        if self.route_policy is not None:
+            s["routing"] = self.route_policy.stats()
+        return s
+
+    async def close(self):
+        self._closed = True
+        for entries in self._idle.values():
+            for ctx, _ in entries:
+                await self._discard(ctx)
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+
+@asynccontextmanager
+async def temporary_pool(play=None, **kwargs):
+    """A pool that lives for one `async with` block (starts its own Playwright if `play` is None)."""
+    if play is None:
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            pool = BrowserPool(p, **kwargs)
+            try:
+                yield pool
+            finally:
+                await pool.close()
+    else:
+        pool = BrowserPool(play, **kwargs)
+        try:
+            yield pool
+        finally:
+            await pool.close()
@@ -0,0 +1,137 @@
+
+from __future__ import annotations
+import json, os, re, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from scraping import normalize_upc, extract_asin_from_url
+
+AMAZON_TTL_S = 6 * 3600   # Amazon price/title/pack is stable over a shift
+EBAY_TTL_S = 30 * 60      # eBay comps move faster
+AMAZON_MISS_TTL_S = 20 * 60   # "no Amazon match" is rechecked sooner than a found listing
+LRU_MAX_ENTRIES = 1024
+CACHE_DB_PATH = os.environ.get("PRICER_CACHE_DB") or None  # set to a file path to keep results across restarts
+
+TTLS = {"amazon": AMAZON_TTL_S, "amazon_miss": AMAZON_MISS_TTL_S, "ebay": EBAY_TTL_S}
+
+
+def lookup_id(code: str) -> str:
+    """Identity of a lookup: the ASIN when the code is/has one, else the normalized UPC."""
+    code = (code or "").strip()
+    if code.startswith("http"):
+        asin = extract_asin_from_url(code)
+        return f"asin:{asin}" if asin else f"url:{code}"
+    if re.fullmatch(r"[A-Za-z0-9]{10}", code):
+        return f"asin:{code.upper()}"
+    upc = normalize_upc(code)
+    return f"upc:{upc}" if upc else f"raw:{code.lower()}"
+
+
+def ebay_key(code: str, condition: str = "new", pages: int = 1) -> str:
+    return f"{lookup_id(code)}|{(condition or 'new').lower()}|p{pages}"
+
+
+class ResultCache:
+    """
+    Two-tier cache for lookup results.
+
+    Entries live under a kind ("amazon", "amazon_miss" or "ebay"), each with
+    its own TTL; "amazon_miss" records a lookup that found no Amazon match.
+    The in-memory tier is an LRU capped at `max_entries`; the optional
+    SQLite tier (`db_path`) keeps entries across restarts and refills the
+    LRU on a memory miss.  Values must be JSON-serializable; they are kept
+    serialized, so every `get` hands back a fresh copy the caller may mutate.
+    """
+
+    def __init__(self, max_entries: int = LRU_MAX_ENTRIES, db_path: Optional[str] = CACHE_DB_PATH,
+                 ttls: Optional[Dict[str, float]] = None, clock=time.time):
+        self.max_entries = max(1, max_entries)
+        self.ttls = dict(TTLS if ttls is None else ttls)
+        self.clock = clock
+        self._lru: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (kind TEXT, key TEXT, expires REAL, value TEXT, PRIMARY KEY (kind, key))")
+            self._db.commit()
+        self._stats = {"mem_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+
+    # keys, so callers holding only the cache object need not import this module
+    amazon_key = staticmethod(lookup_id)
+    ebay_key = staticmethod(ebay_key)
+
+    def _remember(self, k: Tuple[str, str], expires: float, payload: str):
+        self._lru[k] = (expires, payload)
+        self._lru.move_to_end(k)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        now = self.clock()
+        k = (kind, key)
+        with self._lock:
+            hit = self._lru.get(k)
+            if hit is not None:
+                if hit[0] > now:
+                    self._lru.move_to_end(k)
+                    self._stats["mem_hits"] += 1
+                    return json.loads(hit[1])
+                del self._lru[k]
+            if self._db is not None:
+                row = self._db.execute("SELECT expires, value FROM results WHERE kind=? AND key=?", k).fetchone()
+                if row is not None:
+                    if row[0] > now:
+                        self._remember(k, row[0], row[1])
+                        self._stats["disk_hits"] += 1
+                        return json.loads(row[1])
+                    self._db.execute("DELETE FROM results WHERE kind=? AND key=?", k)
+                    self._db.commit()
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, kind: str, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttls.get(kind, EBAY_TTL_S) if ttl is None else ttl
+        expires = self.clock() + ttl
+        k = (kind, key)
+        payload = json.dumps(value)
+        with self._lock:
+            self._remember(k, expires, payload)
+            self._stats["puts"] += 1
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (kind, key, expires, value) VALUES (?, ?, ?, ?)", (kind, key, expires, payload))
+                self._db.commit()
+
+    def invalidate(self, kind: str, key: str):
+        with self._lock:
+            self._lru.pop((kind, key), None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM results WHERE kind=? AND key=?", (kind, key))
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._lru)
+            s["disk"] = self._db is not None
+            return s
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_default: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """Process-wide cache (SQLite tier enabled when PRICER_CACHE_DB is set)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ResultCache()
+        return _default
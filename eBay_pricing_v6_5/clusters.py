@@ -0,0 +1,321 @@
+
+"""
+Incremental version of pricing.compute_suggestion().
+
+IncrementalCluster takes rows one at a time (as they stream in from pages
+or queries) and keeps the totals in a SortedList plus, for the "mode"
+method, each window start's count in a _MaxTree, so each insert is
+O(log n) and the densest window, median/MAD, quartiles and the current
+best pick can be read at any moment without re-sorting.  `result()` returns
+exactly what compute_suggestion(rows_so_far, ...) would.
+
+    c = IncrementalCluster(method="mode", window=8.0)
+    for r in rows_from_page: c.add(r)
+    best_total, best_row = c.best()
+"""
+from __future__ import annotations
+import math, random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+_LOW_SEQ = -1
+_HIGH_SEQ = math.inf
+_NONE = -1
+
+
+class _MaxTree:
+    """
+    Sequence of counts with insert-at-position (bumping the run just before
+    it) and leftmost-maximum, each O(log n) expected (implicit treap, lazy adds).
+    Nodes live in parallel lists; _NONE is the empty child.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._rng = rng or random.Random()   # unseeded: priorities must not track the keys
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.prio: List[float] = []
+        self.val: List[int] = []
+        self.mx: List[int] = []     # max of the subtree, pending adds of ancestors excluded
+        self.lazy: List[int] = []   # add still owed to both children
+        self.size: List[int] = []
+        self.root = _NONE
+
+    def __len__(self) -> int:
+        return self.size[self.root] if self.root != _NONE else 0
+
+    def _apply(self, x: int, d: int):
+        if x != _NONE:
+            self.val[x] += d
+            self.mx[x] += d
+            self.lazy[x] += d
+
+    def _push(self, x: int):
+        d = self.lazy[x]
+        if d:
+            self._apply(self.left[x], d)
+            self._apply(self.right[x], d)
+            self.lazy[x] = 0
+
+    def _pull(self, x: int):
+        l, r = self.left[x], self.right[x]
+        size, mx = 1, self.val[x]
+        if l != _NONE:
+            size += self.size[l]
+            if self.mx[l] > mx:
+                mx = self.mx[l]
+        if r != _NONE:
+            size += self.size[r]
+            if self.mx[r] > mx:
+                mx = self.mx[r]
+        self.size[x], self.mx[x] = size, mx
+
+    def _split(self, x: int, k: int) -> Tuple[int, int]:
+        """(first k elements, the rest)."""
+        if x == _NONE:
+            return _NONE, _NONE
+        self._push(x)
+        l = self.left[x]
+        nl = self.size[l] if l != _NONE else 0
+        if k <= nl:
+            a, b = self._split(l, k)
+            self.left[x] = b
+            self._pull(x)
+            return a, x
+        a, b = self._split(self.right[x], k - nl - 1)
+        self.right[x] = a
+        self._pull(x)
+        return x, b
+
+    def _merge(self, a: int, b: int) -> int:
+        if a == _NONE:
+            return b
+        if b == _NONE:
+            return a
+        if self.prio[a] > self.prio[b]:
+            self._push(a)
+            self.right[a] = self._merge(self.right[a], b)
+            self._pull(a)
+            return a
+        self._push(b)
+        self.left[b] = self._merge(a, self.left[b])
+        self._pull(b)
+        return b
+
+    def insert(self, pos: int, value: int, bump_from: Optional[int] = None):
+        """Insert `value` at `pos`, first adding 1 to positions bump_from..pos-1 (if given)."""
+        x = len(self.val)
+        self.left.append(_NONE); self.right.append(_NONE); self.prio.append(self._rng.random())
+        self.val.append(value); self.mx.append(value); self.lazy.append(0); self.size.append(1)
+        lo = pos if bump_from is None else bump_from
+        a, c = self._split(self.root, lo)
+        b, c = self._split(c, pos - lo)
+        self._apply(b, 1)
+        self.root = self._merge(self._merge(a, b), self._merge(x, c))
+
+    def argmax(self) -> Tuple[int, int]:
+        """(max value, first position holding it); the tree must not be empty."""
+        x, pos = self.root, 0
+        target = self.mx[x]
+        while True:
+            self._push(x)
+            l = self.left[x]
+            if l != _NONE and self.mx[l] == target:
+                x = l
+                continue
+            nl = self.size[l] if l != _NONE else 0
+            if self.val[x] == target:
+                return target, pos + nl
+            pos += nl + 1
+            x = self.right[x]
+
+
+class IncrementalCluster:
+    """
+    Streaming price cluster over row totals.
+
+    Rows without a total, or outside min_price/max_price, are ignored.
+    Equal totals keep arrival order, which matches the stable sort in
+    compute_suggestion().  For "mode" every position i in the sorted totals
+    holds the count of its window [xs[i], xs[i] + window] in a _MaxTree: an
+    insert adds 1 to the contiguous run of starts the new total falls into
+    and inserts its own count, and the densest window is the tree's leftmost
+    maximum (the same tie-break as pricing._densest_window).
+    """
+
+    def __init__(self, method: str = "mode", window: float = 10.0, iqr_mult: float = 1.5, mad_k: float = 3.5,
+                 min_price: Optional[float] = None, max_price: Optional[float] = None):
+        self.method = method
+        self.window = window
+        self.iqr_mult = iqr_mult
+        self.mad_k = mad_k
+        self.min_price = min_price
+        self.max_price = max_price
+        self._xs: SortedList = SortedList()   # (total, seq)
+        self._rows: Dict[int, Dict] = {}
+        self._seq = 0
+        self._counts = _MaxTree()   # window count per sorted position ("mode" only)
+
+    def __len__(self) -> int:
+        return len(self._xs)
+
+    # ---------- inserts ----------
+    def add(self, row: Dict) -> bool:
+        t = row.get("total")
+        if t is None:
+            return False
+        if (self.min_price is not None and t < self.min_price) or (self.max_price is not None and t > self.max_price):
+            return False
+        self._xs.add((t, self._seq))
+        self._rows[self._seq] = row
+        self._seq += 1
+        if self.method == "mode":
+            self._update_counts(t)
+        return True
+
+    def extend(self, rows: Iterable[Dict]) -> int:
+        return sum(1 for r in rows if self.add(r))
+
+    def _x(self, i: int) -> float:
+        return self._xs[i][0]
+
+    def _window_end(self, i: int) -> int:
+        """First index j with xs[j] - xs[i] > window (same float test as pricing._densest_window)."""
+        s, n, w = self._x(i), len(self._xs), self.window
+        j = self._xs.bisect_right((s + w, _HIGH_SEQ))
+        while j > i + 1 and self._x(j - 1) - s > w:
+            j -= 1
+        while j < n and self._x(j) - s <= w:
+            j += 1
+        return j
+
+    def _update_counts(self, t: float):
+        # the new total sits after every equal one; the starts before it whose window
+        # now reaches t are a contiguous run ending there (float subtraction is monotone)
+        p = self._xs.bisect_right((t, _HIGH_SEQ)) - 1
+        i = self._xs.bisect_left((t - self.window, _LOW_SEQ))
+        while i > 0 and t - self._x(i - 1) <= self.window:
+            i -= 1
+        while i < p and t - self._x(i) > self.window:
+            i += 1
+        self._counts.insert(p, self._window_end(p) - p, bump_from=i)
+
+    # ---------- statistics ----------
+    def densest_window(self) -> Optional[Tuple[float, float]]:
+        """(lo, hi) of the densest `window`-wide span of totals, or None when empty."""
+        if not self._xs:
+            return None
+        if self.method == "mode":
+            count, i = self._counts.argmax()
+        else:
+            count = i = 0
+            prev = None
+            for k in range(len(self._xs)):
+                s = self._x(k)
+                if s != prev and self._window_end(k) - k > count:
+                    count, i = self._window_end(k) - k, k
+                prev = s
+        return self._x(i), self._x(i + count - 1)
+
+    def median(self) -> Optional[float]:
+        n = len(self._xs)
+        if not n:
+            return None
+        if n % 2:
+            return self._x(n // 2)
+        return (self._x(n // 2 - 1) + self._x(n // 2)) / 2
+
+    def _deviation_kth(self, m: float, k: int) -> float:
+        """k-th smallest |x - m| (0-based), from the two sorted runs either side of m."""
+        split = self._xs.bisect_left((m, _LOW_SEQ))
+        na, nb = split, len(self._xs) - split
+        a = lambda i: m - self._x(split - 1 - i)   # ascending distances below m
+        b = lambda j: self._x(split + j) - m       # ascending distances at/above m
+        lo, hi = max(0, k + 1 - nb), min(k + 1, na)
+        while lo < hi:
+            i = (lo + hi) // 2
+            j = k + 1 - i
+            if j > 0 and b(j - 1) > a(i):
+                lo = i + 1
+            else:
+                hi = i
+        i, j = lo, k + 1 - lo
+        return max(a(i - 1) if i > 0 else -math.inf, b(j - 1) if j > 0 else -math.inf)
+
+    def mad(self) -> Optional[float]:
+        """Median absolute deviation (raw, as statistics.median would give it)."""
+        n = len(self._xs)
+        if not n:
+            return None
+        m = self.median()
+        if n % 2:
+            return self._deviation_kth(m, n // 2)
+        return (self._deviation_kth(m, n // 2 - 1) + self._deviation_kth(m, n // 2)) / 2
+
+    def quantile(self, p: float) -> Optional[float]:
+        n = len(self._xs)
+        if not n:
+            return None
+        k = (n - 1) * p
+        f = int(k); c = min(f + 1, n - 1)
+        return self._x(f) if f == c else self._x(f) + (self._x(c) - self._x(f)) * (k - f)
+
+    def quartiles(self) -> Optional[Tuple[float, float]]:
+        if not self._xs:
+            return None
+        return self.quantile(0.25), self.quantile(0.75)
+
+    # ---------- picks ----------
+    def bounds(self) -> Optional[Tuple[float, float]]:
+        """Inclusive total range of the rows the current method keeps."""
+        if not self._xs:
+            return None
+        if self.method == "mode":
+            return self.densest_window()
+        if self.method == "mad":
+            m = self.median()
+            thresh = 1.4826 * (self.mad() or 0.01) * self.mad_k
+            return m - thresh, m + thresh
+        q1, q3 = self.quartiles()
+        iqr = max(0.0, q3 - q1)
+        return q1 - self.iqr_mult * iqr, q3 + self.iqr_mult * iqr
+
+    def _keeper(self):
+        """(lo, hi, keep) for the current method; keep(t) is compute_suggestion's exact test."""
+        lo, hi = self.bounds()
+        if self.method == "mad":
+            m = self.median()
+            thresh = 1.4826 * (self.mad() or 0.01) * self.mad_k
+            return lo, hi, lambda t: abs(t - m) <= thresh
+        return lo, hi, lambda t: lo <= t <= hi
+
+    def _kept(self) -> Iterable[Tuple[float, int]]:
+        if not self._xs:
+            return
+        lo, hi, keep = self._keeper()
+        i = self._xs.bisect_left((lo, _LOW_SEQ))
+        while i > 0 and keep(self._x(i - 1)):   # float edge of the bounds
+            i -= 1
+        for t, seq in self._xs.islice(i):
+            if keep(t):
+                yield t, seq
+            elif t > hi:
+                break
+
+    def best(self) -> Tuple[Optional[float], Optional[Dict]]:
+        """Lowest kept total and its (earliest) row."""
+        for t, seq in self._kept():
+            return t, self._rows[seq]
+        return None, None
+
+    def used(self) -> List[Dict]:
+        """Kept rows sorted by total (arrival order on ties)."""
+        return [self._rows[seq] for _, seq in self._kept()]
+
+    def result(self):
+        """(best_total, best_row, used) as compute_suggestion() returns it."""
+        used = self.used()
+        if not used:
+            return None, None, []
+        return used[0]["total"], used[0], used
@@ -0,0 +1,220 @@
+
+from __future__ import annotations
+import re
+from typing import List, Dict, Optional
+
+from pricing import compute_suggestion, choose_and_suggest, within_range
+from tokenizer import token_ids
+from simindex import SimilarityIndex
+from clusters import IncrementalCluster
+
+TITLE_SIM_THRESHOLD = 0.75  # title guard for exact UPC matches
+RELAXED_SIM_THRESHOLD = 0.45  # fallback title pool when nothing passes the guard
+
+PRICE_CLUSTER_WINDOW = 8.0   # dollars spanned by the densest cluster window (try 6–10)
+AMAZON_RANGE_PCT = 0.25      # eBay listing must be within 25% of Amazon
+
+CODE_KEYS = ("upc", "code", "barcode", "item_upc")
+
+
+def _norm_digits(x: str) -> str:
+    return re.sub(r"[^0-9]", "", x or "")
+
+
+def row_matches_upc(r: Dict, user_code: str) -> bool:
+    if not user_code:
+        return True
+    for k in CODE_KEYS:
+        v = r.get(k)
+        if v:
+            rc = _norm_digits(str(v))
+            if rc and rc != user_code:
+                return False
+    return True
+
+
+def filter_rows_by_upc(rows: List[Dict], user_code: str) -> List[Dict]:
+    return [r for r in rows if row_matches_upc(r, user_code)]
+
+
+def row_code_match(r: Dict, user_code: str) -> bool:
+    for k in CODE_KEYS:
+        v = r.get(k)
+        if v and _norm_digits(str(v)) == user_code:
+            return True
+    if r.get("has_code") and r.get("code"):
+        return _norm_digits(str(r["code"])) == user_code
+    return False
+
+
+def attach_similarity(rows: List[Dict], title: str, scored_title: Optional[str] = None) -> List[Dict]:
+    """
+    Make sure every row carries `sim` = Jaccard(title, row title).
+
+    scrape_multi() scores rows once against the title it filtered with
+    (meta["sim_title"]); those scores are reused when that was the same
+    title, otherwise all rows are rescored with one index lookup.
+    """
+    if scored_title == title and all("sim" in r for r in rows):
+        return rows
+    for r, s in zip(rows, SimilarityIndex.from_rows(rows).scores(token_ids(title))):
+        r["sim"] = s
+    return rows
+
+
+def decide(data: Dict, code: str) -> Dict:
+    """
+    Final pricing decision for one scrape_multi() result.
+
+    Exact-UPC rows that pass the title guard win; otherwise the lowest row in
+    the densest price cluster of the best title pool is used.  The eBay pick
+    is dropped if it is outside AMAZON_RANGE_PCT of Amazon, then
+    choose_and_suggest() undercuts the lower competitor.
+    """
+    raw_rows = data.get("rows", [])
+    amazon = data.get("amazon")
+
+    rows = data.get("filtered_rows") or raw_rows
+    user_code = _norm_digits(code)
+    comp_rows = filter_rows_by_upc(rows, user_code)
+
+    # ---------- Amazon context ----------
+    amz_title = (amazon.get("title") if amazon else "") or ""
+    amz_toks = token_ids(amz_title)
+    if amz_toks:
+        attach_similarity(comp_rows, amz_title, (data.get("meta") or {}).get("sim_title"))
+
+    # ---------- One pass: exact-UPC (title guard >= 0.75), strict and relaxed title pools ----------
+    exacts: List[Dict] = []
+    valids: List[Dict] = []
+    strict: List[Dict] = []
+    relaxed: List[Dict] = []
+    for r in comp_rows:
+        if r.get("total") is None:
+            continue
+        valids.append(r)
+        sim = r["sim"] if amz_toks else None
+        if user_code and row_code_match(r, user_code) and (sim is None or sim >= TITLE_SIM_THRESHOLD):
+            exacts.append(r)
+        if sim is not None:
+            if sim >= TITLE_SIM_THRESHOLD:
+                strict.append(r)
+            if sim >= RELAXED_SIM_THRESHOLD:
+                relaxed.append(r)
+
+    ebay_exact_row = None
+    ebay_exact_total = None
+    if exacts:
+        ebay_exact_row = min(exacts, key=lambda r: r["total"])
+        ebay_exact_total = float(ebay_exact_row["total"])
+
+    # ---------- If no exact code+title match, use absolute-low from comp_rows ----------
+    ebay_abs_row = None
+    ebay_abs_total = None
+    if not exacts and valids:
+        pool = strict or relaxed or valids
+
+        if pool:
+            # <-- CLUSTER here: pick the lowest inside the densest window
+            best_total, best_row, used_rows = compute_suggestion(
+                pool,
+                method="mode",               # densest price window
+                window=PRICE_CLUSTER_WINDOW, # tighten/loosen cluster span
+            )
+            if best_row:
+                ebay_abs_row = best_row
+                ebay_abs_total = float(best_row["total"])
+
+    # Amazon total
+    amz_total = float(amazon["total"]) if (amazon and amazon.get("total") is not None) else None
+
+    # Prefer exact eBay if available
+    ebay_to_use = ebay_exact_total if ebay_exact_total is not None else ebay_abs_total
+    ebay_row_ref = ebay_exact_row if ebay_exact_row is not None else ebay_abs_row
+    return _finish(amazon, amz_total, raw_rows, comp_rows, ebay_to_use, ebay_row_ref, ebay_exact_row is not None)
+
+
+def _finish(amazon: Optional[Dict], amz_total: Optional[float], raw_rows: List[Dict], comp_rows: List[Dict],
+            ebay_to_use: Optional[float], ebay_row_ref: Optional[Dict], exact: bool) -> Dict:
+    """Amazon range check, choose_and_suggest() and the reference URL; the decide() result dict."""
+    if amz_total is not None and ebay_to_use is not None and not within_range(ebay_to_use, amz_total, pct=AMAZON_RANGE_PCT):
+        ebay_to_use = None
+        ebay_row_ref = None
+
+    pick = choose_and_suggest(amz_total, ebay_to_use)
+
+    reference: Optional[str] = None
+    if pick["suggested"] is not None:
+        if pick["source"] == "Amazon":
+            reference = amazon.get("url") if amazon else None
+        else:
+            reference = ebay_row_ref.get("url") if ebay_row_ref else None
+
+    return {
+        "amazon": amazon,
+        "amazon_total": amz_total,
+        "raw_rows": raw_rows,
+        "comp_rows": comp_rows,
+        "ebay_total": ebay_to_use,
+        "ebay_row": ebay_row_ref,
+        "exact": exact,
+        "pick": pick,
+        "reference": reference,
+    }
+
+
+class StreamingDecision:
+    """
+    decide() for rows that arrive in batches (the provisional suggestion
+    while a lookup is still scraping).
+
+    Each row is routed once into the exact-UPC minimum and into the strict /
+    relaxed / all-valid pools, each an IncrementalCluster, so a row costs
+    O(log n) to add and result() needs no re-sort or re-scan.  After
+    add(rows_1) ... add(rows_k), result() equals decide() on the
+    concatenated rows (with meta["sim_title"] = `sim_title`).
+    """
+
+    def __init__(self, amazon: Optional[Dict], code: str, sim_title: Optional[str] = None):
+        self.amazon = amazon
+        self.user_code = _norm_digits(code)
+        self.amz_title = (amazon.get("title") if amazon else "") or ""
+        self.amz_toks = token_ids(self.amz_title)
+        self.sim_title = sim_title
+        self.amz_total = float(amazon["total"]) if (amazon and amazon.get("total") is not None) else None
+        self.raw_rows: List[Dict] = []
+        self.comp_rows: List[Dict] = []
+        self.exact_row: Optional[Dict] = None
+        self.pools = {k: IncrementalCluster(method="mode", window=PRICE_CLUSTER_WINDOW)
+                      for k in ("strict", "relaxed", "valid")}
+
+    def add(self, rows: List[Dict]):
+        self.raw_rows.extend(rows)
+        comp = filter_rows_by_upc(rows, self.user_code)
+        self.comp_rows.extend(comp)
+        if self.amz_toks:
+            attach_similarity(comp, self.amz_title, self.sim_title)
+        for r in comp:
+            if r.get("total") is None:
+                continue
+            self.pools["valid"].add(r)
+            sim = r["sim"] if self.amz_toks else None
+            if self.user_code and row_code_match(r, self.user_code) and (sim is None or sim >= TITLE_SIM_THRESHOLD):
+                if self.exact_row is None or r["total"] < self.exact_row["total"]:
+                    self.exact_row = r
+            if sim is not None:
+                if sim >= TITLE_SIM_THRESHOLD:
+                    self.pools["strict"].add(r)
+                if sim >= RELAXED_SIM_THRESHOLD:
+                    self.pools["relaxed"].add(r)
+
+    def result(self) -> Dict:
+        """The decide() result for the rows so far (row lists are snapshots)."""
+        if self.exact_row is not None:
+            ebay_total, ebay_row = float(self.exact_row["total"]), self.exact_row
+        else:
+            pool = next((p for p in self.pools.values() if len(p)), None)
+            best_total, ebay_row = pool.best() if pool is not None else (None, None)
+            ebay_total = float(best_total) if ebay_row is not None else None
+        return _finish(self.amazon, self.amz_total, list(self.raw_rows), list(self.comp_rows),
+                       ebay_total, ebay_row, self.exact_row is not None)
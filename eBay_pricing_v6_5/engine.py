@@ -0,0 +1,237 @@
+
+"""
+Columnar pricing decision engine.
+
+Runs decision.decide() for many items at once: every eBay row of every item
+goes into flat NumPy columns (item id, total, title similarity to that
+item's Amazon title, code match, UPC-conflict flag), the pools are built
+with array masks, and each item gets the same pick decide() would give.
+
+    batch = RowBatch.from_items([(data, code), ...])   # data = scrape_multi() result
+    picks = decide_batch(batch)
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pricing import choose_and_suggest
+from tokenizer import token_ids
+from decision import (TITLE_SIM_THRESHOLD, RELAXED_SIM_THRESHOLD, PRICE_CLUSTER_WINDOW, AMAZON_RANGE_PCT,
+                      _norm_digits, row_matches_upc, row_code_match, attach_similarity)
+
+
+class RowBatch:
+    """
+    Flat columns for the rows of many items.
+
+    Row columns (one entry per eBay row, items laid out back to back):
+      item      int    index of the item the row belongs to
+      total     float  row total, NaN when missing
+      sim       float  Jaccard(item's Amazon title, row title), i.e. row["sim"]
+      code      bool   row carries the item's exact code
+      upc_ok    bool   row does not name a different code (filter_rows_by_upc)
+    Item columns: amazon_total (NaN when missing), has_title, has_code.
+    `rows[k]` keeps each item's original row dicts for references.
+    """
+
+    def __init__(self, item, total, sim, code, upc_ok, amazon_total, has_title, has_code, rows, amazon):
+        self.item = item
+        self.total = total
+        self.sim = sim
+        self.code = code
+        self.upc_ok = upc_ok
+        self.amazon_total = amazon_total
+        self.has_title = has_title
+        self.has_code = has_code
+        self.rows = rows
+        self.amazon = amazon
+        self.offsets = np.concatenate(([0], np.cumsum([len(r) for r in rows]))).astype(np.int64)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_items(cls, items: Sequence[Tuple[Dict, str]]) -> "RowBatch":
+        item_ids: List[int] = []
+        totals: List[float] = []
+        sims: List[float] = []
+        codes: List[bool] = []
+        oks: List[bool] = []
+        amz_totals: List[float] = []
+        has_title: List[bool] = []
+        has_code: List[bool] = []
+        all_rows: List[List[Dict]] = []
+        amazons: List[Optional[Dict]] = []
+        for idx, (data, code) in enumerate(items):
+            rows = data.get("filtered_rows") or data.get("rows", [])
+            amazon = data.get("amazon")
+            user_code = _norm_digits(code)
+            amz_title = (amazon.get("title") if amazon else "") or ""
+            amz_toks = token_ids(amz_title)
+            if amz_toks:
+                attach_similarity(rows, amz_title, (data.get("meta") or {}).get("sim_title"))
+            amazons.append(amazon)
+            all_rows.append(rows)
+            amz_totals.append(float(amazon["total"]) if (amazon and amazon.get("total") is not None) else np.nan)
+            has_title.append(bool(amz_toks))
+            has_code.append(bool(user_code))
+            for r in rows:
+                t = r.get("total")
+                item_ids.append(idx)
+                totals.append(float(t) if t is not None else np.nan)
+                sims.append(r["sim"] if amz_toks else 0.0)
+                codes.append(bool(user_code) and row_code_match(r, user_code))
+                oks.append(row_matches_upc(r, user_code))
+        return cls(
+            item=np.asarray(item_ids, dtype=np.int64),
+            total=np.asarray(totals, dtype=np.float64),
+            sim=np.asarray(sims, dtype=np.float64),
+            code=np.asarray(codes, dtype=bool),
+            upc_ok=np.asarray(oks, dtype=bool),
+            amazon_total=np.asarray(amz_totals, dtype=np.float64),
+            has_title=np.asarray(has_title, dtype=bool),
+            has_code=np.asarray(has_code, dtype=bool),
+            rows=all_rows,
+            amazon=amazons,
+        )
+
+
+def _any_per_item(mask: np.ndarray, item: np.ndarray, n_items: int) -> np.ndarray:
+    return np.bincount(item[mask], minlength=n_items) > 0
+
+
+def _first_min_per_item(mask: np.ndarray, batch: RowBatch) -> np.ndarray:
+    """Row index of the lowest total per item among `mask` rows (first in row order on ties), -1 if none."""
+    out = np.full(batch.n_items, -1, dtype=np.int64)
+    idx = np.flatnonzero(mask)
+    if idx.size == 0:
+        return out
+    order = idx[np.lexsort((idx, batch.total[idx], batch.item[idx]))]
+    items = batch.item[order]
+    first = np.ones(order.size, dtype=bool)
+    first[1:] = items[1:] != items[:-1]
+    out[items[first]] = order[first]
+    return out
+
+
+def _densest_low_per_item(mask: np.ndarray, batch: RowBatch, window: float) -> np.ndarray:
+    """
+    Per item, the lowest total of the densest `window`-wide price window over
+    the `mask` rows (same tie-breaking as pricing._densest_window); NaN if none.
+    """
+    out = np.full(batch.n_items, np.nan)
+    idx = np.flatnonzero(mask)
+    if idx.size == 0:
+        return out
+    order = idx[np.lexsort((batch.total[idx], batch.item[idx]))]
+    items = batch.item[order]
+    xs = batch.total[order]
+    bounds = np.flatnonzero(np.diff(items)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [order.size]))
+    for s, e in zip(starts, ends):
+        seg = xs[s:e]
+        j = np.searchsorted(seg, seg + window, side="right")
+        # match the reference's `xs[j] - xs[i] <= width` exactly where float rounding differs
+        n = seg.size
+        i = np.arange(n)
+        back = (j > i + 1) & (seg[np.maximum(j - 1, 0)] - seg > window)
+        j[back] = np.searchsorted(seg, seg[j[back] - 1], side="left")
+        fwd = j < n
+        fwd[fwd] = seg[j[fwd]] - seg[fwd] <= window
+        j[fwd] = np.searchsorted(seg, seg[j[fwd]], side="right")
+        out[items[s]] = seg[int(np.argmax(j - i))]
+    return out
+
+
+def decide_batch(batch: RowBatch, window: float = PRICE_CLUSTER_WINDOW,
+                 sim_strict: float = TITLE_SIM_THRESHOLD, sim_relaxed: float = RELAXED_SIM_THRESHOLD,
+                 range_pct: float = AMAZON_RANGE_PCT) -> List[Dict]:
+    """
+    One pick per item, matching decision.decide(): source, competitor_price,
+    suggested, plus amazon_total, ebay_total, exact, ebay_row (or None),
+    reference and n_comp_rows (= len(decide()["comp_rows"])).
+    """
+    n = batch.n_items
+    item = batch.item
+    valid = batch.upc_ok & ~np.isnan(batch.total)
+    row_has_title = batch.has_title[item]
+
+    # exact code + title guard
+    exact_mask = valid & batch.code & batch.has_code[item] & (~row_has_title | (batch.sim >= sim_strict))
+    exact_row = _first_min_per_item(exact_mask, batch)
+    has_exact = exact_row >= 0
+
+    # title pools: strict, else relaxed, else every valid row
+    strict = valid & row_has_title & (batch.sim >= sim_strict)
+    relaxed = valid & row_has_title & (batch.sim >= sim_relaxed)
+    has_strict = _any_per_item(strict, item, n)
+    has_relaxed = _any_per_item(relaxed, item, n)
+    pool = np.where(has_strict[item], strict, np.where(has_relaxed[item], relaxed, valid))
+    pool &= ~has_exact[item]
+    low = _densest_low_per_item(pool, batch, window)
+    cluster_row = _first_min_per_item(pool & (batch.total == low[item]), batch)
+
+    ebay_row = np.where(has_exact, exact_row, cluster_row)
+    ebay_total = np.where(ebay_row >= 0, batch.total[np.maximum(ebay_row, 0)], np.nan) if item.size else np.full(n, np.nan)
+    amz = batch.amazon_total
+    out_of_range = ~np.isnan(amz) & ~np.isnan(ebay_total) & (np.abs(ebay_total - amz) > amz * range_pct)
+    ebay_total[out_of_range] = np.nan
+    ebay_row[out_of_range] = -1
+
+    n_comp = np.bincount(item[batch.upc_ok], minlength=n)
+
+    picks: List[Dict] = []
+    for k in range(n):
+        a = None if np.isnan(amz[k]) else float(amz[k])
+        e = None if np.isnan(ebay_total[k]) else float(ebay_total[k])
+        pick = choose_and_suggest(a, e)
+        ref_row = None
+        if ebay_row[k] >= 0:
+            ref_row = batch.rows[k][int(ebay_row[k] - batch.offsets[k])]
+        reference = None
+        if pick["suggested"] is not None:
+            if pick["source"] == "Amazon":
+                reference = batch.amazon[k].get("url") if batch.amazon[k] else None
+            else:
+                reference = ref_row.get("url") if ref_row else None
+        pick.update({
+            "amazon_total": a,
+            "ebay_total": e,
+            "exact": bool(has_exact[k]),
+            "ebay_row": ref_row,
+            "reference": reference,
+            "n_comp_rows": int(n_comp[k]),
+        })
+        picks.append(pick)
+    return picks
+
+
+if __name__ == "__main__":
+    # quick benchmark: python engine.py [items] [rows_per_item]
+    import random, sys, time
+    from decision import decide
+
+    n_items = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    rng = random.Random(0)
+    words = "acme widget deluxe filter pack blue steel cordless drill kit pro max mini".split()
+    items = []
+    for k in range(n_items):
+        amazon = {"title": " ".join(rng.sample(words, 5)), "total": round(rng.uniform(10, 60), 2), "url": ""}
+        rows = [{"title": " ".join(rng.sample(words, rng.randint(3, 7))), "url": f"/itm/{k}-{i}",
+                 "total": round(rng.uniform(8, 70), 2)} for i in range(n_rows)]
+        items.append(({"amazon": amazon, "rows": rows}, ""))
+
+    t0 = time.perf_counter()
+    for data, code in items:
+        decide(data, code)
+    t1 = time.perf_counter()
+    batch = RowBatch.from_items(items)
+    t2 = time.perf_counter()
+    decide_batch(batch)
+    t3 = time.perf_counter()
+    print(f"{n_items} items x {n_rows} rows: decide() loop {t1 - t0:.3f}s, "
+          f"RowBatch.from_items {t2 - t1:.3f}s, decide_batch {t3 - t2:.3f}s")
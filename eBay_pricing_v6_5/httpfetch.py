@@ -0,0 +1,170 @@
+
+"""
+Plain-HTTP page fetches for the browser-free fast paths.
+
+One keep-alive httpx.AsyncClient per event loop (the scrape runtime has one
+loop, so in practice one client per process) sends browser-like headers.
+`get_page()` returns a Page with status, final URL and text, or None when
+the request failed or the response looks like a bot wall / captcha, in
+which case callers fall back to Playwright.
+
+Set PRICER_HTTP_FAST=0 to disable the fast paths entirely.
+"""
+from __future__ import annotations
+import asyncio, os, threading
+from typing import Dict, NamedTuple, Optional
+
+import httpx
+
+import metrics
+
+HTTP_FAST_PATH = os.environ.get("PRICER_HTTP_FAST", "1") != "0"
+HTTP_TIMEOUT_S = 12.0
+HTTP_MAX_CONNECTIONS = 16   # per client; eBay + Amazon hosts together
+HTTP_KEEPALIVE = 8
+
+DESKTOP_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+HTTP_HEADERS = {
+    "User-Agent": DESKTOP_UA,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# statuses / URL fragments / page text that mean "not the real page"
+BOT_WALL_STATUSES = {403, 429, 503}
+BOT_WALL_URL_MARKERS = ("/splashui/challenge", "/splashui/captcha", "/errors/validatecaptcha", "/ap/signin")
+BOT_WALL_TEXT_MARKERS = (
+    "pardon our interruption",
+    "please verify yourself to continue",
+    "enter the characters you see below",
+    "to discuss automated access to amazon data",
+    "api-services-support@amazon.com",
+    "/errors/validatecaptcha",
+)
+
+
+class Page(NamedTuple):
+    status: int
+    url: str
+    text: str
+
+
+def is_bot_wall(status: int, url: str, text: str) -> bool:
+    if status in BOT_WALL_STATUSES:
+        return True
+    u = (url or "").lower()
+    if any(m in u for m in BOT_WALL_URL_MARKERS):
+        return True
+    head = (text or "")[:20000].lower()   # challenge pages are short; real pages say "captcha" only deep in scripts
+    return any(m in head for m in BOT_WALL_TEXT_MARKERS)
+
+
+_lock = threading.Lock()
+_client: Optional[httpx.AsyncClient] = None
+_client_loop = None
+_transport: Optional[httpx.AsyncBaseTransport] = None   # see use_transport()
+_stats: Dict[str, int] = {"requests": 0, "ok": 0, "bot_walls": 0, "errors": 0}
+_fallbacks: Dict[str, int] = {}   # per caller: times the browser had to take over
+
+
+def get_client() -> httpx.AsyncClient:
+    """The keep-alive client for the running loop (a new loop gets a new client; the old one is closed)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    stale = None
+    with _lock:
+        if _client is None or _client_loop is not loop or _client.is_closed:
+            stale = (_client, _client_loop)
+            _client = httpx.AsyncClient(
+                headers=HTTP_HEADERS, follow_redirects=True, timeout=HTTP_TIMEOUT_S,
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_KEEPALIVE),
+                transport=_transport,
+            )
+            _client_loop = loop
+        client = _client
+    if stale is not None and stale[0] is not None and not stale[0].is_closed:
+        _close_stale(*stale)
+    return client
+
+
+_closing = set()   # close tasks for replaced clients, kept referenced until done
+
+
+async def _aclose_quietly(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except Exception:
+        pass   # its loop has closed: the sockets still get closed, the loop can't be told
+
+
+def _close_stale(client: httpx.AsyncClient, loop):
+    """Close a client made on another loop: on that loop if it still runs, else from this one."""
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+        return
+    task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def use_transport(transport: Optional[httpx.AsyncBaseTransport]):
+    """Route every fast-path request through `transport` (fixture replay, tests); None restores the network."""
+    global _client, _transport
+    with _lock:
+        _transport, _client = transport, None
+
+
+async def aclose():
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+async def get_page(url: str, metric: str = "http.get", timeout_s: Optional[float] = None) -> Optional[Page]:
+    """GET `url`; None on transport errors, non-2xx statuses and bot walls."""
+    _count("requests")
+    try:
+        with metrics.span(metric):
+            resp = await get_client().get(url, timeout=timeout_s or HTTP_TIMEOUT_S)
+            text = resp.text
+    except (httpx.HTTPError, UnicodeDecodeError):
+        _count("errors")
+        return None
+    final_url = str(resp.url)
+    if is_bot_wall(resp.status_code, final_url, text):
+        _count("bot_walls")
+        return None
+    if not 200 <= resp.status_code < 300:
+        _count("errors")
+        return None
+    _count("ok")
+    return Page(resp.status_code, final_url, text)
+
+
+def note_fallback(what: str):
+    """Count one browser fallback for `what` (e.g. "ebay.search")."""
+    with _lock:
+        _fallbacks[what] = _fallbacks.get(what, 0) + 1
+
+
+def stats() -> Dict:
+    with _lock:
+        s = dict(_stats)
+        s["fallbacks"] = dict(_fallbacks)
+    s["enabled"] = HTTP_FAST_PATH
+    return s
+
+
+def reset_stats():
+    with _lock:
+        for k in _stats:
+            _stats[k] = 0
+        _fallbacks.clear()
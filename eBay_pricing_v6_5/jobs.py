@@ -0,0 +1,177 @@
+
+from __future__ import annotations
+import queue, threading, time, uuid
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+JOB_WORKERS = 4          # lookups running at once (each waits on the shared scrape runtime)
+JOB_QUEUE_MAX = 32       # queued jobs beyond which submit() refuses (HTTP 429)
+JOB_RESULT_TTL_S = 900   # how long finished jobs stay pollable
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit() when the queue is at capacity."""
+
+
+class Job:
+    def __init__(self, params: Dict, clock=time.monotonic):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"   # queued -> running -> done | error
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created = clock()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.events: List[tuple] = []   # (kind, payload) progress events, in order
+        self.cond = threading.Condition()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("done", "error")
+
+    def push(self, kind: str, payload):
+        with self.cond:
+            self.events.append((kind, payload))
+            self.cond.notify_all()
+
+    def to_dict(self) -> Dict:
+        d = {
+            "id": self.id,
+            "status": self.status,
+            "code": self.params.get("code"),
+            "wait_ms": round((self.started - self.created) * 1000.0, 1) if self.started else None,
+            "run_ms": round((self.finished - self.started) * 1000.0, 1) if self.finished and self.started else None,
+        }
+        if self.status == "done":
+            d["result"] = self.result
+        if self.status == "error":
+            d["error"] = self.error
+        return d
+
+
+class JobQueue:
+    """
+    Bounded in-process worker pool for pricing jobs.
+
+    `runner(params, on_event)` does one lookup (blocking) and returns the
+    result dict; on_event(kind, payload) relays progress to subscribers.
+    At most `workers` jobs run at once and at most `max_queue` wait; beyond
+    that submit() raises QueueFull.  Queue wait and run times go to
+    metrics ("jobs.wait", "jobs.run").
+    """
+
+    def __init__(self, runner: Callable[[Dict, Callable], Dict], workers: int = JOB_WORKERS,
+                 max_queue: int = JOB_QUEUE_MAX, result_ttl: float = JOB_RESULT_TTL_S, clock=time.monotonic):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.result_ttl = result_ttl
+        self.clock = clock
+        self._q: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=self.max_queue)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "queue_depth_max": 0}
+
+    def start(self) -> "JobQueue":
+        with self._lock:
+            if not self._threads:
+                for n in range(self.workers):
+                    t = threading.Thread(target=self._work, name=f"pricing-job-{n}", daemon=True)
+                    t.start()
+                    self._threads.append(t)
+        return self
+
+    def submit(self, params: Dict) -> Job:
+        self.start()
+        self._prune()
+        job = Job(params, clock=self.clock)
+        with self._lock:
+            try:
+                self._q.put_nowait(job)
+            except queue.Full:
+                self._stats["rejected"] += 1
+                raise QueueFull(f"{self.max_queue} jobs already queued")
+            self._jobs[job.id] = job
+            self._stats["submitted"] += 1
+            self._stats["queue_depth_max"] = max(self._stats["queue_depth_max"], self._q.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: Job, timeout: Optional[float]) -> Job:
+        with job.cond:
+            job.cond.wait_for(lambda: job.is_finished, timeout=timeout)
+        return job
+
+    def follow(self, job: Job, timeout: float = 0.25):
+        """Yield (kind, payload) progress events as they arrive, ending with ("done"|"error", job dict)."""
+        i = 0   # events consumed so far; idle ticks must not advance it
+        while True:
+            with job.cond:
+                job.cond.wait_for(lambda: len(job.events) > i or job.is_finished, timeout=timeout)
+                if len(job.events) > i:
+                    item = job.events[i]
+                    i += 1
+                elif job.is_finished:
+                    yield job.status, job.to_dict()
+                    return
+                else:
+                    item = None
+            if item is not None:
+                yield item
+            else:
+                yield None, None   # idle tick, lets callers notice disconnects
+
+    def _work(self):
+        while True:
+            job = self._q.get()
+            if job is None:
+                return
+            with self._lock:
+                self._running += 1
+            job.started = self.clock()
+            job.status = "running"
+            metrics.observe("jobs.wait", (job.started - job.created) * 1000.0)
+            result, error = None, None
+            try:
+                result = self.runner(job.params, job.push)
+            except Exception as e:
+                error = f"Search failed: {e}"
+            with job.cond:
+                job.finished = self.clock()
+                job.result, job.error = result, error
+                job.status = "done" if error is None else "error"
+                job.cond.notify_all()
+            metrics.observe("jobs.run", (job.finished - job.started) * 1000.0)
+            with self._lock:
+                self._running -= 1
+                self._stats["completed" if error is None else "failed"] += 1
+
+    def _prune(self):
+        now = self.clock()
+        with self._lock:
+            for jid in [j.id for j in self._jobs.values() if j.finished and now - j.finished > self.result_ttl]:
+                del self._jobs[jid]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            s = dict(self._stats)
+            s.update(workers=self.workers, max_queue=self.max_queue, queue_depth=self._q.qsize(),
+                     running=self._running, jobs_tracked=len(self._jobs))
+        snap = metrics.snapshot()
+        s["wait_ms"] = snap.get("jobs.wait")
+        s["run_ms"] = snap.get("jobs.run")
+        return s
+
+    def stop(self):
+        for _ in self._threads:
+            self._q.put(None)
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
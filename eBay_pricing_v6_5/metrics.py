@@ -0,0 +1,129 @@
+
+from __future__ import annotations
+import functools, threading, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# upper bounds (ms) of the latency buckets; the last bucket is open-ended
+BUCKETS_MS: Tuple[float, ...] = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    """Count/sum/min/max plus fixed latency buckets for one metric name."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS_MS):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, b in enumerate(self.bounds):
+            if value <= b:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def to_dict(self) -> Dict:
+        labels = [f"le_{b:g}" for b in self.bounds] + ["inf"]
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 3),
+            "avg_ms": round(self.sum / self.count, 3) if self.count else 0.0,
+            "min_ms": self.min,
+            "max_ms": self.max,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+_lock = threading.Lock()
+_hists: Dict[str, Histogram] = {}
+
+
+def observe(name: str, ms: float):
+    """Record one latency sample (milliseconds) under `name`."""
+    with _lock:
+        h = _hists.get(name)
+        if h is None:
+            h = _hists[name] = Histogram()
+        h.observe(ms)
+
+
+def snapshot() -> Dict[str, Dict]:
+    with _lock:
+        return {name: h.to_dict() for name, h in sorted(_hists.items())}
+
+
+def reset():
+    with _lock:
+        _hists.clear()
+
+
+# ---------- stage spans ----------
+class Trace:
+    """Per-lookup stage timings: count / total / max ms per span name (concurrent spans add up)."""
+
+    def __init__(self):
+        self.stages: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, ms: float):
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                self.stages[name] = [1, ms, ms]
+            else:
+                st[0] += 1
+                st[1] += ms
+                st[2] = max(st[2], ms)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: {"count": c, "total_ms": round(t, 1), "max_ms": round(m, 1)}
+                    for name, (c, t, m) in sorted(self.stages.items())}
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("metrics_trace", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time the block into the `name` histogram (and the current trace(), if any)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000.0
+        observe(name, ms)
+        tr = _trace.get()
+        if tr is not None:
+            tr.add(name, ms)
+
+
+def timed(name: str):
+    """Decorator: run an async function inside span(name)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+@contextmanager
+def trace():
+    """Collect the spans of this block (including tasks it starts) into a Trace."""
+    tr = Trace()
+    token = _trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _trace.reset(token)
@@ -0,0 +1,109 @@
+
+"""
+Pack-quantity detection from listing titles / detail text.
+
+All the patterns run as one precompiled regex: each pattern sits in its
+own lookahead branch at the start of the text, in priority order, so the
+first branch that matches anywhere wins (same result as trying them one by
+one with re.search) and its group number says which pattern it was.
+Results are memoized per lower-cased text.
+
+    python packqty.py        # micro-benchmark vs. the per-pattern loop
+"""
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+PACK_CACHE_SIZE = 65536
+
+WORD_NUM = {
+    "single": 1, "one": 1, "two": 2, "twin": 2, "double": 2, "duo": 2,
+    "three": 3, "triple": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10
+}
+
+# priority order: the first pattern that matches anywhere in the text decides
+DIGIT_PATTERNS = [
+    r"pack of\s*(\d+)",
+    r"(\d+)\s*-\s*pack\b",
+    r"(\d+)\s*pack\b",
+    r"(\d+)\s*pk\b",
+    r"(\d+)\s*count\b",
+    r"(\d+)\s*ct\b",
+    r"(\d+)\s*pcs\b",
+    r"(\d+)\s*pieces\b",
+    r"(\d+)\s*capsules\b",
+]
+WORD_PATTERN = r"\b{}[-\s]?pack\b"
+FALLBACK_PATTERNS = [
+    r"\b(\d+)\s*(?:pk|ct)\b",
+    r"\bx\s*(\d+)\b",
+]
+
+
+def _compile():
+    branches: List[str] = []
+    values: List[Optional[int]] = []   # per group: fixed value (word patterns) or None (read the digits)
+    for p in DIGIT_PATTERNS:
+        branches.append(p)
+        values.append(None)
+    for w, n in WORD_NUM.items():
+        branches.append("(" + WORD_PATTERN.format(re.escape(w)) + ")")
+        values.append(n)
+    for p in FALLBACK_PATTERNS:
+        branches.append(p)
+        values.append(None)
+    rx = re.compile("|".join(f"(?=.*?{b})" for b in branches), re.S)
+    assert rx.groups == len(values)
+    return rx, values
+
+
+PACK_RE, _GROUP_VALUES = _compile()
+
+
+@lru_cache(maxsize=PACK_CACHE_SIZE)
+def _detect(t: str) -> Optional[int]:
+    m = PACK_RE.match(t)
+    if not m:
+        return None
+    fixed = _GROUP_VALUES[m.lastindex - 1]
+    return fixed if fixed is not None else int(m.group(m.lastindex))
+
+
+def detect_pack_qty(text: str) -> Optional[int]:
+    if not text:
+        return None
+    return _detect(text.lower())
+
+
+if __name__ == "__main__":
+    import random, time
+
+    def legacy(text):
+        t = text.lower()
+        for pat in DIGIT_PATTERNS:
+            m = re.search(pat, t)
+            if m:
+                return int(m.group(1))
+        for w, n in WORD_NUM.items():
+            if re.search(rf"\b{re.escape(w)}[-\s]?pack\b", t):
+                return n
+        for pat in FALLBACK_PATTERNS:
+            m = re.search(pat, t)
+            if m:
+                return int(m.group(1))
+        return None
+
+    rng = random.Random(0)
+    parts = ["Brita", "Standard", "Water Filter", "Replacement", "Pitcher", "2 pack", "Pack of 6", "12ct",
+             "twin-pack", "x 3", "BPA free", "24 count", "Blue", "Large", "Model 35557"]
+    titles = [" ".join(rng.sample(parts, rng.randint(3, 8))) for _ in range(5000)]
+    assert [legacy(t) for t in titles] == [detect_pack_qty(t) for t in titles]
+    for label, fn in (("per-pattern loop", legacy), ("compiled, cold", lambda t: _detect.__wrapped__(t.lower())),
+                      ("compiled, cached", detect_pack_qty)):
+        t0 = time.perf_counter()
+        for _ in range(5):
+            for t in titles:
+                fn(t)
+        print(f"{label:18s} {(time.perf_counter() - t0) / (5 * len(titles)) * 1e6:.2f} us/title")
@@ -1,21 +1,10 @@
 
 from __future__ import annotations
-import math, statistics as stats, re
-from typing import List, Dict, Optional, Tuple, Set
+import math, statistics as stats
+from typing import List, Dict, Optional, Tuple
 
-# --- token utilities exposed for app.py ---
-STOP = set("for with the and of to by from in on a an new pack filter filters water size sizes large small medium".split())
-
-def tokens(s: str) -> Set[str]:
-    if not s:
-        return set()
-    t = re.sub(r"[^A-Za-z0-9]+", " ", s).lower().split()
-    return {w for w in t if len(w) > 2 and w not in STOP}
-
-def jaccard(a: Set[str], b: Set[str]) -> float:
-    if not a or not b:
-        return 0.0
-    return len(a & b) / float(len(a | b))
+# --- token utilities (one shared, memoized tokenizer; lives in tokenizer.py) ---
+from tokenizer import STOP, tokens, jaccard  # noqa: F401  (re-exported for callers/tests)
 
 # --- helper for mode-style cluster ---
 def _densest_window(xs: List[float], width: float = 10.0) -> Tuple[float, float]:
@@ -0,0 +1,402 @@
+
+"""
+Offline record/replay of Amazon and eBay pages, plus a scrape benchmark.
+
+Responses are kept in a fixture directory (index.json + one body file per
+request).  RecordPolicy and ReplayPolicy are drop-in route policies for
+BrowserPool (same interface as routing.RoutePolicy), so the real scraping
+code runs unchanged against recorded pages:
+
+    python replay.py record 012345678905 B000000001 --fixtures fixtures/   # live, saves pages
+    python replay.py synth --fixtures /tmp/fx --items 5                    # synthetic pages, no network
+    python replay.py bench --fixtures fixtures/ --repeat 3                 # offline benchmark
+
+The HTTP fast paths (httpfetch) are recorded and replayed through httpx
+transports over the same store.  The benchmark reports per-lookup
+scrape_multi latency, round trips (requests answered from fixtures, and
+misses), Python heap peak (tracemalloc) and process max RSS.
+"""
+from __future__ import annotations
+import argparse, asyncio, hashlib, json, os, random, sys, time, tracemalloc, urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+import httpfetch
+from routing import RoutePolicy
+
+FIXTURE_DIR = os.environ.get("PRICER_FIXTURES") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RECORD_TYPES = {"document", "xhr", "fetch", "script", "stylesheet"}
+# query parameters that change between visits without changing the page
+VOLATILE_PARAMS = {"ref", "ref_", "qid", "sr", "crid", "sprefix", "_trksid", "_trkparms", "hash", "amdata"}
+
+
+def fixture_key(method: str, url: str) -> str:
+    """Canonical request identity: method + host/path + sorted, non-volatile query."""
+    parts = urllib.parse.urlsplit(url)
+    query = sorted((k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS)
+    q = urllib.parse.urlencode(query)
+    return f"{method.upper()} {(parts.hostname or '').lower()}{parts.path or '/'}" + (f"?{q}" if q else "")
+
+
+class FixtureStore:
+    """Directory of recorded responses keyed by fixture_key()."""
+
+    def __init__(self, root: str = FIXTURE_DIR):
+        self.root = root
+        self.index: Dict[str, Dict] = {}
+        self.lookups: List[Dict] = []   # lookups recorded into this store: {"code", "title"}
+        path = os.path.join(root, "index.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.index = data.get("responses", {})
+            self.lookups = data.get("lookups", [])
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, method: str, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        ent = self.index.get(fixture_key(method, url))
+        if ent is None:
+            return None
+        with open(os.path.join(self.root, ent["file"]), "rb") as f:
+            body = f.read()
+        headers = {"content-type": ent.get("content_type") or "text/html; charset=utf-8"}
+        if ent.get("location"):
+            headers["location"] = ent["location"]
+        return ent["status"], headers, body
+
+    def put(self, method: str, url: str, status: int, content_type: str, body: bytes, location: Optional[str] = None):
+        key = fixture_key(method, url)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + ".body"
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(body)
+        self.index[key] = {"file": name, "status": status, "content_type": content_type, "url": url}
+        if location:
+            self.index[key]["location"] = location
+
+    def add_lookup(self, code: str, title: Optional[str] = None):
+        if not any(l["code"] == code for l in self.lookups):
+            self.lookups.append({"code": code, "title": title})
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"lookups": self.lookups, "responses": self.index}, f, indent=1, sort_keys=True)
+
+
+class ReplayPolicy(RoutePolicy):
+    """
+    Answers every request from a FixtureStore; requests with no fixture are
+    aborted (nothing reaches the network).  Blocked types/hosts are still
+    blocked first.  `latency_ms` adds a fixed delay per served response.
+    """
+
+    def __init__(self, store: FixtureStore, latency_ms: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.latency_ms = latency_ms
+        self.served = 0
+        self.missing = 0
+        self.missing_urls: List[str] = []
+
+    async def handle(self, route):
+        req = route.request
+        if self.should_block(req.resource_type, req.url):
+            self.blocked += 1
+            self.blocked_by_type[req.resource_type] = self.blocked_by_type.get(req.resource_type, 0) + 1
+            try:
+                await route.abort()
+            except Exception:
+                pass
+            return
+        hit = await self.lookup(req.method, req.url)
+        if hit is None:
+            try:
+                await route.abort("internetdisconnected")
+            except Exception:
+                pass
+            return
+        status, headers, body = hit
+        try:
+            await route.fulfill(status=status, headers=headers, body=body)
+        except Exception:
+            pass
+
+    async def lookup(self, method: str, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """Fixture for one request (counted as served or missing), after the simulated latency."""
+        hit = self.store.get(method, url)
+        if hit is None:
+            self.missing += 1
+            if len(self.missing_urls) < 50:
+                self.missing_urls.append(url)
+            return None
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        self.served += 1
+        return hit
+
+    async def install(self, context):
+        await context.route("**/*", self.handle)   # always, even with blocking disabled
+
+    def stats(self) -> Dict:
+        s = super().stats()
+        s.update(served=self.served, missing=self.missing, missing_urls=list(self.missing_urls))
+        return s
+
+
+class FixtureTransport(httpx.AsyncBaseTransport):
+    """httpx transport for httpfetch's fast paths, answering from the same ReplayPolicy (and counters)."""
+
+    def __init__(self, policy: ReplayPolicy):
+        self.policy = policy
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        hit = await self.policy.lookup(request.method, str(request.url))
+        if hit is None:
+            raise httpx.ConnectError("no fixture for this request", request=request)
+        status, headers, body = hit
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """httpx transport that forwards to the network and saves every response (redirect hops included)."""
+
+    def __init__(self, store: FixtureStore, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.store = store
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.recorded = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        resp = await self.inner.handle_async_request(request)
+        body = await httpx.Response(resp.status_code, headers=resp.headers, stream=resp.stream, request=request).aread()
+        self.store.put(request.method, str(request.url), resp.status_code, resp.headers.get("content-type", ""), body,
+                       location=resp.headers.get("location"))
+        self.recorded += 1
+        headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(resp.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class RecordPolicy(RoutePolicy):
+    """Lets requests through (after blocking) and saves RECORD_TYPES responses into a FixtureStore."""
+
+    def __init__(self, store: FixtureStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.recorded = 0
+
+    async def handle(self, route):
+        req = route.request
+        if self.should_block(req.resource_type, req.url):
+            self.blocked += 1
+            self.blocked_by_type[req.resource_type] = self.blocked_by_type.get(req.resource_type, 0) + 1
+            try:
+                await route.abort()
+            except Exception:
+                pass
+            return
+        self.allowed += 1
+        if req.resource_type not in RECORD_TYPES:
+            try:
+                await route.continue_()
+            except Exception:
+                pass
+            return
+        try:
+            resp = await route.fetch()
+            body = await resp.body()
+            self.store.put(req.method, req.url, resp.status, resp.headers.get("content-type", ""), body)
+            self.recorded += 1
+            await route.fulfill(response=resp, body=body)
+        except Exception:
+            try:
+                await route.continue_()
+            except Exception:
+                pass
+
+    async def install(self, context):
+        await context.route("**/*", self.handle)
+
+    def stats(self) -> Dict:
+        s = super().stats()
+        s["recorded"] = self.recorded
+        return s
+
+
+# ---------- synthetic fixtures ----------
+def _amazon_search_html(items: List[Dict]) -> str:
+    cards = "".join(
+        f'<div data-component-type="s-search-result" data-asin="{it["asin"]}"><h2><a href="/dp/{it["asin"]}">{it["title"]}</a></h2>'
+        f'<span class="a-price"><span class="a-offscreen">${it["price"]:.2f}</span></span></div>' for it in items)
+    return f'<html><body><div class="s-main-slot">{cards}</div></body></html>'
+
+
+def _amazon_product_html(it: Dict) -> str:
+    return (f'<html><head><title>{it["title"]}</title></head><body><span id="productTitle">{it["title"]}</span>'
+            f'<input type="hidden" id="ASIN" value="{it["asin"]}">'
+            f'<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">${it["price"]:.2f}</span></span></div>'
+            f'<table id="productDetails_techSpec_section_1"><tr><th>Unit Count</th><td>{it["pack"]}</td></tr></table>'
+            f'</body></html>')
+
+
+def _ebay_srp_html(rows: List[Dict]) -> str:
+    def ship(r):
+        return "Free shipping" if not r["ship"] else "+$%.2f shipping" % r["ship"]
+    items = "".join(
+        f'<li class="s-item"><a class="s-item__link" href="https://www.ebay.com/itm/{r["id"]}?hash=x">{r["title"]}</a>'
+        f'<span class="s-item__price">${r["price"]:.2f}</span><span class="s-item__shipping">{ship(r)}</span>'
+        f'<span class="SECONDARY_INFO">Brand New</span></li>' for r in rows)
+    return f'<html><body><ul class="srp-results">{items}</ul></body></html>'
+
+
+def _ebay_listing_html(r: Dict, code: str) -> str:
+    spec = f"<div>UPC: {code}</div>" if r["has_upc"] else "<div>UPC: Does not apply</div>"
+    return f'<html><body><h1 class="x-item-title">{r["title"]}</h1>{spec}</body></html>'
+
+
+def synth_fixtures(store: FixtureStore, n_items: int = 5, rows_per_query: int = 40, seed: int = 0) -> List[str]:
+    """Write a self-consistent set of Amazon/eBay pages for `n_items` made-up UPCs; returns the codes."""
+    from urllib.parse import quote_plus
+    rng = random.Random(seed)
+    brands = ["Acme", "Globex", "Initech", "Umbrella", "Hooli"]
+    nouns = ["Cordless Drill", "Water Pitcher", "Coffee Grinder", "LED Lantern", "Blender Jar"]
+    html = "text/html; charset=utf-8"
+    codes = []
+    for n in range(n_items):
+        code = f"0{rng.randint(10**10, 10**11 - 1)}"
+        asin = "B0" + "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(8))
+        title = f"{rng.choice(brands)} {rng.choice(nouns)} Model {rng.randint(100, 999)}"
+        amz = {"asin": asin, "title": title, "price": round(rng.uniform(15, 80), 2), "pack": 1}
+        store.put("GET", f"https://www.amazon.com/s?k={quote_plus(code)}", 200, html, _amazon_search_html([amz]).encode())
+        store.put("GET", f"https://www.amazon.com/dp/{asin}?psc=1", 200, html, _amazon_product_html(amz).encode())
+        rows = []
+        for i in range(rows_per_query):
+            similar = rng.random() < 0.7
+            rows.append({
+                "id": rng.randint(10**11, 10**12 - 1),
+                "title": (title if similar else f"{rng.choice(brands)} {rng.choice(nouns)}") + rng.choice(["", " New", " Sealed"]),
+                "price": round(amz["price"] * rng.uniform(0.7, 1.3), 2),
+                "ship": rng.choice([0.0, 0.0, round(rng.uniform(3, 9), 2)]),
+                "has_upc": similar and rng.random() < 0.5,
+            })
+        srp = _ebay_srp_html(rows).encode()
+        for q in (code, code.lstrip("0"), title):
+            base = f"https://www.ebay.com/sch/i.html?_nkw={quote_plus(q)}&rt=nc&LH_BIN=1&LH_PrefLoc=1&LH_ItemCondition=1000"
+            store.put("GET", base, 200, html, srp)
+        for r in rows:
+            store.put("GET", f"https://www.ebay.com/itm/{r['id']}", 200, html, _ebay_listing_html(r, code).encode())
+        store.add_lookup(code, None)
+        codes.append(code)
+    store.save()
+    return codes
+
+
+# ---------- record / bench ----------
+async def record(codes: List[str], fixtures: str, **scrape_kwargs) -> Dict:
+    from scraping import scrape_multi
+    from browser_pool import temporary_pool
+    store = FixtureStore(fixtures)
+    policy = RecordPolicy(store)
+    transport = RecordingTransport(store)
+    httpfetch.use_transport(transport)   # pages fetched by the HTTP fast paths are recorded too
+    try:
+        async with temporary_pool(route_policy=policy) as pool:
+            for code in codes:
+                await scrape_multi(code, None, pool=pool, **scrape_kwargs)
+                store.add_lookup(code, None)
+                store.save()
+    finally:
+        httpfetch.use_transport(None)
+    st = policy.stats()
+    st["recorded_http"] = transport.recorded
+    return st
+
+
+async def _bench_loop(lookups: List[Dict], policy: ReplayPolicy, repeat: int, samples: List[Dict], **scrape_kwargs):
+    from scraping import scrape_multi
+    from browser_pool import temporary_pool
+    async with temporary_pool(route_policy=policy) as pool:
+        await pool.start()
+        for _ in range(repeat):
+            for lk in lookups:
+                trips0 = policy.served + policy.missing
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                res = await scrape_multi(lk["code"], lk.get("title"), pool=pool, timings=True, **scrape_kwargs)
+                ms = (time.perf_counter() - t0) * 1000.0
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                samples.append({
+                    "code": lk["code"], "ms": round(ms, 1), "round_trips": policy.served + policy.missing - trips0,
+                    "rows": len(res["rows"]), "py_peak_kb": round(peak / 1024.0, 1),
+                    "stages": {k: v["total_ms"] for k, v in res["meta"].get("timings", {}).items()},
+                })
+
+
+async def bench(fixtures: str, repeat: int = 3, latency_ms: float = 0.0, codes: Optional[List[str]] = None,
+                **scrape_kwargs) -> Dict:
+    """Replay every recorded lookup `repeat` times against the fixtures; returns per-lookup stats."""
+    import resource
+    store = FixtureStore(fixtures)
+    lookups = [{"code": c, "title": None} for c in codes] if codes else store.lookups
+    policy = ReplayPolicy(store, latency_ms=latency_ms)
+    httpfetch.use_transport(FixtureTransport(policy))   # the HTTP fast paths replay too
+    samples: List[Dict] = []
+    try:
+        await _bench_loop(lookups, policy, repeat, samples, **scrape_kwargs)
+    finally:
+        httpfetch.use_transport(None)
+    lat = sorted(s["ms"] for s in samples)
+    return {
+        "lookups": len(samples),
+        "latency_ms_p50": lat[len(lat) // 2] if lat else None,
+        "latency_ms_p95": lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else None,
+        "round_trips_avg": round(sum(s["round_trips"] for s in samples) / len(samples), 1) if samples else None,
+        "py_peak_kb_max": max((s["py_peak_kb"] for s in samples), default=None),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "replay": policy.stats(),
+        "http": httpfetch.stats(),
+        "samples": samples,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Record/replay Amazon+eBay pages and benchmark scrape_multi offline.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("record", help="run live lookups and save the pages")
+    r.add_argument("codes", nargs="+")
+    s = sub.add_parser("synth", help="write synthetic fixtures (no network)")
+    s.add_argument("--items", type=int, default=5)
+    s.add_argument("--rows", type=int, default=40)
+    b = sub.add_parser("bench", help="replay recorded lookups and report latency/round trips/memory")
+    b.add_argument("--repeat", type=int, default=3)
+    b.add_argument("--latency-ms", type=float, default=0.0, help="simulated network delay per response")
+    b.add_argument("--codes", nargs="*", default=None, help="lookups to run (default: all recorded)")
+    b.add_argument("--json", action="store_true", help="print the full result as JSON")
+    for p in (r, s, b):
+        p.add_argument("--fixtures", default=FIXTURE_DIR)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "record":
+        print(json.dumps(asyncio.run(record(args.codes, args.fixtures, attempts=1)), indent=1))
+    elif args.cmd == "synth":
+        codes = synth_fixtures(FixtureStore(args.fixtures), n_items=args.items, rows_per_query=args.rows)
+        print(f"wrote fixtures for {len(codes)} lookups to {args.fixtures}")
+    else:
+        st = asyncio.run(bench(args.fixtures, repeat=args.repeat, latency_ms=args.latency_ms, codes=args.codes, attempts=1))
+        if args.json:
+            print(json.dumps(st, indent=1))
+        else:
+            print(f"{st['lookups']} lookups: p50 {st['latency_ms_p50']} ms, p95 {st['latency_ms_p95']} ms, "
+                  f"{st['round_trips_avg']} round trips/lookup, py heap peak {st['py_peak_kb_max']} KB, "
+                  f"max RSS {st['max_rss_kb']} KB, misses {st['replay']['missing']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+
+"""
+Adaptive retry scheduling for the eBay query loop in scrape_multi.
+
+One RetryScheduler per lookup holds a single retry budget shared by every
+query of that lookup.  After each fetch it records how many listing URLs
+were new to that query; a query stops retrying once a retry brings back
+only URLs it already had, and every retry waits an exponential backoff with
+jitter first.  Novelty is per query, not per lookup, so it does not depend
+on which concurrent query finished first.  Each outcome is logged (logger
+"retry") and kept in `events` so `summary()` can go into the lookup's meta
+for tuning.
+
+    sched = RetryScheduler(budget=5)
+    sched.observe(q, rows)
+    while len(rows_so_far) < ENOUGH_ROWS and await sched.should_retry(q):
+        sched.observe(q, await fetch(q))
+"""
+from __future__ import annotations
+import asyncio, logging, random
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import metrics
+
+log = logging.getLogger("retry")
+
+RETRY_BASE_DELAY_S = 0.5    # first retry waits about this long
+RETRY_MAX_DELAY_S = 4.0     # backoff cap
+RETRY_JITTER = 0.5          # each delay is cut by a random 0..50%
+MAX_EVENTS = 200            # outcomes kept per lookup
+
+
+class RetryScheduler:
+    def __init__(self, budget: int, base_delay: float = RETRY_BASE_DELAY_S, max_delay: float = RETRY_MAX_DELAY_S,
+                 jitter: float = RETRY_JITTER, rng: Optional[random.Random] = None,
+                 sleep: Callable[[float], "asyncio.Future"] = asyncio.sleep):
+        self.budget = max(0, budget)
+        self.used = 0
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+        self.seen: Set[str] = set()              # every URL of the lookup (for the summary)
+        self.seen_by: Dict[str, Set[str]] = {}   # URLs per query, what novelty is judged against
+        self.attempts: Dict[str, int] = {}     # fetches per query
+        self.last_new: Dict[str, int] = {}     # new URLs from the query's latest fetch
+        self.last_rows: Dict[str, int] = {}    # rows from the query's latest fetch
+        self.events: List[Dict] = []
+        self.stops = {"duplicates": 0, "budget": 0}
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.used
+
+    def _event(self, **ev):
+        if len(self.events) < MAX_EVENTS:
+            self.events.append(ev)
+
+    def observe(self, key: str, rows: Iterable[Dict]) -> int:
+        """Record one fetch of query `key`; returns how many of its URLs that query had not returned before."""
+        rows = list(rows or [])
+        urls = {r.get("url") for r in rows if r.get("url")}
+        mine = self.seen_by.setdefault(key, set())
+        new = len(urls - mine)
+        mine |= urls
+        self.seen |= urls
+        n = self.attempts[key] = self.attempts.get(key, 0) + 1
+        self.last_new[key], self.last_rows[key] = new, len(rows)
+        self._event(query=key, attempt=n, rows=len(rows), new_urls=new)
+        log.debug("query %r attempt %d: %d rows, %d new urls", key, n, len(rows), new)
+        return new
+
+    def delay(self, retry_no: int) -> float:
+        """Backoff before the query's `retry_no`-th retry (1-based): capped exponential, minus jitter."""
+        d = min(self.max_delay, self.base_delay * (2 ** max(0, retry_no - 1)))
+        return d * (1.0 - self.jitter * self.rng.random())
+
+    async def should_retry(self, key: str) -> bool:
+        """
+        Whether query `key` gets another fetch.  No when its last fetch
+        returned rows but no new URLs, or the lookup's budget is spent;
+        otherwise one retry is taken from the budget and the backoff slept.
+        """
+        if self.last_rows.get(key) and not self.last_new.get(key):
+            self.stops["duplicates"] += 1
+            self._event(query=key, stop="duplicates")
+            log.info("query %r: stop after %d attempts, only duplicate urls", key, self.attempts.get(key, 0))
+            return False
+        if self.remaining <= 0:
+            self.stops["budget"] += 1
+            self._event(query=key, stop="budget")
+            log.info("query %r: stop after %d attempts, retry budget (%d) spent", key, self.attempts.get(key, 0), self.budget)
+            return False
+        self.used += 1
+        wait = self.delay(self.attempts.get(key, 1))
+        self._event(query=key, retry=self.attempts.get(key, 1), wait_s=round(wait, 3))
+        log.info("query %r: retry %d in %.2fs (%d/%d of budget used)", key, self.attempts.get(key, 1), wait, self.used, self.budget)
+        with metrics.span("ebay.retry_wait"):
+            await self.sleep(wait)
+        return True
+
+    def summary(self) -> Dict:
+        return {
+            "budget": self.budget,
+            "used": self.used,
+            "stopped_duplicates": self.stops["duplicates"],
+            "stopped_budget": self.stops["budget"],
+            "unique_urls": len(self.seen),
+            "events": list(self.events),
+        }
@@ -0,0 +1,113 @@
+
+from __future__ import annotations
+import os, urllib.parse
+from typing import Dict, Iterable, Mapping, Optional
+
+# Resource types the scrapers never read.  Stylesheets stay allowed: the
+# price/visibility checks rely on computed styles.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "texttrack", "manifest"}
+
+# Third-party ad / analytics hosts (suffix match).
+BLOCKED_HOSTS = {
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "criteo.com",
+    "criteo.net",
+    "facebook.net",
+    "facebook.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "taboola.com",
+    "outbrain.com",
+    "bing.com",
+    "hotjar.com",
+    "newrelic.com",
+    "nr-data.net",
+}
+
+
+class RoutePolicy:
+    """
+    Request-routing policy installed on every pooled browser context.
+
+    Requests for a blocked resource type or a blocked third-party host are
+    aborted; everything else continues.  Blocked/allowed counters (overall
+    and per resource type) are kept for the stats endpoint.
+    """
+
+    def __init__(self, block_types: Optional[Iterable[str]] = None, block_hosts: Optional[Iterable[str]] = None, enabled: bool = True):
+        self.block_types = set(BLOCKED_RESOURCE_TYPES if block_types is None else block_types)
+        self.block_hosts = {h.lower().lstrip(".") for h in (BLOCKED_HOSTS if block_hosts is None else block_hosts)}
+        self.enabled = enabled
+        self.blocked = 0
+        self.allowed = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    def _host_blocked(self, url: str) -> bool:
+        host = (urllib.parse.urlsplit(url).hostname or "").lower()
+        if not host:
+            return False
+        parts = host.split(".")
+        return any(".".join(parts[i:]) in self.block_hosts for i in range(len(parts) - 1))
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if not self.enabled:
+            return False
+        if resource_type in self.block_types:
+            return True
+        return self._host_blocked(url)
+
+    async def handle(self, route):
+        req = route.request
+        rtype = req.resource_type
+        if self.should_block(rtype, req.url):
+            self.blocked += 1
+            self.blocked_by_type[rtype] = self.blocked_by_type.get(rtype, 0) + 1
+            try:
+                await route.abort()
+            except Exception:
+                pass
+            return
+        self.allowed += 1
+        try:
+            await route.continue_()
+        except Exception:
+            pass
+
+    async def install(self, context):
+        if self.enabled:
+            await context.route("**/*", self.handle)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "blocked": self.blocked,
+            "allowed": self.allowed,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+def _env_list(raw: Optional[str]) -> Optional[set]:
+    if raw is None:
+        return None   # unset: keep the default list
+    raw = raw.strip()
+    return set() if raw in ("", "0") else {x.strip() for x in raw.split(",") if x.strip()}
+
+
+def policy_from_env(env: Optional[Mapping[str, str]] = None) -> RoutePolicy:
+    """
+    RoutePolicy for the runtime, batch runs and one-off pools, from the
+    environment: PRICER_BLOCK=0 routes nothing; PRICER_BLOCK_RESOURCES and
+    PRICER_BLOCK_HOSTS replace the default lists (comma-separated, empty or
+    0 = block none of that kind).
+    """
+    env = os.environ if env is None else env
+    return RoutePolicy(block_types=_env_list(env.get("PRICER_BLOCK_RESOURCES")),
+                       block_hosts=_env_list(env.get("PRICER_BLOCK_HOSTS")),
+                       enabled=env.get("PRICER_BLOCK", "1") != "0")
@@ -0,0 +1,138 @@
+
+from __future__ import annotations
+import asyncio, threading
+from concurrent.futures import Future
+from typing import Optional, Dict, Callable, Awaitable
+
+from browser_pool import BrowserPool, POOL_SIZE, CONTEXT_MAX_USES
+from routing import RoutePolicy, policy_from_env
+
+JOB_TIMEOUT_S = 300.0  # upper bound a Flask handler waits on one scrape
+
+
+class ScrapeRuntime:
+    """
+    Background thread that owns one asyncio loop, one Playwright driver and
+    one BrowserPool for the whole process.  Other threads hand it coroutine
+    factories via `submit()` and wait on the returned futures, so many Flask
+    requests share the same driver and browser at once.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, max_uses: int = CONTEXT_MAX_USES, headless: bool = True, play_factory=None, route_policy: Optional[RoutePolicy] = None):
+        if play_factory is None:
+            from playwright.async_api import async_playwright
+            play_factory = async_playwright
+        self._play_factory = play_factory
+        self.route_policy = route_policy if route_policy is not None else policy_from_env()
+        self.pool_size = pool_size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pool: Optional[BrowserPool] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._startup_error: Optional[BaseException] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._jobs_submitted = 0
+        self._jobs_running = 0
+
+    def start(self) -> "ScrapeRuntime":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._ready.clear()
+                self._startup_error = None
+                self._thread = threading.Thread(target=self._run, name="scrape-runtime", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise RuntimeError(f"scrape runtime failed to start: {self._startup_error}")
+        return self
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        try:
+            loop.run_until_complete(self._main())
+        finally:
+            loop.close()
+            self.loop = None
+
+    async def _main(self):
+        self._stop = asyncio.Event()
+        try:
+            async with self._play_factory() as play:
+                self.pool = BrowserPool(play, size=self.pool_size, max_uses=self.max_uses, headless=self.headless,
+                                        route_policy=self.route_policy)
+                await self.pool.start()
+                self._ready.set()
+                await self._stop.wait()
+                await self.pool.close()
+        except Exception as e:
+            self._startup_error = e
+        finally:
+            self.pool = None
+            self._ready.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self.pool is not None
+
+    def submit(self, job: Callable[[BrowserPool], Awaitable]) -> Future:
+        """Schedule `job(pool)` on the runtime loop; returns a concurrent Future."""
+        if not self.running:
+            self.start()
+        self._jobs_submitted += 1
+
+        async def wrapped():
+            self._jobs_running += 1
+            try:
+                return await job(self.pool)
+            finally:
+                self._jobs_running -= 1
+
+        return asyncio.run_coroutine_threadsafe(wrapped(), self.loop)
+
+    def run(self, job: Callable[[BrowserPool], Awaitable], timeout: Optional[float] = JOB_TIMEOUT_S):
+        fut = self.submit(job)
+        try:
+            return fut.result(timeout=timeout)
+        except BaseException:
+            fut.cancel()
+            raise
+
+    def stats(self) -> Dict:
+        s = {"running": self.running, "jobs_submitted": self._jobs_submitted, "jobs_running": self._jobs_running}
+        if self.pool is not None:
+            s["pool"] = self.pool.stats()
+        return s
+
+    def stop(self, timeout: float = 10.0):
+        loop, stop = self.loop, self._stop
+        if loop is not None and stop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+
+_runtime: Optional[ScrapeRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> ScrapeRuntime:
+    """Process-wide runtime, started on first use."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = ScrapeRuntime()
+            import atexit
+            atexit.register(_runtime.stop)
+    return _runtime.start()
+
+
+def runtime_stats() -> Optional[Dict]:
+    """Stats of the process-wide runtime without starting it (None before first use)."""
+    rt = _runtime
+    return rt.stats() if rt is not None else None
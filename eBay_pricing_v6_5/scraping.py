@@ -1,15 +1,42 @@
 
 from __future__ import annotations
-import asyncio, re, urllib.parse
-from typing import Optional, Dict, List, Tuple, Set
+import asyncio, os, re, time, urllib.parse
+from typing import Awaitable, Callable, Optional, Dict, List
 from urllib.parse import quote_plus
-from playwright.async_api import async_playwright
+from browser_pool import temporary_pool
+from routing import policy_from_env
+import metrics
+from tokenizer import STOP, tokens, token_ids, jaccard  # noqa: F401  (STOP/tokens/jaccard re-exported for callers/tests)
+from simindex import SimilarityIndex
+from retry import RetryScheduler
+from decision import StreamingDecision
+from packqty import detect_pack_qty
+import httpfetch
+from httpfetch import DESKTOP_UA
+from selectolax.lexbor import LexborHTMLParser
 
 PRICE_RE = re.compile(r"\$?\s*([0-9]{1,5}(?:\.[0-9]{1,2})?)")
 ASIN_RE = re.compile(r"(?:/dp/|/gp/product/)([A-Z0-9]{10})", re.I)
 EBAY_ITM_RE = re.compile(r"/itm/(\d{11,14})")
 
-STOP = set("for with the and of to by from in on a an new pack filters filter water large small medium size sizes 2 3 4 5 6 7 8 box".split())
+AMAZON_CONTEXT = {
+    "user_agent": DESKTOP_UA,
+    "locale": "en-US",
+    "timezone_id": "America/Los_Angeles",
+    "extra_http_headers": {"Accept-Language": "en-US,en;q=0.9"},
+}
+EBAY_CONTEXT = {"user_agent": DESKTOP_UA}
+
+NAV_WAIT_STATES = ("commit", "domcontentloaded", "load", "networkidle")   # Playwright's goto(wait_until=...)
+
+def _nav_wait_from_env(env=None) -> str:
+    raw = ((os.environ if env is None else env).get("PRICER_NAV_WAIT") or "domcontentloaded").strip().lower()
+    if raw not in NAV_WAIT_STATES:
+        raise ValueError(f"PRICER_NAV_WAIT must be one of {', '.join(NAV_WAIT_STATES)}, got {raw!r}")
+    return raw
+
+# "domcontentloaded" = DOM-ready only (prices/cards are server-rendered); PRICER_NAV_WAIT=load for full page loads
+NAV_WAIT_UNTIL = _nav_wait_from_env()
 
 def normalize_upc(s: str) -> str:
     if not s:
@@ -17,22 +44,6 @@ def normalize_upc(s: str) -> str:
     digits = re.sub(r"\D", "", s)
     return digits.lstrip("0")
 
-def tokens(s: str) -> Set[str]:
-    if not s:
-        return set()
-    t = re.sub(r"[^A-Za-z0-9]+"," ", s).lower().split()
-    return {w for w in t if len(w) > 2 and w not in STOP}
-
-def jaccard(a: Set[str], b: Set[str]) -> float:
-    if not a or not b: return 0.0
-    return len(a & b) / float(len(a | b))
-
-WORD_NUM = {
-    "single": 1, "one": 1, "two": 2, "twin": 2, "double": 2, "duo": 2,
-    "three": 3, "triple": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
-    "eight": 8, "nine": 9, "ten": 10
-}
-
 def parse_money(text: str) -> Optional[float]:
     if not text:
         return None
@@ -50,44 +61,6 @@ def extract_asin_from_url(url: str) -> Optional[str]:
     m = ASIN_RE.search(url)
     return m.group(1).upper() if m else None
 
-def detect_pack_qty(text: str) -> Optional[int]:
-    if not text:
-        return None
-    t = text.lower()
-    for pat in [
-        r"pack of\s*(\d+)",
-        r"(\d+)\s*-\s*pack\b",
-        r"(\d+)\s*pack\b",
-        r"(\d+)\s*pk\b",
-        r"(\d+)\s*count\b",
-        r"(\d+)\s*ct\b",
-        r"(\d+)\s*pcs\b",
-        r"(\d+)\s*pieces\b",
-        r"(\d+)\s*capsules\b",
-    ]:
-        m = re.search(pat, t)
-        if m:
-            try:
-                return int(m.group(1))
-            except Exception:
-                pass
-    for w, n in WORD_NUM.items():
-        if re.search(rf"\b{re.escape(w)}[-\s]?pack\b", t):
-            return n
-    m = re.search(r"\b(\d+)\s*(?:pk|ct)\b", t)
-    if m:
-        try:
-            return int(m.group(1))
-        except Exception:
-            pass
-    m = re.search(r"\bx\s*(\d+)\b", t)
-    if m:
-        try:
-            return int(m.group(1))
-        except Exception:
-            pass
-    return None
-
 async def _dismiss(page):
     for name in ["Accept", "I agree", "Got it", "Accept all", "OK"]:
         try:
@@ -97,53 +70,162 @@ async def _dismiss(page):
         except Exception:
             pass
 
-async def _extract_until(page, selectors: List[str], total_ms: int = 8000) -> Optional[float]:
-    step = 400
-    waited = 0
-    while waited <= total_ms:
-        for sel in selectors:
-            try:
-                el = page.locator(sel)
-                if await el.first.is_visible(timeout=300):
-                    txt = (await el.first.inner_text()) or ""
-                    val = parse_money(txt)
-                    if val is not None:
-                        return val
-            except Exception:
-                continue
-        await page.wait_for_timeout(step)
-        waited += step
+def _first_price(texts: List[str]) -> Optional[float]:
+    for txt in texts or []:
+        val = parse_money(txt or "")
+        if val is not None:
+            return val
     return None
 
+# Resolves with the first visible selector text that carries a digit (i.e. a price).
+FIRST_PRICE_TEXT_JS = """
+(selectors) => {
+  for (const sel of selectors) {
+    let el = null;
+    try { el = document.querySelector(sel); } catch (e) { continue; }
+    if (el && el.getClientRects().length > 0 && getComputedStyle(el).visibility !== "hidden") {
+      const txt = (el.innerText || el.textContent || "").trim();
+      if (/[0-9]/.test(txt)) return txt;
+    }
+  }
+  return null;
+}
+"""
+
+async def _extract_until(page, selectors: List[str], total_ms: int = 8000, metric: str = "price_wait") -> Optional[float]:
+    """
+    Wait (in-page, re-checked on every DOM mutation) until any selector shows
+    a price, then parse it.  The wait is recorded under `<metric>.hit` or
+    `<metric>.miss` in metrics.
+    """
+    t0 = time.perf_counter()
+    val = None
+    try:
+        handle = await page.wait_for_function(FIRST_PRICE_TEXT_JS, arg=selectors, polling="mutation", timeout=total_ms)
+        val = parse_money(await handle.json_value() or "")
+    except Exception:
+        val = None
+    metrics.observe(f"{metric}.{'hit' if val is not None else 'miss'}", (time.perf_counter() - t0) * 1000.0)
+    return val
+
 # ---------- Amazon helpers (unchanged from your current build) ----------
-async def _extract_amazon_price_from_product(page) -> Optional[float]:
-    selectors = [
-        "#corePrice_feature_div span.a-offscreen",
-        "#apex_desktop span.a-offscreen",
-        "#priceblock_ourprice",
-        "#priceblock_dealprice",
-        "#priceblock_saleprice",
-        "#tp_price_block_total_price_ww",
-        "#newBuyBoxPrice",
-        "[data-a-color='price'] .a-offscreen",
-        "span.a-price .a-offscreen",
-    ]
-    price = await _extract_until(page, selectors, total_ms=9000)
-    if price is not None:
-        return price
+AMAZON_PRICE_SELECTORS = [
+    "#corePrice_feature_div span.a-offscreen",
+    "#apex_desktop span.a-offscreen",
+    "#priceblock_ourprice",
+    "#priceblock_dealprice",
+    "#priceblock_saleprice",
+    "#tp_price_block_total_price_ww",
+    "#newBuyBoxPrice",
+    "[data-a-color='price'] .a-offscreen",
+    "span.a-price .a-offscreen",
+]
+AMAZON_DETAIL_SELECTORS = [
+    "table#productDetails_techSpec_section_1",
+    "table#productDetails_detailBullets_sections1",
+    "table.prodDetTable",
+    "#detailBullets_feature_div",
+]
+PACK_DETAIL_KEYS = ["Item Package Quantity", "Unit Count", "Count", "Pack"]
+
+# Title, ASIN, visible price texts, detail-table texts and buy box of a product page in one call.
+AMAZON_PRODUCT_JS = """
+(args) => {
+  const visible = (el) => !!el && el.getClientRects().length > 0 && getComputedStyle(el).visibility !== "hidden";
+  const text = (el) => (el.innerText || el.textContent || "").trim();
+  const first = (sel) => { try { return document.querySelector(sel); } catch (e) { return null; } };
+  const texts = (sels) => sels.map(first).filter(visible).map(text);
+  const t = first("#productTitle");
+  const asinEl = first("input#ASIN") || first("[data-asin]:not([data-asin=''])");
+  const bb = first("div#desktop_qualifiedBuyBox");
+  return {
+    title: visible(t) ? text(t) : "",
+    asin: asinEl ? (asinEl.value || asinEl.getAttribute("data-asin") || "") : "",
+    prices: texts(args.prices),
+    details: texts(args.details),
+    buybox: bb ? text(bb) : "",
+  };
+}
+"""
+
+async def _amazon_product_snapshot(page) -> Dict:
     try:
-        txt = await page.locator("div#desktop_qualifiedBuyBox").inner_text()
-        price = parse_money(txt)
+        return await page.evaluate(AMAZON_PRODUCT_JS, {"prices": AMAZON_PRICE_SELECTORS, "details": AMAZON_DETAIL_SELECTORS}) or {}
+    except Exception:
+        return {}
+
+def _inner_text(node, separator: str = "") -> str:
+    """Whitespace-collapsed text of a selectolax node (inline markup joins without a gap, like innerText)."""
+    return " ".join(node.text(separator=separator).split()) if node is not None else ""
+
+AMAZON_HIDDEN_CLASSES = {"aok-hidden", "a-hidden", "aok-invisible"}
+_NON_RENDERED_TAGS = {"script", "style", "template", "noscript", "head"}
+
+def _html_visible(node) -> bool:
+    """Static stand-in for the visibility test in AMAZON_PRODUCT_JS: nothing up the tree hides the node."""
+    while node is not None and node.tag not in ("html", "-document"):
+        if node.tag in _NON_RENDERED_TAGS:
+            return False
+        attrs = node.attributes
+        if "hidden" in attrs or AMAZON_HIDDEN_CLASSES.intersection((attrs.get("class") or "").split()):
+            return False
+        style = (attrs.get("style") or "").replace(" ", "").lower()
+        if "display:none" in style or "visibility:hidden" in style:
+            return False
+        node = node.parent
+    return True
+
+def _amazon_snapshot_from_html(html: str) -> Dict:
+    """AMAZON_PRODUCT_JS for server-rendered HTML: same keys, same selectors, static visibility."""
+    tree = LexborHTMLParser(html)
+    def first(sel):
+        try:
+            return tree.css_first(sel)
+        except Exception:
+            return None
+    def texts(sels, separator=""):
+        return [_inner_text(el, separator) for el in map(first, sels) if el is not None and _html_visible(el)]
+    t = first("#productTitle")
+    asin_el = first("input#ASIN") or first("[data-asin]:not([data-asin=''])")
+    bb = first("div#desktop_qualifiedBuyBox")
+    return {
+        "title": _inner_text(t) if t is not None and _html_visible(t) else "",
+        "asin": (asin_el.attributes.get("value") or asin_el.attributes.get("data-asin") or "") if asin_el is not None else "",
+        "prices": texts(AMAZON_PRICE_SELECTORS),
+        "details": texts(AMAZON_DETAIL_SELECTORS, " "),   # table cells must not run together
+        "buybox": _inner_text(bb, " "),
+    }
+
+def _pack_qty_from_details(texts: List[str]) -> Optional[int]:
+    for txt in texts or []:
+        txt = txt or ""
+        for key in PACK_DETAIL_KEYS:
+            m = re.search(rf"{key}[^0-9]*([0-9]+)", txt, re.I)
+            if m:
+                return int(m.group(1))
+        q = detect_pack_qty(txt)
+        if q:
+            return q
+    return None
+
+async def _extract_amazon_price_from_product(page, snap: Optional[Dict] = None) -> Optional[float]:
+    if snap:
+        price = _first_price(snap.get("prices"))
         if price is not None:
             return price
-    except Exception:
-        pass
+    price = await _extract_until(page, AMAZON_PRICE_SELECTORS, total_ms=9000, metric="amazon.price_wait")
+    if price is not None:
+        return price
+    # the buy box may only have rendered during the wait: snapshot again rather than read it separately
+    price = parse_money((await _amazon_product_snapshot(page)).get("buybox"))
+    if price is not None:
+        return price
     try:
         offers = page.locator("a#buybox-see-all-buying-choices-announce, a:has-text('See All Buying Options')")
         if await offers.first.is_visible(timeout=800):
             await offers.first.click()
             await page.wait_for_load_state("networkidle")
-            price = await _extract_until(page, ["span.a-price .a-offscreen"], total_ms=6000)
+            price = await _extract_until(page, ["span.a-price .a-offscreen"], total_ms=6000, metric="amazon.buying_options_wait")
             if price is not None:
                 return price
     except Exception:
@@ -156,137 +238,200 @@ async def _extract_from_offer_list_page(page) -> Optional[float]:
         "span.a-price .a-offscreen",
         "span.a-price-whole"
     ]
-    price = await _extract_until(page, selectors, total_ms=6000)
+    price = await _extract_until(page, selectors, total_ms=6000, metric="amazon.offer_list_wait")
     return price
 
-async def fetch_amazon_from_asin(play, asin: str, timeout_ms: int = 45000) -> Optional[Dict]:
+async def _amazon_product_http(url: str, asin: Optional[str], fallback_title: str = "") -> Optional[Dict]:
+    """
+    Amazon result for a product page read over plain HTTP, or None (not
+    readable, bot wall, no title or no listed price) so the caller can use
+    the browser.  Same price selectors and pack-qty table logic.
+    """
+    page = await httpfetch.get_page(url, metric="http.amazon_product")
+    if page is None:
+        return None
+    snap = _amazon_snapshot_from_html(page.text)
+    title = snap.get("title") or ""
+    price = _first_price(snap.get("prices"))
+    if not title or price is None:
+        return None
+    pack_qty = _pack_qty_from_details(snap.get("details"))
+    if not pack_qty:
+        pack_qty = detect_pack_qty(title or fallback_title)
+    return {"source": "Amazon", "title": title, "price": price, "shipping": 0.0, "total": price, "url": url, "asin": asin, "pack_qty": pack_qty}
+
+@metrics.timed("amazon.asin")
+async def fetch_amazon_from_asin(pool, asin: str, timeout_ms: int = 45000) -> Optional[Dict]:
     asin = (asin or "").strip().upper()
     if not asin or not re.fullmatch(r"[A-Z0-9]{10}", asin):
         return None
-    browser = await play.chromium.launch(headless=True)
-    context = await browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-        locale="en-US",
-        timezone_id="America/Los_Angeles",
-        extra_http_headers={"Accept-Language": "en-US,en;q=0.9"}
-    )
-    page = await context.new_page()
-    try:
-        url = f"https://www.amazon.com/dp/{asin}?psc=1"
-        await page.goto(url, timeout=timeout_ms)
-        await _dismiss(page)
-        title = ""
-        try:
-            t = page.locator("#productTitle")
-            if await t.is_visible(timeout=2500):
-                title = (await t.inner_text()).strip()
-        except Exception:
-            pass
+    url = f"https://www.amazon.com/dp/{asin}?psc=1"
+    if httpfetch.HTTP_FAST_PATH:
+        hit = await _amazon_product_http(url, asin)
+        if hit is not None:
+            return hit
+        httpfetch.note_fallback("amazon.product")
+    async with pool.context("amazon", **AMAZON_CONTEXT) as context:
+        page = await context.new_page()
+        with metrics.span("amazon.product_page"):
+            await page.goto(url, timeout=timeout_ms, wait_until=NAV_WAIT_UNTIL)
+            await _dismiss(page)
+        # title, prices and detail tables in one round trip, taken before any offer-page navigation
+        snap = await _amazon_product_snapshot(page)
+        title = snap.get("title") or ""
         if not title:
             try:
                 title = (await page.title()) or ""
             except Exception:
                 pass
-        price = await _extract_amazon_price_from_product(page)
+        pack_qty = _pack_qty_from_details(snap.get("details"))
+        price = await _extract_amazon_price_from_product(page, snap)
         if price is None:
             offers_url = f"https://www.amazon.com/gp/offer-listing/{asin}?f_new=true"
-            await page.goto(offers_url, timeout=timeout_ms)
-            await _dismiss(page)
-            price = await _extract_from_offer_list_page(page)
+            with metrics.span("amazon.offer_listing"):
+                await page.goto(offers_url, timeout=timeout_ms, wait_until=NAV_WAIT_UNTIL)
+                await _dismiss(page)
+                price = await _extract_from_offer_list_page(page)
         if price is None:
             mob_offers = f"https://www.amazon.com/gp/aw/ol/{asin}?condition=new"
-            await page.goto(mob_offers, timeout=timeout_ms)
-            await _dismiss(page)
-            price = await _extract_from_offer_list_page(page)
-        pack_qty = await _infer_pack_qty_from_page(page)
+            with metrics.span("amazon.offer_listing"):
+                await page.goto(mob_offers, timeout=timeout_ms, wait_until=NAV_WAIT_UNTIL)
+                await _dismiss(page)
+                price = await _extract_from_offer_list_page(page)
         if not pack_qty:
             pack_qty = detect_pack_qty(title)
         return {"source": "Amazon", "title": title, "price": price, "shipping": 0.0, "total": price, "url": url, "asin": asin, "pack_qty": pack_qty}
-    finally:
-        await context.close()
-        await browser.close()
 
-async def _amazon_search_cards(page) -> List[Dict]:
-    await page.wait_for_selector("div.s-main-slot div[data-component-type='s-search-result']", timeout=45000)
-    cards = await page.query_selector_all("div.s-main-slot div[data-component-type='s-search-result']")
+AMAZON_CARD_SEL = "div.s-main-slot div[data-component-type='s-search-result']"
+AMAZON_CARDS_JS = """
+(cards) => cards.map((c) => {
+  const q = (sel) => c.querySelector(sel);
+  const sp = q("span.s-label-popover-default, span.puis-sponsored-label-text");
+  const a = q("h2 a");
+  const pr = q("span.a-price > span.a-offscreen");
+  return {
+    sponsored: sp ? (sp.innerText || sp.textContent || "") : "",
+    href: a ? a.getAttribute("href") : null,
+    title: a ? (a.innerText || "") : "",
+    asin: c.getAttribute("data-asin") || "",
+    price: pr ? (pr.innerText || pr.textContent || "") : "",
+  };
+})
+"""
+
+def _amazon_cards_from_raw(raw: List[Dict]) -> List[Dict]:
+    """Turn raw search-card fields (see AMAZON_CARDS_JS) into candidates."""
     out = []
-    for c in cards:
-        try:
-            sp = await c.query_selector("span.s-label-popover-default, span.puis-sponsored-label-text")
-            if sp and "sponsored" in (await sp.inner_text()).strip().lower():
-                continue
-            a = await c.query_selector("h2 a")
-            href = await a.get_attribute("href") if a else None
-            title = (await a.inner_text()).strip() if a else ""
-            data_asin = (await c.get_attribute("data-asin")) or ""
-            asin = data_asin.strip().upper() if data_asin else None
-            price_span = await c.query_selector("span.a-price > span.a-offscreen")
-            price_text = (await price_span.inner_text()) if price_span else ""
-            card_price = parse_money(price_text)
-            full_url = f"https://www.amazon.com/dp/{asin}?psc=1" if asin else ("https://www.amazon.com"+href if href and href.startswith("/") else href)
-            out.append({"title": title, "url": full_url, "asin": asin, "card_price": card_price})
-        except Exception:
+    for c in raw or []:
+        if "sponsored" in (c.get("sponsored") or "").strip().lower():
             continue
+        href = c.get("href")
+        title = (c.get("title") or "").strip()
+        data_asin = c.get("asin") or ""
+        asin = data_asin.strip().upper() if data_asin else None
+        card_price = parse_money(c.get("price") or "")
+        full_url = f"https://www.amazon.com/dp/{asin}?psc=1" if asin else ("https://www.amazon.com"+href if href and href.startswith("/") else href)
+        out.append({"title": title, "url": full_url, "asin": asin, "card_price": card_price})
     return out
 
-async def fetch_amazon_by_search(play, query: str, timeout_ms: int = 60000, per_item_timeout_ms: int = 35000, max_candidates: int = 8) -> Optional[Dict]:
-    browser = await play.chromium.launch(headless=True)
-    context = await browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-        locale="en-US",
-        timezone_id="America/Los_Angeles",
-        extra_http_headers={"Accept-Language": "en-US,en;q=0.9"}
-    )
-    page = await context.new_page()
+async def _amazon_search_cards(page) -> List[Dict]:
+    await page.wait_for_selector(AMAZON_CARD_SEL, timeout=45000)
+    raw = await page.eval_on_selector_all(AMAZON_CARD_SEL, AMAZON_CARDS_JS)
+    return _amazon_cards_from_raw(raw)
+
+AMAZON_PROBE_CONCURRENCY = 3  # candidate product pages probed at once (1 = one by one)
+
+@metrics.timed("amazon.probe")
+async def _probe_amazon_candidate(context, cand: Dict, per_item_timeout_ms: int) -> Optional[Dict]:
+    if httpfetch.HTTP_FAST_PATH and cand.get("asin"):
+        try:
+            hit = await _amazon_product_http(cand["url"], cand.get("asin"), cand.get("title", ""))
+        except Exception:
+            hit = None
+        if hit is not None:
+            return hit
+        httpfetch.note_fallback("amazon.probe")
+    prod = await context.new_page()
     try:
+        target_url = cand["url"]
+        await prod.goto(target_url, timeout=per_item_timeout_ms, wait_until=NAV_WAIT_UNTIL)
+        await _dismiss(prod)
+        snap = await _amazon_product_snapshot(prod)
+        title = snap.get("title") or ""
+        price = await _extract_amazon_price_from_product(prod, snap)
+        pack_qty = _pack_qty_from_details(snap.get("details"))
+        if not pack_qty:
+            pack_qty = detect_pack_qty(title or cand.get("title",""))
+        if price is None and cand.get("asin"):
+            offers_url = f"https://www.amazon.com/gp/offer-listing/{cand['asin']}?f_new=true"
+            with metrics.span("amazon.offer_listing"):
+                await prod.goto(offers_url, timeout=per_item_timeout_ms, wait_until=NAV_WAIT_UNTIL)
+                await _dismiss(prod)
+                price = await _extract_from_offer_list_page(prod)
+        if price is None:
+            price = cand.get("card_price")
+        if price is None:
+            return None
+        return {
+            "source": "Amazon",
+            "title": title or cand.get("title",""),
+            "price": price, "shipping": 0.0, "total": price,
+            "url": target_url, "asin": cand.get("asin"), "pack_qty": pack_qty
+        }
+    except Exception:
+        return None
+    finally:
+        try: await prod.close()
+        except Exception: pass
+
+async def _first_in_priority(cands: List, probe, parallel: int = AMAZON_PROBE_CONCURRENCY):
+    """
+    Probe candidates with up to `parallel` in flight and return the first
+    non-None result in list order.  A candidate only wins once every
+    candidate ahead of it has come back empty; probes behind the winner
+    are cancelled.
+    """
+    parallel = max(1, parallel)
+    tasks: List[asyncio.Task] = []
+
+    def launch(i):
+        if i < len(cands):
+            tasks.append(asyncio.ensure_future(probe(cands[i])))
+
+    for i in range(min(parallel, len(cands))):
+        launch(i)
+    try:
+        for i in range(len(cands)):
+            try:
+                res = await tasks[i]
+            except Exception:
+                res = None
+            if res is not None:
+                return res
+            launch(i + parallel)
+        return None
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+@metrics.timed("amazon.search")
+async def fetch_amazon_by_search(pool, query: str, timeout_ms: int = 60000, per_item_timeout_ms: int = 35000, max_candidates: int = 8, parallel: int = AMAZON_PROBE_CONCURRENCY) -> Optional[Dict]:
+    async with pool.context("amazon", **AMAZON_CONTEXT) as context:
+        page = await context.new_page()
         url = f"https://www.amazon.com/s?k={quote_plus(query)}"
-        await page.goto(url, timeout=timeout_ms)
+        await page.goto(url, timeout=timeout_ms, wait_until=NAV_WAIT_UNTIL)
         await _dismiss(page)
         cards = await _amazon_search_cards(page)
         if not cards:
             return None
         cards = sorted(cards, key=lambda c: (0 if c.get("asin") else 1))
-        for cand in cards[:max_candidates]:
-            prod = await context.new_page()
-            try:
-                target_url = cand["url"]
-                await prod.goto(target_url, timeout=per_item_timeout_ms)
-                await _dismiss(prod)
-                title = ""
-                try:
-                    t = prod.locator("#productTitle")
-                    if await t.is_visible(timeout=1500):
-                        title = (await t.inner_text()).strip()
-                except Exception:
-                    pass
-                price = await _extract_amazon_price_from_product(prod)
-                pack_qty = await _infer_pack_qty_from_page(prod)
-                if not pack_qty:
-                    pack_qty = detect_pack_qty(title or cand.get("title",""))
-                if price is None and cand.get("asin"):
-                    offers_url = f"https://www.amazon.com/gp/offer-listing/{cand['asin']}?f_new=true"
-                    await prod.goto(offers_url, timeout=per_item_timeout_ms)
-                    await _dismiss(prod)
-                    price = await _extract_from_offer_list_page(prod)
-                if price is None:
-                    price = cand.get("card_price")
-                if price is None:
-                    continue
-                return {
-                    "source": "Amazon",
-                    "title": title or cand.get("title",""),
-                    "price": price, "shipping": 0.0, "total": price,
-                    "url": target_url, "asin": cand.get("asin"), "pack_qty": pack_qty
-                }
-            except Exception:
-                continue
-            finally:
-                try: await prod.close()
-                except Exception: pass
-        return None
-    finally:
-        await context.close()
-        await browser.close()
+        return await _first_in_priority(
+            cards[:max_candidates],
+            lambda cand: _probe_amazon_candidate(context, cand, per_item_timeout_ms),
+            parallel=parallel,
+        )
 
 # ---------- eBay ----------
 
@@ -334,10 +479,11 @@ def _text_has_code(text: str, norm_code: str) -> bool:
             return True
     return False
 
+@metrics.timed("ebay.verify")
 async def _listing_has_code(context, url: str, norm_code: str, timeout_ms: int = 8000) -> bool:
     page = await context.new_page()
     try:
-        await page.goto(url, timeout=timeout_ms)
+        await page.goto(url, timeout=timeout_ms, wait_until=NAV_WAIT_UNTIL)
         await _dismiss(page)
         body = await page.inner_text("body")
         return _text_has_code(body, norm_code)
@@ -346,6 +492,84 @@ async def _listing_has_code(context, url: str, norm_code: str, timeout_ms: int =
     finally:
         await page.close()
 
+def _page_text(html: str) -> str:
+    """Visible-ish text of an HTML document (scripts/styles dropped), for code matching."""
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style", "noscript", "template"])
+    body = tree.body
+    return body.text(separator=" ") if body is not None else ""
+
+@metrics.timed("ebay.verify_http")
+async def _listing_has_code_http(url: str, norm_code: str) -> Optional[bool]:
+    """Listing check over plain HTTP; None when the page could not be read (error / bot wall)."""
+    page = await httpfetch.get_page(url, metric="http.ebay_listing")
+    if page is None:
+        return None
+    return _text_has_code(_page_text(page.text), norm_code)
+
+def _listing_checker(pool, norm_code: str):
+    """check(url) for _verify_listing_codes: HTTP first, a pooled browser page when HTTP can't read it."""
+    async def check(url: str) -> bool:
+        ok = await _listing_has_code_http(url, norm_code)
+        if ok is not None:
+            return ok
+        httpfetch.note_fallback("ebay.listing")
+        async with pool.context("ebay", **EBAY_CONTEXT) as context:
+            return await _listing_has_code(context, url, norm_code)
+    return check
+
+VERIFY_CONCURRENCY = 4     # listing pages opened at once for UPC verification
+VERIFY_BUDGET_MS = 20000   # wall-clock budget for verification per search
+VERIFY_ENOUGH = 3          # stop once this many rows carry the code
+
+async def _verify_listing_codes(context, rows: List[Dict], norm_code: str,
+                                concurrency: int = VERIFY_CONCURRENCY,
+                                budget_ms: int = VERIFY_BUDGET_MS,
+                                enough: int = VERIFY_ENOUGH,
+                                check: Optional[Callable[[str], Awaitable[bool]]] = None) -> int:
+    """
+    Set has_code/code on rows whose listing page mentions `norm_code`.
+
+    Pages are checked `concurrency` at a time in row order.  Checking stops
+    when `enough` rows carry the code (title hits included) or the budget
+    runs out; rows not reached keep has_code=False.  Returns the number of
+    rows verified here.  `check(url)` replaces the browser page check (the
+    HTTP fast path passes one).
+    """
+    have = sum(1 for r in rows if r.get("has_code"))
+    pending = [r for r in rows if not r.get("has_code")]
+    if not norm_code or not pending or have >= enough:
+        return 0
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_check(r):
+        async with sem:
+            if check is not None:
+                return r, await check(r["url"])
+            return r, await _listing_has_code(context, r["url"], norm_code)
+
+    tasks = [asyncio.ensure_future(run_check(r)) for r in pending]
+    verified = 0
+    try:
+        for fut in asyncio.as_completed(tasks, timeout=budget_ms / 1000.0):
+            try:
+                r, ok = await fut
+            except asyncio.TimeoutError:
+                break
+            if ok:
+                r["has_code"] = True
+                r["code"] = norm_code
+                verified += 1
+                have += 1
+                if have >= enough:
+                    break
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return verified
+
 def _is_brand_new_only(cond_text: str) -> bool:
     if not cond_text:
         return False
@@ -359,6 +583,7 @@ def _is_brand_new_only(cond_text: str) -> bool:
         return False
     return t == "new" or t.startswith("brand new")
 
+@metrics.timed("ebay.scroll")
 async def _auto_scroll(page, steps: int = 8, delay_ms: int = 250):
     h = await page.evaluate("() => document.body.scrollHeight")
     step = max(300, int(h / steps))
@@ -368,103 +593,215 @@ async def _auto_scroll(page, steps: int = 8, delay_ms: int = 250):
         await page.evaluate(f"window.scrollTo(0, {pos});")
         await page.wait_for_timeout(delay_ms)
 
-async def fetch_ebay_query(play, query: str, condition: str = "new", timeout_ms: int = 22000, visible: bool = False, pages: int = 1, retries: int = 3, check_code: Optional[str] = None) -> List[Dict]:
+EBAY_ITEM_SEL = "li.s-item, div.s-item, div.s-item__wrapper"
+EBAY_CARDS_JS = """
+(items) => items.map((it) => {
+  const text = (sel) => { const el = it.querySelector(sel); return el ? (el.innerText || "") : null; };
+  const a = it.querySelector("a.s-item__link, a.s-item__title, h3.s-item__title a, a[href*='/itm/']");
+  return {
+    href: a ? a.getAttribute("href") : null,
+    title: a ? (a.innerText || "") : "",
+    badge: text("span.s-item__ad-badge-text"),
+    price: text("span.s-item__price") || "",
+    shipping: text("span.s-item__shipping, span.s-item__logisticsCost") || "",
+    condition: text("span.SECONDARY_INFO") || "",
+  };
+})
+"""
+
+EBAY_LINK_SEL = "a.s-item__link, a.s-item__title, h3.s-item__title a, a[href*='/itm/']"   # as in EBAY_CARDS_JS
+
+def _ebay_cards_from_html(html: str) -> List[Dict]:
+    """Same card fields as EBAY_CARDS_JS, read from server-rendered SRP HTML."""
+    cards: List[Dict] = []
+    for it in LexborHTMLParser(html).css(EBAY_ITEM_SEL):
+        def text(sel):
+            el = it.css_first(sel)
+            return _inner_text(el) if el is not None else None
+        a = it.css_first(EBAY_LINK_SEL)
+        cards.append({
+            "href": a.attributes.get("href") if a is not None else None,
+            "title": _inner_text(a),
+            "badge": text("span.s-item__ad-badge-text"),
+            "price": text("span.s-item__price") or "",
+            "shipping": text("span.s-item__shipping, span.s-item__logisticsCost") or "",
+            "condition": text("span.SECONDARY_INFO") or "",
+        })
+    return cards
+
+def _ebay_rows_from_cards(cards: List[Dict], query: str, condition: str = "new", norm_code: str = "") -> List[Dict]:
+    """Turn raw card fields (see EBAY_CARDS_JS) into result rows."""
+    out: List[Dict] = []
+    for c in cards:
+        url = _unwrap_ebay_url(c.get("href"))
+        if not url:
+            continue
+        title = c.get("title") or ""
+        if title and title.strip().lower().startswith("shop on ebay"):
+            continue
+        badge_text = (c.get("badge") or "").strip().lower()
+        if "sponsored" in badge_text:
+            continue
+        price_text = c.get("price") or ""
+        if " to " in price_text.lower():
+            continue
+        price = parse_money(price_text)
+        ship_text = c.get("shipping") or ""
+        if ship_text and "free" in ship_text.lower():
+            shipping = 0.0
+        else:
+            shipping = parse_money(ship_text)
+        total = None
+        if price is not None:
+            total = price + (shipping if shipping is not None else 0.0)
+        cond_text = c.get("condition") or ""
+        if condition.lower() == "new" and not _is_brand_new_only(cond_text):
+            continue
+        if total is None:
+            continue
+        row = {
+            "source": "eBay",
+            "query": query,
+            "title": title.strip(),
+            "price": price,
+            "shipping": shipping,
+            "total": total,
+            "condition": cond_text.strip(),
+            "url": url,
+            "has_code": False,
+        }
+        if norm_code and _text_has_code(title, norm_code):
+            row["has_code"] = True
+            row["code"] = norm_code
+        out.append(row)
+    return out
+
+def _ebay_search_url(query: str, condition: str = "new", page: int = 1) -> str:
+    url = f"https://www.ebay.com/sch/i.html?_nkw={quote_plus(query)}&rt=nc&LH_BIN=1&LH_PrefLoc=1"
+    if condition.lower() == "new":
+        url += "&LH_ItemCondition=1000"
+    return url + (f"&_pgn={page}" if page > 1 else "")
+
+async def _fetch_ebay_query_http(query: str, condition: str = "new", pages: int = 1, norm_code: str = "") -> Optional[List[Dict]]:
+    """
+    SRP pages over plain HTTP, parsed into the same rows as the browser path.
+    None means "use the browser": the first page failed, hit a bot wall or
+    had no item cards at all.  A later page that fails just ends the loop.
+    """
+    results: List[Dict] = []
+    for p in range(1, max(1, pages)+1):
+        page = await httpfetch.get_page(_ebay_search_url(query, condition, p), metric="http.ebay_search")
+        cards = _ebay_cards_from_html(page.text) if page is not None else []
+        if not cards:
+            if p == 1:
+                return None
+            break
+        results.extend(_ebay_rows_from_cards(cards, query, condition, norm_code))
+    return list({r["url"]: r for r in results}.values())
+
+@metrics.timed("ebay.query")
+async def fetch_ebay_query(pool, query: str, condition: str = "new", timeout_ms: int = 22000, pages: int = 1, retries: int = 3, check_code: Optional[str] = None) -> List[Dict]:
     """
     USA-only via LH_PrefLoc=1, non-sponsored, BIN only; brand new if condition=='new'.
-    Retries each page up to `retries` times before moving on.
+    Tries plain HTTP first (httpfetch.HTTP_FAST_PATH); the browser only runs
+    when that hits a bot wall or finds no items, and retries each page up to
+    `retries` times before moving on.
     """
-    browser = await play.chromium.launch(headless=(not visible))
-    context = await browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-    )
-    page = await context.new_page()
     results: List[Dict] = []
     norm_code = normalize_upc(check_code) if check_code else ""
-    try:
-        base = f"https://www.ebay.com/sch/i.html?_nkw={quote_plus(query)}&rt=nc&LH_BIN=1&LH_PrefLoc=1"
-        if condition.lower() == "new":
-            base += "&LH_ItemCondition=1000"
+    if httpfetch.HTTP_FAST_PATH:
+        rows = await _fetch_ebay_query_http(query, condition, pages, norm_code)
+        if rows is not None:
+            if norm_code:
+                await _verify_listing_codes(None, rows, norm_code, check=_listing_checker(pool, norm_code))
+            return rows
+        httpfetch.note_fallback("ebay.search")
+    async with pool.context("ebay", **EBAY_CONTEXT) as context:
+        page = await context.new_page()
         for p in range(1, max(1, pages)+1):
-            url = base + (f"&_pgn={p}" if p > 1 else "")
+            url = _ebay_search_url(query, condition, p)
             found_page_items = False
             for attempt in range(retries):
-                await page.goto(url, timeout=timeout_ms)
-                # eagerly wait for items or failover after scroll
-                try:
-                    await page.wait_for_selector("ul.srp-results", timeout=timeout_ms)
-                except Exception:
-                    pass
+                with metrics.span("ebay.page"):
+                    await page.goto(url, timeout=timeout_ms, wait_until=NAV_WAIT_UNTIL)
+                    # eagerly wait for items or failover after scroll
+                    try:
+                        await page.wait_for_selector("ul.srp-results", timeout=timeout_ms)
+                    except Exception:
+                        pass
                 await _auto_scroll(page)
-                items = await page.query_selector_all("li.s-item, div.s-item, div.s-item__wrapper")
-                if items:
+                # every card's fields in one round trip
+                cards = await page.eval_on_selector_all(EBAY_ITEM_SEL, EBAY_CARDS_JS)
+                if cards:
                     found_page_items = True
                     break
             if not found_page_items:
                 continue
-            for it in items:
-                title_el = await it.query_selector("a.s-item__link, a.s-item__title, h3.s-item__title a, a[href*='/itm/']")
-                if not title_el:
-                    continue
-                raw_url = await title_el.get_attribute("href")
-                url = _unwrap_ebay_url(raw_url)
-                if not url:
-                    continue
-                title = (await title_el.inner_text()) if title_el else ""
-                if title and title.strip().lower().startswith("shop on ebay"):
-                    continue
-                badge = await it.query_selector("span.s-item__ad-badge-text")
-                if badge:
-                    try:
-                        badge_text = (await badge.inner_text()).strip().lower()
-                        if "sponsored" in badge_text:
-                            continue
-                    except Exception:
-                        pass
-                price_el = await it.query_selector("span.s-item__price")
-                price_text = (await price_el.inner_text()) if price_el else ""
-                if " to " in (price_text or "").lower():
-                    continue
-                price = parse_money(price_text)
-                ship_el = await it.query_selector("span.s-item__shipping, span.s-item__logisticsCost")
-                ship_text = (await ship_el.inner_text()) if ship_el else ""
-                if ship_text and "free" in ship_text.lower():
-                    shipping = 0.0
-                else:
-                    shipping = parse_money(ship_text)
-                total = None
-                if price is not None:
-                    total = price + (shipping if shipping is not None else 0.0)
-                cond_el = await it.query_selector("span.SECONDARY_INFO")
-                cond_text = (await cond_el.inner_text()) if cond_el else ""
-                if condition.lower() == "new" and not _is_brand_new_only(cond_text or ""):
-                    continue
-                if total is not None:
-                    row = {
-                        "source": "eBay",
-                        "query": query,
-                        "title": (title or "").strip(),
-                        "price": price,
-                        "shipping": shipping,
-                        "total": total,
-                        "condition": (cond_text or "").strip(),
-                        "url": url,
-                        "has_code": False,
-                    }
-                    if norm_code:
-                        if _text_has_code(title or "", norm_code):
-                            row["has_code"] = True
-                            row["code"] = norm_code
-                        else:
-                            if await _listing_has_code(context, url, norm_code):
-                                row["has_code"] = True
-                                row["code"] = norm_code
-                    results.append(row)
+            results.extend(_ebay_rows_from_cards(cards, query, condition, norm_code))
         # de-dup by URL
         dedup = {r["url"]: r for r in results}
-        return list(dedup.values())
+        rows = list(dedup.values())
+        # code not in the title: look at the listing pages, in parallel and on a budget
+        if norm_code:
+            await _verify_listing_codes(context, rows, norm_code)
+        return rows
+
+EBAY_QUERY_CONCURRENCY = 3  # eBay query variants in flight at once
+ENOUGH_ROWS = 3             # stop issuing queries once this many rows are in hand
+
+async def _run_query_plan(queries: List[str], run_one, limit: int = EBAY_QUERY_CONCURRENCY, enough: int = ENOUGH_ROWS) -> List[Dict]:
+    """
+    Run `run_one(q, prior)` for every query with at most `limit` in flight.
+
+    `prior()` waits for the queries before `q` (in query order) and returns
+    their rows, so a query can gate its retries on the cumulative count the
+    way the old one-by-one loop did; its slot is given up while it waits.
+    Results are merged in query order, and as soon as the queries finished so
+    far (taken in order) add up to `enough` rows the remaining ones are
+    cancelled.  Given the same fetch results, the merged rows are the ones the
+    old loop produced, regardless of which fetch happens to finish first.
+    """
+    if not queries:
+        return []
+    sem = asyncio.Semaphore(max(1, limit))
+    tasks: List["asyncio.Future"] = []
+
+    async def rows_before(k: int) -> List[Dict]:
+        sem.release()
+        try:
+            got: List[Dict] = []
+            for t in tasks[:k]:
+                try:
+                    got.extend(await asyncio.shield(t))
+                except asyncio.CancelledError:
+                    if not t.cancelled():
+                        raise
+                except Exception:
+                    pass
+            return got
+        finally:
+            await sem.acquire()
+
+    async def guarded(k, q):
+        async with sem:
+            return await run_one(q, lambda: rows_before(k))
+
+    tasks.extend(asyncio.ensure_future(guarded(k, q)) for k, q in enumerate(queries))
+    rows: List[Dict] = []
+    try:
+        for t in tasks:
+            if len(rows) >= enough:
+                break
+            try:
+                rows.extend(await t)
+            except Exception:
+                continue
     finally:
-        await context.close()
-        await browser.close()
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return rows
 
 async def scrape_multi(
     code: str,
@@ -476,11 +813,95 @@ async def scrape_multi(
     retries: int = 3,
     attempts: int = 6,
     visible: bool = False,
+    pool=None,
+    query_concurrency: int = EBAY_QUERY_CONCURRENCY,
+    cache=None,
+    force_refresh: bool = False,
+    on_event: Optional[Callable[[str, Dict], None]] = None,
+    timings: bool = False,
+) -> Dict:
+    """
+    Amazon-first lookup followed by eBay comps.  Pass a long-lived `pool`
+    (see browser_pool.BrowserPool) to reuse one browser across lookups;
+    without one a temporary pool is started for this call only.
+
+    With a `cache` (see cache.ResultCache) the Amazon result and the eBay
+    rows are served from / stored into it under their own TTLs;
+    `force_refresh` skips the lookup but still stores fresh results.
+
+    `on_event(kind, payload)` is called as partial results arrive, from the
+    scraping loop: "amazon" ({"amazon": ...}) once the Amazon lookup is
+    settled, then "ebay" after every eBay batch with a provisional result
+    shaped like the return value ({"rows", "amazon", "meta"}, plus "query").
+
+    Every stage (browser launch, Amazon search/offer pages, eBay pages,
+    scrolling, listing verification, ...) is timed into metrics histograms;
+    with `timings=True` this lookup's per-stage totals are also returned
+    as meta["timings"].
+    """
+    with metrics.trace() as tr:
+        with metrics.span("scrape.total"):
+            result = await _scrape_cached(code, title, condition, use_amazon, pages, retries, attempts, visible,
+                                          pool, query_concurrency, cache, force_refresh, on_event)
+    if timings:
+        result["meta"] = dict(result.get("meta") or {}, timings=tr.to_dict())
+    return result
+
+async def _scrape_cached(code, title, condition, use_amazon, pages, retries, attempts, visible,
+                         pool, query_concurrency, cache, force_refresh, on_event) -> Dict:
+    amz_key = ebay_key = None
+    cached_amazon = cached_ebay = None
+    amazon_missed = False   # a recent lookup found no Amazon match (negative entry)
+    if cache is not None:
+        amz_key = cache.amazon_key(code)
+        ebay_key = cache.ebay_key(code, condition, pages)
+        if not force_refresh:
+            cached_amazon = cache.get("amazon", amz_key) if use_amazon else None
+            amazon_missed = use_amazon and cached_amazon is None and cache.get("amazon_miss", amz_key) is not None
+            cached_ebay = cache.get("ebay", ebay_key)
+        if cached_ebay is not None and (cached_amazon is not None or amazon_missed or not use_amazon):
+            meta = dict(cached_ebay.get("meta") or {})
+            meta["cache"] = {"amazon": "hit" if use_amazon else None, "ebay": "hit"}
+            result = {"rows": cached_ebay["rows"], "amazon": cached_amazon, "meta": meta}
+            _emit(on_event, "amazon", {"amazon": cached_amazon})
+            _emit(on_event, "ebay", {**result, "query": None})
+            return result
+
+    kwargs = dict(condition=condition, use_amazon=use_amazon and not amazon_missed, pages=pages, retries=retries,
+                  attempts=attempts, query_concurrency=query_concurrency, amazon_result=cached_amazon, on_event=on_event)
+    if pool is None:
+        async with temporary_pool(headless=(not visible), route_policy=policy_from_env()) as tmp:
+            result = await _scrape_with_pool(tmp, code, title, **kwargs)
+    else:
+        result = await _scrape_with_pool(pool, code, title, **kwargs)
+
+    if cache is not None:
+        if result["amazon"] and cached_amazon is None:
+            cache.put("amazon", amz_key, result["amazon"])
+        elif use_amazon and not result["amazon"] and not amazon_missed:
+            cache.put("amazon_miss", amz_key, True)
+        if result["rows"]:
+            cache.put("ebay", ebay_key, {"rows": result["rows"], "meta": dict(result["meta"])})
+        amazon_hit = cached_amazon is not None or amazon_missed
+        result["meta"]["cache"] = {"amazon": ("hit" if amazon_hit else "miss") if use_amazon else None, "ebay": "miss"}
+    return result
+
+async def _scrape_with_pool(
+    pool,
+    code: str,
+    title: Optional[str],
+    condition: str = "new",
+    use_amazon: bool = True,
+    pages: int = 1,
+    retries: int = 3,
+    attempts: int = 6,
+    query_concurrency: int = EBAY_QUERY_CONCURRENCY,
+    amazon_result: Optional[Dict] = None,
+    on_event: Optional[Callable[[str, Dict], None]] = None,
 ) -> Dict:
     normalized_code = normalize_upc(code)
-    async with async_playwright() as play:
-        amazon_result = None
-        if use_amazon:
+    with metrics.span("amazon.lookup"):
+        if use_amazon and amazon_result is None:
             asin_direct = None
             if code and code.startswith("http"):
                 asin_direct = extract_asin_from_url(code)
@@ -488,102 +909,129 @@ async def scrape_multi(
                 asin_direct = code.upper()
             if asin_direct:
                 try:
-                    amazon_result = await fetch_amazon_from_asin(play, asin_direct)
+                    amazon_result = await fetch_amazon_from_asin(pool, asin_direct)
                 except Exception:
                     amazon_result = None
             if not amazon_result and code:
                 try:
-                    amazon_result = await fetch_amazon_by_search(play, code)
+                    amazon_result = await fetch_amazon_by_search(pool, code)
                 except Exception:
                     amazon_result = None
             if not amazon_result and title:
                 try:
-                    amazon_result = await fetch_amazon_by_search(play, title)
+                    amazon_result = await fetch_amazon_by_search(pool, title)
                 except Exception:
                     amazon_result = None
 
-        expected_pack_qty = amazon_result.get("pack_qty") if amazon_result else None
-
-        rows: List[Dict] = []
-
-        # UPC-first queries
-        queries = []
-        if code:
-            queries.append(code)
-            stripped = normalize_upc(code)
-            if stripped and stripped != code:
-                queries.append(stripped)
-
-        # Fall back to Amazon title variants (with pack hints) if needed
-        amz_title = (amazon_result or {}).get("title") or title or ""
-        base_toks = tokens(amz_title)
-        if amz_title:
-            variants = [amz_title]
-            if expected_pack_qty and expected_pack_qty > 1:
-                variants += [f"{amz_title} {expected_pack_qty} pack",
-                             f"{amz_title} {expected_pack_qty}-pack",
-                             f"{amz_title} {expected_pack_qty}pk",
-                             f"pack of {expected_pack_qty} {amz_title}"]
-            queries += variants
-
-        # Run queries with attempts until we have a pool
-        for q in queries:
-            if len(rows) >= 3:
-                break
-            try:
-                batch = await fetch_ebay_query(play, q, condition=condition, visible=False, pages=pages, retries=retries, check_code=normalized_code)
-                rows.extend(batch)
-                # if still thin, try again up to 'attempts'
-                tries = 1
-                while len(rows) < 3 and tries < attempts:
-                    more = await fetch_ebay_query(play, q, condition=condition, visible=False, pages=pages, retries=retries, check_code=normalized_code)
-                    rows.extend(more)
-                    tries += 1
-            except Exception:
-                continue
+    expected_pack_qty = amazon_result.get("pack_qty") if amazon_result else None
+    _emit(on_event, "amazon", {"amazon": amazon_result})
 
-        # de-dup
-        dedup = {r["url"]: r for r in rows}
-        rows = list(dedup.values())
+    # UPC-first queries
+    queries = []
+    if code:
+        queries.append(code)
+        stripped = normalize_upc(code)
+        if stripped and stripped != code:
+            queries.append(stripped)
 
-        # apply pack qty filter and title similarity if we have an Amazon title
-        filtered: List[Dict] = []
-        for r in rows:
-            # pack filter
-            if expected_pack_qty:
-                q = detect_pack_qty(r.get("title") or "")
-                if q is not None and q != expected_pack_qty:
-                    continue
-                if q is None and expected_pack_qty > 1:
-                    continue
-            # title similarity (mild guard at this stage)
-            if base_toks:
-                sim = jaccard(base_toks, tokens(r.get("title") or ""))
-                if sim < 0.45:
-                    continue
-            filtered.append(r)
-
-        return {"rows": filtered or rows, "amazon": amazon_result, "meta": {"count": len(filtered or rows), "expected_pack_qty": expected_pack_qty, "normalized_code": normalized_code}}
-
-async def _infer_pack_qty_from_page(page) -> Optional[int]:
-    selectors = [
-        "table#productDetails_techSpec_section_1",
-        "table#productDetails_detailBullets_sections1",
-        "table.prodDetTable",
-        "#detailBullets_feature_div"
-    ]
-    for sel in selectors:
+    # Fall back to Amazon title variants (with pack hints) if needed
+    amz_title = (amazon_result or {}).get("title") or title or ""
+    if amz_title:
+        variants = [amz_title]
+        if expected_pack_qty and expected_pack_qty > 1:
+            variants += [f"{amz_title} {expected_pack_qty} pack",
+                         f"{amz_title} {expected_pack_qty}-pack",
+                         f"{amz_title} {expected_pack_qty}pk",
+                         f"pack of {expected_pack_qty} {amz_title}"]
+        queries += variants
+
+    sim_title = amz_title if token_ids(amz_title) else None
+
+    def meta_of(count: int) -> Dict:
+        return {"count": count, "expected_pack_qty": expected_pack_qty, "normalized_code": normalized_code, "sim_title": sim_title}
+
+    def result_of(rows: List[Dict]) -> Dict:
+        # de-dup, then pack qty / title similarity filter
+        rows = list({r["url"]: r for r in rows}.values())
+        filtered = _filter_rows(rows, amz_title, expected_pack_qty)
+        return {"rows": filtered or rows, "amazon": amazon_result, "meta": meta_of(len(filtered or rows))}
+
+    # Provisional suggestion for listeners: each fetched row (first copy of a URL) is filtered and
+    # folded into the incremental decision once, instead of re-running result_of()/decide() per batch.
+    seen_urls = set()
+    prov_all = StreamingDecision(amazon_result, code, sim_title)
+    prov_filtered = StreamingDecision(amazon_result, code, sim_title)
+
+    async def fetch_batch(q: str) -> List[Dict]:
+        more = await fetch_ebay_query(pool, q, condition=condition, pages=pages, retries=retries, check_code=normalized_code)
+        if on_event is not None and more:
+            fresh = []
+            for r in more:
+                if r["url"] not in seen_urls:
+                    seen_urls.add(r["url"])
+                    fresh.append(dict(r))
+            passed = _filter_rows(fresh, amz_title, expected_pack_qty)
+            prov_all.add(fresh)
+            prov_filtered.add(passed)
+            decision = (prov_filtered if prov_filtered.raw_rows else prov_all).result()
+            rows = decision["raw_rows"]
+            _emit(on_event, "ebay", {"rows": rows, "amazon": amazon_result, "meta": meta_of(len(rows)),
+                                     "decision": decision, "query": q})
+        return more
+
+    # Run queries until we have a pool; thin queries retry from one budget shared by the whole lookup.
+    # A query only retries once the queries before it are done and the rows so far are still thin,
+    # so retries (and the budget they spend) follow query order, as in the old sequential loop.
+    sched = RetryScheduler(budget=max(0, attempts - 1))
+
+    async def run_query(q: str, prior) -> List[Dict]:
+        got: List[Dict] = []
         try:
-            loc = page.locator(sel).first
-            if await loc.is_visible(timeout=1000):
-                txt = (await loc.inner_text()) or ""
-                for key in ["Item Package Quantity", "Unit Count", "Count", "Pack"]:
-                    m = re.search(rf"{key}[^0-9]*([0-9]+)", txt, re.I)
-                    if m:
-                        return int(m.group(1))
-                q = detect_pack_qty(txt)
-                if q:
-                    return q
+            more = await fetch_batch(q)
+            sched.observe(q, more)
+            got.extend(more)
+            if len(got) < ENOUGH_ROWS:
+                before = len(await prior())
+                while before + len(got) < ENOUGH_ROWS and await sched.should_retry(q):
+                    more = await fetch_batch(q)
+                    sched.observe(q, more)
+                    got.extend(more)
         except Exception:
+            pass
+        return got
+
+    with metrics.span("ebay.lookup"):
+        rows = await _run_query_plan(queries, run_query, limit=query_concurrency)
+    with metrics.span("filter"):
+        result = result_of(rows)
+    result["meta"]["retries"] = sched.summary()
+    return result
+
+def _filter_rows(rows: List[Dict], amz_title: str, expected_pack_qty: Optional[int]) -> List[Dict]:
+    """Pack qty filter plus the mild (0.45) title guard; each row keeps its score as r["sim"], reused by decision.decide()."""
+    base_toks = token_ids(amz_title)
+    if base_toks:
+        for r, sim in zip(rows, SimilarityIndex.from_rows(rows).scores(base_toks)):
+            r["sim"] = sim
+    filtered: List[Dict] = []
+    for r in rows:
+        # pack filter
+        if expected_pack_qty:
+            q = detect_pack_qty(r.get("title") or "")
+            if q is not None and q != expected_pack_qty:
+                continue
+            if q is None and expected_pack_qty > 1:
+                continue
+        # title similarity (mild guard at this stage)
+        if base_toks and r["sim"] < 0.45:
             continue
-    return None
+        filtered.append(r)
+    return filtered
+
+def _emit(on_event, kind: str, payload: Dict):
+    if on_event is None:
+        return
+    try:
+        on_event(kind, payload)
+    except Exception:
+        pass  # a slow/broken listener must not break the scrape
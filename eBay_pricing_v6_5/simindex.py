@@ -0,0 +1,158 @@
+
+"""
+Title similarity search over a pool of rows.
+
+SimilarityIndex keeps token-id postings for every row title, so a query
+only touches rows that share at least one token with the reference title
+(plus a size filter: Jaccard >= t needs t*|a| <= |b| <= |a|/t).  Overlaps
+are counted from the postings, so the scores are the exact Jaccard values
+of tokenizer.jaccard() and the result is identical to a brute-force scan.
+
+For very large pools an optional MinHashLSH narrows candidates further
+before the same exact verification; LSH can miss pairs near or below its
+threshold, so it is opt-in.
+
+    idx = SimilarityIndex.from_rows(rows)
+    for i, sim in idx.query(token_ids(amz_title), 0.45): ...
+"""
+from __future__ import annotations
+import math
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tokenizer import token_ids, jaccard
+
+MINHASH_PERMS = 64
+LSH_BANDS = 32        # 32 bands x 2 rows: ~18% Jaccard detection threshold
+_MERSENNE = (1 << 31) - 1
+
+
+class MinHashLSH:
+    """Banded MinHash over token-id sets; `candidates()` returns doc numbers that share a band."""
+
+    def __init__(self, num_perm: int = MINHASH_PERMS, bands: int = LSH_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _MERSENNE, size=num_perm).astype(np.int64)
+        self.b = rng.randint(0, _MERSENNE, size=num_perm).astype(np.int64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+
+    def signature(self, ids: FrozenSet[int]) -> np.ndarray:
+        x = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        return ((np.outer(x, self.a) + self.b) % _MERSENNE).min(axis=0)
+
+    def _bands(self, sig: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, doc: int, ids: FrozenSet[int]):
+        if ids:
+            for band, key in self._bands(self.signature(ids)):
+                self.buckets[band][key].append(doc)
+
+    def candidates(self, ids: FrozenSet[int]) -> set:
+        found: set = set()
+        if ids:
+            for band, key in self._bands(self.signature(ids)):
+                found.update(self.buckets[band].get(key, ()))
+        return found
+
+
+class SimilarityIndex:
+    """Inverted index of token-id sets; `query()` returns (doc, jaccard) for docs at or above a threshold."""
+
+    def __init__(self, docs: Sequence[FrozenSet[int]], lsh: Optional[MinHashLSH] = None):
+        self.docs = list(docs)
+        self.sizes = [len(d) for d in self.docs]
+        self.postings: Dict[int, List[int]] = defaultdict(list)
+        for n, ids in enumerate(self.docs):
+            for t in ids:
+                self.postings[t].append(n)
+        self.lsh = lsh
+        if lsh is not None:
+            for n, ids in enumerate(self.docs):
+                lsh.add(n, ids)
+
+    @classmethod
+    def from_titles(cls, titles: Iterable[str], lsh: Optional[MinHashLSH] = None) -> "SimilarityIndex":
+        return cls([token_ids(t or "") for t in titles], lsh=lsh)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], lsh: Optional[MinHashLSH] = None) -> "SimilarityIndex":
+        return cls.from_titles((r.get("title") or "" for r in rows), lsh=lsh)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def query(self, ids: FrozenSet[int], threshold: float) -> List[Tuple[int, float]]:
+        """(doc, jaccard) for every doc with jaccard >= threshold (> 0), in doc order."""
+        if not ids:
+            return []
+        na = len(ids)
+        lo = math.ceil(threshold * na - 1e-9) if threshold > 0 else 1
+        hi = math.floor(na / threshold + 1e-9) if threshold > 0 else None
+        allowed = self.lsh.candidates(ids) if self.lsh is not None else None
+        overlap: Dict[int, int] = defaultdict(int)
+        for t in ids:
+            for n in self.postings.get(t, ()):
+                overlap[n] += 1
+        out: List[Tuple[int, float]] = []
+        for n in sorted(overlap):
+            nb = self.sizes[n]
+            if nb < lo or (hi is not None and nb > hi) or (allowed is not None and n not in allowed):
+                continue
+            inter = overlap[n]
+            sim = inter / float(na + nb - inter)
+            if sim >= threshold:
+                out.append((n, sim))
+        return out
+
+    def scores(self, ids: FrozenSet[int]) -> List[float]:
+        """Jaccard of every doc against `ids` (0.0 where nothing is shared)."""
+        sims = [0.0] * len(self.docs)
+        for n, s in self.query(ids, 0.0):
+            sims[n] = s
+        return sims
+
+
+def brute_force(docs: Sequence[FrozenSet[int]], ids: FrozenSet[int], threshold: float) -> List[Tuple[int, float]]:
+    out = []
+    for n, d in enumerate(docs):
+        s = jaccard(ids, d)
+        if s > 0.0 and s >= threshold:
+            out.append((n, s))
+    return out
+
+
+if __name__ == "__main__":
+    # quick benchmark: python simindex.py [rows] [reference_titles]
+    import random, sys, time
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_refs = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(0)
+    vocab = [f"w{i:04d}" for i in range(4000)]
+    titles = [" ".join(rng.sample(vocab[:300], 3) + rng.sample(vocab, rng.randint(3, 8))) for _ in range(n_rows)]
+    refs = [token_ids(rng.choice(titles)) for _ in range(n_refs)]
+    docs = [token_ids(t) for t in titles]
+
+    for threshold in (0.45, 0.75):
+        t0 = time.perf_counter()
+        want = [brute_force(docs, r, threshold) for r in refs]
+        t1 = time.perf_counter()
+        idx = SimilarityIndex(docs)
+        got = [idx.query(r, threshold) for r in refs]
+        t2 = time.perf_counter()
+        lsh_idx = SimilarityIndex(docs, lsh=MinHashLSH())
+        approx = [lsh_idx.query(r, threshold) for r in refs]
+        t3 = time.perf_counter()
+        assert got == want
+        found = sum(len(a) for a in approx)
+        total = sum(len(w) for w in want)
+        print(f"t={threshold}: {n_refs} refs x {n_rows} rows  brute {t1 - t0:.3f}s  "
+              f"index {t2 - t1:.3f}s (exact)  index+lsh {t3 - t2:.3f}s (recall {found}/{total})")
@@ -0,0 +1,85 @@
+
+"""
+Title tokenizer shared by scraping, pricing and the decision code.
+
+`tokens(title)` is memoized per title string and returns a frozenset of
+interned words, so the same eBay/Amazon title is split once per process no
+matter how many similarity passes look at it.  `token_ids(title)` gives the
+same set as small integers from a process-wide vocabulary, which makes
+Jaccard over large row pools cheaper.  STOP is the one stop-word set; change
+it with `set_stop_words()` (that also drops the caches).
+"""
+from __future__ import annotations
+import re, sys, threading
+from functools import lru_cache
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List
+
+TOKEN_CACHE_SIZE = 65536  # distinct titles kept tokenized
+MIN_TOKEN_LEN = 3
+
+STOP = set("for with the and of to by from in on a an new pack filters filter water large small medium size sizes box".split())
+
+_SPLIT_RE = re.compile(r"[^A-Za-z0-9]+")
+_vocab: Dict[str, int] = {}
+_words: List[str] = []
+_vocab_lock = threading.Lock()
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _tokens(s: str) -> FrozenSet[str]:
+    t = _SPLIT_RE.sub(" ", s).lower().split()
+    return frozenset(sys.intern(w) for w in t if len(w) >= MIN_TOKEN_LEN and w not in STOP)
+
+
+def tokens(s: str) -> FrozenSet[str]:
+    if not s:
+        return frozenset()
+    return _tokens(s)
+
+
+def _word_id(w: str) -> int:
+    i = _vocab.get(w)
+    if i is None:
+        with _vocab_lock:
+            i = _vocab.get(w)
+            if i is None:
+                i = _vocab[w] = len(_words)
+                _words.append(w)
+    return i
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _token_ids(s: str) -> FrozenSet[int]:
+    return frozenset(_word_id(w) for w in _tokens(s))
+
+
+def token_ids(s: str) -> FrozenSet[int]:
+    """tokens(s) as vocabulary ids; only compare ids with ids."""
+    if not s:
+        return frozenset()
+    return _token_ids(s)
+
+
+def words(ids: Iterable[int]) -> FrozenSet[str]:
+    return frozenset(_words[i] for i in ids)
+
+
+def jaccard(a: AbstractSet, b: AbstractSet) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / float(len(a) + len(b) - inter)
+
+
+def set_stop_words(stop: Iterable[str]):
+    """Replace the shared stop-word set (in place, so imported aliases follow) and clear the caches."""
+    STOP.clear()
+    STOP.update(w.lower() for w in stop)
+    _tokens.cache_clear()
+    _token_ids.cache_clear()
+
+
+def cache_info() -> Dict:
+    t, i = _tokens.cache_info(), _token_ids.cache_info()
+    return {"titles": t.currsize, "hits": t.hits, "misses": t.misses,
+            "id_sets": i.currsize, "vocabulary": len(_words)}
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from scraping import _amazon_cards_from_raw, _pack_qty_from_details, _first_price
+
+
+def test_amazon_cards_from_raw_skips_sponsored_and_builds_urls():
+    raw = [
+        {"sponsored": "Sponsored", "href": "/dp/B000000001", "title": "Ad", "asin": "B000000001", "price": "$1.00"},
+        {"sponsored": "", "href": "/Widget/dp/B000000002", "title": " Widget ", "asin": "b000000002", "price": "$12.34"},
+        {"sponsored": "", "href": "/gp/slredirect/x", "title": "No asin", "asin": "", "price": ""},
+    ]
+    cards = _amazon_cards_from_raw(raw)
+    assert cards == [
+        {"title": "Widget", "url": "https://www.amazon.com/dp/B000000002?psc=1", "asin": "B000000002", "card_price": 12.34},
+        {"title": "No asin", "url": "https://www.amazon.com/gp/slredirect/x", "asin": None, "card_price": None},
+    ]
+
+
+def test_pack_qty_from_details_uses_table_keys_then_title_patterns():
+    assert _pack_qty_from_details(["Brand\tAcme\nItem Package Quantity\t4"]) == 4
+    assert _pack_qty_from_details(["Brand Acme", "Contents: 6-pack of filters"]) == 6
+    assert _pack_qty_from_details(["Brand Acme"]) is None
+    assert _pack_qty_from_details([]) is None
+
+
+def test_first_price_keeps_selector_order():
+    assert _first_price(["", "See options", "$19.99", "$5.00"]) == 19.99
+    assert _first_price([]) is None
@@ -0,0 +1,35 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from scraping import _first_in_priority
+
+
+def _prober(delays, prices, log):
+    async def probe(c):
+        log.append(("start", c))
+        try:
+            await asyncio.sleep(delays[c])
+        except asyncio.CancelledError:
+            log.append(("cancel", c))
+            raise
+        return prices[c]
+    return probe
+
+
+def test_first_in_priority_keeps_list_order_over_speed():
+    log = []
+    # "c" answers first, but "b" is ahead of it in priority and also has a price
+    probe = _prober({"a": 0.02, "b": 0.04, "c": 0.0, "d": 0.3}, {"a": None, "b": 5.0, "c": 9.0, "d": 1.0}, log)
+    res = asyncio.run(_first_in_priority(["a", "b", "c", "d"], probe, parallel=3))
+    assert res == 5.0
+    assert ("cancel", "d") in log
+
+
+def test_first_in_priority_keeps_window_full_and_returns_none_when_empty():
+    log = []
+    cands = list("abcde")
+    probe = _prober({c: 0.0 for c in cands}, {c: None for c in cands}, log)
+    assert asyncio.run(_first_in_priority(cands, probe, parallel=2)) is None
+    assert [c for ev, c in log if ev == "start"] == cands
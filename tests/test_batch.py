@@ -0,0 +1,128 @@
+import sys, asyncio, json
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from batch import read_codes, run_batch
+
+
+def _fake_scrape(calls, fail=()):
+    async def scrape(code, title):
+        calls.append(code)
+        await asyncio.sleep(0)
+        if code in fail:
+            raise RuntimeError("blocked")
+        return {
+            "amazon": {"title": "Acme Widget Deluxe", "total": 20.0, "url": "https://www.amazon.com/dp/B000000001", "asin": "B000000001"},
+            "rows": [{"title": "Acme Widget Deluxe", "total": 19.5, "url": "https://www.ebay.com/itm/1"}],
+            "meta": {},
+        }
+    return scrape
+
+
+def test_read_codes_csv_with_and_without_header(tmp_path):
+    p = tmp_path / "in.csv"
+    p.write_text("UPC,Title\n012345678905,Widget\n\n,skip\n00999,\n")
+    assert list(read_codes(str(p))) == [(2, "012345678905", "Widget"), (5, "00999", None)]
+    p.write_text("012345678905\nB000000001\n")
+    assert [c for _, c, _ in read_codes(str(p))] == ["012345678905", "B000000001"]
+
+
+def test_run_batch_writes_incrementally_and_resumes(tmp_path):
+    src = tmp_path / "in.jsonl"
+    src.write_text("\n".join(json.dumps({"code": c}) for c in ["111111111111", "222222222222", "333333333333"]) + "\n")
+    out = tmp_path / "out.jsonl"
+
+    calls = []
+    st = asyncio.run(run_batch(str(src), str(out), workers=2, scrape=_fake_scrape(calls, fail={"222222222222"})))
+    assert st["processed"] == 3 and st["ok"] == 2 and st["errors"] == 1
+    recs = [json.loads(l) for l in out.read_text().splitlines()]
+    ok = [r for r in recs if r["code"] == "111111111111"][0]
+    assert ok["source"] == "eBay" and ok["suggested"] == 17.99 and ok["reference"] == "https://www.ebay.com/itm/1"
+
+    # finished lines are skipped; the failed one is retried
+    calls = []
+    st = asyncio.run(run_batch(str(src), str(out), workers=2, scrape=_fake_scrape(calls)))
+    assert st["skipped"] == 2 and st["processed"] == 1 and calls == ["222222222222"]
+    recs = [json.loads(l) for l in out.read_text().splitlines()]
+    assert sorted(r["line"] for r in recs) == [1, 2, 3]                 # stale error record replaced
+    assert [r for r in recs if r["line"] == 2][0]["error"] is None
+
+
+def test_run_batch_csv_output(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("code\n111111111111\n")
+    out = tmp_path / "out.csv"
+    asyncio.run(run_batch(str(src), str(out), workers=1, scrape=_fake_scrape([])))
+    lines = out.read_text().splitlines()
+    assert lines[0].startswith("line,code,title,suggested")
+    assert len(lines) == 2
+
+    src.write_text("code\n111111111111\n222222222222\n")
+    asyncio.run(run_batch(str(src), str(out), workers=1, scrape=_fake_scrape([], fail={"222222222222"})))
+    asyncio.run(run_batch(str(src), str(out), workers=1, scrape=_fake_scrape([])))
+    lines = out.read_text().splitlines()
+    assert len(lines) == 3 and lines[0].startswith("line,") and "Search failed" not in out.read_text()
+
+
+def test_run_batch_prices_through_decide_batch_per_chunk(tmp_path, monkeypatch):
+    import batch
+    from decision import decide
+    sizes = []
+    real = batch.decide_batch
+
+    def spy(rb, *a, **kw):
+        sizes.append(rb.n_items)
+        return real(rb, *a, **kw)
+
+    monkeypatch.setattr(batch, "decide_batch", spy)
+    src = tmp_path / "in.jsonl"
+    codes = [f"{n:012d}" for n in range(1, 6)]
+    src.write_text("\n".join(json.dumps({"code": c}) for c in codes) + "\n")
+    out = tmp_path / "out.jsonl"
+    st = asyncio.run(run_batch(str(src), str(out), workers=2, chunk=2, scrape=_fake_scrape([])))
+    assert st["ok"] == 5 and sorted(sizes) == [1, 2, 2]
+    recs = {r["code"]: r for r in (json.loads(l) for l in out.read_text().splitlines())}
+    data = asyncio.run(_fake_scrape([])(codes[0], None))
+    want = decide(data, codes[0])
+    got = recs[codes[0]]
+    assert got["suggested"] == want["pick"]["suggested"] and got["reference"] == want["reference"]
+    assert got["rows"] == len(want["comp_rows"]) and got["amazon_price"] == want["amazon_total"]
+
+
+class _Stop(BaseException):
+    pass
+
+
+def test_run_batch_writes_finished_scrapes_when_interrupted(tmp_path):
+    src = tmp_path / "in.jsonl"
+    codes = ["111111111111", "222222222222", "333333333333"]
+    src.write_text("\n".join(json.dumps({"code": c}) for c in codes) + "\n")
+    out = tmp_path / "out.jsonl"
+    ok = _fake_scrape([])
+
+    async def scrape(code, title):
+        if code == "333333333333":
+            await asyncio.sleep(0.05)
+            raise _Stop()
+        return await ok(code, title)
+
+    try:
+        asyncio.run(run_batch(str(src), str(out), workers=3, chunk=16, scrape=scrape))
+        assert False, "interrupt should propagate"
+    except _Stop:
+        pass
+    assert sorted(json.loads(l)["code"] for l in out.read_text().splitlines()) == codes[:2]
+    assert len((tmp_path / "out.jsonl.ckpt").read_text().splitlines()) == 2
+
+
+def test_resume_tolerates_half_written_last_line(tmp_path):
+    src = tmp_path / "in.jsonl"
+    src.write_text("\n".join(json.dumps({"code": c}) for c in ["111111111111", "222222222222"]) + "\n")
+    out = tmp_path / "out.jsonl"
+    out.write_text(json.dumps({"line": 1, "code": "111111111111", "suggested": 1.0}) + "\n" + '{"line": 2, "co')
+    (tmp_path / "out.jsonl.ckpt").write_text("1\t111111111111\n")
+    calls = []
+    st = asyncio.run(run_batch(str(src), str(out), workers=1, scrape=_fake_scrape(calls)))
+    assert st["skipped"] == 1 and calls == ["222222222222"]
+    assert [json.loads(l)["line"] for l in out.read_text().splitlines()] == [1, 2]
@@ -0,0 +1,43 @@
+import sys, json
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import bench
+from scraping import parse_money, _unwrap_ebay_url
+
+
+def test_generators_are_deterministic_and_realistic():
+    assert bench.make_titles(50) == bench.make_titles(50)
+    rows = bench.make_rows(200)
+    assert len(rows) == 200 and any(r["total"] is None for r in rows)
+    assert sum(1 for t in bench.make_price_texts(100) if parse_money(t) is not None) >= 80
+    hrefs = bench.make_hrefs(100)
+    assert sum(1 for h in hrefs if _unwrap_ebay_url(h)) >= 70   # /p/ and slug-style hrefs stay unresolved
+
+
+def test_run_suite_covers_every_case():
+    res = bench.run_suite(sizes=(10,), min_run_s=0.0)
+    assert set(res) == {f"{name}@10" for name in bench.CASES}
+    assert all(r["ms"] >= 0 and r["repeats"] >= 3 for r in res.values())
+
+
+def test_compare_flags_only_real_regressions():
+    base = {"a@10": {"ms": 10.0}, "b@10": {"ms": 10.0}, "c@10": {"ms": 0.001}}
+    cur = {"a@10": {"ms": 13.0}, "b@10": {"ms": 12.0}, "c@10": {"ms": 0.01}, "d@10": {"ms": 5.0}}
+    assert [r["case"] for r in bench.compare(base, cur, pct=25)] == ["a@10"]
+    assert bench.compare(base, cur, pct=50) == []
+
+
+def test_cli_save_then_compare(tmp_path, capsys):
+    path = str(tmp_path / "base.json")
+    assert bench.main(["--sizes", "10", "--only", "parse_money", "--min-time", "0", "--save", path]) == 0
+    data = json.load(open(path))
+    assert set(data["results"]) == {"parse_money@10"} and "python" in data["meta"]
+    data["results"]["parse_money@10"]["ms"] = 1e6   # far slower baseline: no regression
+    json.dump(data, open(path, "w"))
+    assert bench.main(["--sizes", "10", "--only", "parse_money", "--min-time", "0", "--compare", path]) == 0
+    data["results"]["parse_money@10"]["ms"] = 1e-9  # far faster baseline, zero threshold and floor
+    json.dump(data, open(path, "w"))
+    assert bench.main(["--sizes", "10", "--only", "parse_money", "--min-time", "0", "--compare", path,
+                       "--threshold", "0", "--floor-ms", "0"]) == 1
@@ -0,0 +1,116 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self.routes = []
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        return FakeContext(self)
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launched = []
+
+    async def launch(self, headless=True):
+        b = FakeBrowser()
+        self.launched.append(b)
+        return b
+
+
+class FakePlay:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+
+def test_pool_reuses_and_recycles_contexts():
+    async def run():
+        play = FakePlay()
+        pool = BrowserPool(play, size=2, max_uses=2)
+        seen = []
+        for _ in range(3):
+            async with pool.context("ebay") as ctx:
+                seen.append(ctx)
+        assert seen[0] is seen[1]          # reused while under max_uses
+        assert seen[0].closed              # recycled after the second use
+        assert seen[2] is not seen[0]
+        assert len(play.chromium.launched) == 1
+        st = pool.stats()
+        assert st["acquires"] == 3 and st["contexts_created"] == 2 and st["contexts_recycled"] == 1
+        await pool.close()
+    asyncio.run(run())
+
+
+def test_pool_discards_context_on_crash_and_relaunches_dead_browser():
+    async def run():
+        play = FakePlay()
+        pool = BrowserPool(play, size=1)
+        try:
+            async with pool.context("amazon") as ctx:
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        assert ctx.closed
+        assert pool.stats()["contexts_crashed"] == 1
+        play.chromium.launched[0].connected = False
+        async with pool.context("amazon") as ctx2:
+            assert ctx2.browser is play.chromium.launched[1]
+        assert pool.stats()["launches"] == 2
+    asyncio.run(run())
+
+
+def test_pool_limits_concurrency_and_records_waits():
+    async def run():
+        pool = BrowserPool(FakePlay(), size=1)
+        active = []
+        peak = []
+
+        async def job():
+            async with pool.context("ebay"):
+                active.append(1)
+                peak.append(len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+
+        await asyncio.gather(job(), job(), job())
+        assert max(peak) == 1
+        st = pool.stats()
+        assert st["waits"] >= 1 and st["wait_ms_max"] > 0
+    asyncio.run(run())
+
+
+def test_pool_installs_route_policy_on_new_contexts():
+    from routing import RoutePolicy
+
+    async def run():
+        pool = BrowserPool(FakePlay(), route_policy=RoutePolicy())
+        async with pool.context("ebay") as ctx:
+            assert [p for p, _ in ctx.routes] == ["**/*"]
+        assert pool.stats()["routing"]["blocked"] == 0
+    asyncio.run(run())
@@ -0,0 +1,94 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from cache import ResultCache, lookup_id, ebay_key
+import scraping
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_lookup_keys_normalize_codes():
+    assert lookup_id("0012345678905") == lookup_id("12345678905") == "upc:12345678905"
+    assert lookup_id("b000000001") == "asin:B000000001"
+    assert lookup_id("https://www.amazon.com/Widget/dp/B000000001?th=1") == "asin:B000000001"
+    assert ebay_key("012345678905", "NEW", 2) == "upc:12345678905|new|p2"
+
+
+def test_separate_ttls_and_lru_eviction():
+    clock = Clock()
+    c = ResultCache(max_entries=2, db_path=None, ttls={"amazon": 100, "ebay": 10}, clock=clock)
+    c.put("amazon", "k", {"price": 1.0})
+    c.put("ebay", "k", {"rows": []})
+    clock.t += 20
+    assert c.get("ebay", "k") is None
+    assert c.get("amazon", "k") == {"price": 1.0}
+    c.put("ebay", "a", 1)
+    c.put("ebay", "b", 2)  # evicts the least recently used ("amazon", "k")
+    assert c.get("amazon", "k") is None
+    assert c.stats()["evictions"] >= 1
+
+
+def test_get_returns_independent_copies():
+    c = ResultCache(db_path=None)
+    c.put("ebay", "k", {"rows": [{"total": 1}]})
+    got = c.get("ebay", "k")
+    got["rows"].append({"total": 2})
+    assert c.get("ebay", "k") == {"rows": [{"total": 1}]}
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "cache.db")
+    c1 = ResultCache(db_path=db)
+    c1.put("amazon", "asin:B000000001", {"price": 9.99})
+    c1.close()
+    c2 = ResultCache(db_path=db)
+    assert c2.get("amazon", "asin:B000000001") == {"price": 9.99}
+    assert c2.stats()["disk_hits"] == 1
+
+
+def test_scrape_multi_serves_full_hit_without_browser():
+    c = ResultCache(db_path=None)
+    code = "012345678905"
+    c.put("amazon", c.amazon_key(code), {"title": "Widget", "total": 10.0})
+    c.put("ebay", c.ebay_key(code, "new", 1), {"rows": [{"url": "u", "total": 9.0}], "meta": {"count": 1}})
+    data = asyncio.run(scraping.scrape_multi(code, None, pool=object(), cache=c))
+    assert data["rows"] == [{"url": "u", "total": 9.0}]
+    assert data["amazon"]["title"] == "Widget"
+    assert data["meta"]["cache"] == {"amazon": "hit", "ebay": "hit"}
+
+
+def test_scrape_multi_caches_no_amazon_match(monkeypatch):
+    calls = {"amazon": 0, "ebay": 0}
+
+    async def no_amazon(pool, code, **kw):
+        calls["amazon"] += 1
+        return None
+
+    async def fake_ebay(pool, q, **kw):
+        calls["ebay"] += 1
+        return [{"title": "acme widget", "url": f"https://www.ebay.com/itm/{q}", "total": 9.0}]
+
+    monkeypatch.setattr(scraping, "fetch_amazon_by_search", no_amazon)
+    monkeypatch.setattr(scraping, "fetch_ebay_query", fake_ebay)
+    c = ResultCache(db_path=None)
+    code = "012345678905"
+    first = asyncio.run(scraping.scrape_multi(code, None, pool=object(), cache=c, attempts=1))
+    assert first["amazon"] is None and first["meta"]["cache"] == {"amazon": "miss", "ebay": "miss"}
+    after_first = dict(calls)
+    for _ in range(2):
+        again = asyncio.run(scraping.scrape_multi(code, None, pool=object(), cache=c, attempts=1))
+        assert again["meta"]["cache"] == {"amazon": "hit", "ebay": "hit"} and again["rows"] == first["rows"]
+    assert calls == after_first
+
+    # eBay entry gone: only eBay is scraped again, Amazon stays a known miss
+    c.invalidate("ebay", c.ebay_key(code, "new", 1))
+    again = asyncio.run(scraping.scrape_multi(code, None, pool=object(), cache=c, attempts=1))
+    assert again["meta"]["cache"] == {"amazon": "hit", "ebay": "miss"} and calls["amazon"] == after_first["amazon"]
@@ -0,0 +1,74 @@
+import sys, random, statistics
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from clusters import IncrementalCluster, _MaxTree
+from pricing import compute_suggestion
+
+
+def _rows(rng, n):
+    rows = []
+    for i in range(n):
+        t = rng.choice([None, rng.randint(20, 160) / 4.0, round(rng.uniform(5, 60), 2), round(rng.gauss(30, 3), 2)])
+        rows.append({"url": f"u{i}", "total": t})
+    return rows
+
+
+def test_incremental_matches_compute_suggestion_after_every_insert():
+    rng = random.Random(11)
+    for trial in range(30):
+        rows = _rows(rng, rng.randint(1, 40))
+        kw = {"window": rng.choice([3.0, 8.0, 10.0])}
+        if trial % 3 == 0:
+            kw.update(min_price=10.0, max_price=50.0)
+        for method in ("mode", "mad", "iqr"):
+            c = IncrementalCluster(method=method, **kw)
+            for k, r in enumerate(rows, 1):
+                c.add(r)
+                want = compute_suggestion(rows[:k], method=method, **kw)
+                got = c.result()
+                assert got[0] == want[0] and got[1] is want[1]
+                assert [id(x) for x in got[2]] == [id(x) for x in want[2]]
+                assert c.best() == (want[0], want[1])
+
+
+def test_incremental_statistics():
+    rng = random.Random(2)
+    c = IncrementalCluster()
+    xs = []
+    for _ in range(101):
+        t = round(rng.uniform(1, 100), 2)
+        c.add({"total": t})
+        xs.append(t)
+        m = statistics.median(xs)
+        assert c.median() == m
+        assert c.mad() == statistics.median([abs(x - m) for x in xs])
+    assert IncrementalCluster().best() == (None, None)
+    assert IncrementalCluster().result() == (None, None, [])
+
+
+def test_max_tree_matches_a_plain_list():
+    rng = random.Random(3)
+    t, ref = _MaxTree(rng=random.Random(0)), []
+    for _ in range(500):
+        pos = rng.randint(0, len(ref))
+        lo = rng.randint(0, pos)
+        v = rng.randint(0, 20)
+        for i in range(lo, pos):
+            ref[i] += 1
+        ref.insert(pos, v)
+        t.insert(pos, v, bump_from=lo)
+        assert t.argmax() == (max(ref), ref.index(max(ref))) and len(t) == len(ref)
+
+
+def test_mode_window_on_many_rows_and_sorted_input():
+    rng = random.Random(9)
+    rows = [{"total": round(rng.gauss(30, 4), 2)} for _ in range(1500)]
+    for order in (rows, sorted(rows, key=lambda r: r["total"]), sorted(rows, key=lambda r: -r["total"])):
+        c = IncrementalCluster(method="mode", window=8.0)
+        for k, r in enumerate(order, 1):
+            c.add(r)
+            if k % 250 == 0:
+                want = compute_suggestion(order[:k], method="mode", window=8.0)
+                assert c.best() == (want[0], want[1])
@@ -0,0 +1,62 @@
+import sys, random
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from decision import decide, attach_similarity, StreamingDecision
+
+
+def _data(sim_title):
+    rows = [
+        {"title": "acme cordless drill kit", "total": 40.0, "url": "a", "sim": 0.9},   # stale score
+        {"title": "acme drill", "total": 38.0, "url": "b", "sim": 0.1},
+    ]
+    return {"amazon": {"title": "acme drill", "total": 45.0, "url": "amz"}, "rows": rows,
+            "meta": {"sim_title": sim_title}}
+
+
+def test_decide_reuses_scrape_time_similarity():
+    res = decide(_data("acme drill"), "")
+    assert res["ebay_row"]["url"] == "a"          # scores carried on the rows decide the pool
+
+
+def test_decide_rescores_when_scored_against_other_title():
+    res = decide(_data("some user title"), "")
+    assert [r["sim"] for r in res["comp_rows"]] == [0.5, 1.0]
+    assert res["ebay_row"]["url"] == "b"
+
+
+def test_attach_similarity_and_sim_column():
+    base = {"source": "eBay", "price": 5.0, "shipping": 0.0, "total": 5.0, "url": "u"}
+    rows = attach_similarity([dict(base, title="acme drill"), dict(base, title="other")], "acme drill")
+    assert [r["sim"] for r in rows] == [1.0, 0.0]
+    from app import app
+    from flask import render_template
+    with app.test_request_context():
+        html = render_template("index.html", results=rows + [dict(base, title="no score")], results_raw=rows, form={}, counts={})
+    assert "<th>Sim</th>" in html and "1.00" in html and "0.00" in html
+
+
+def test_streaming_decision_matches_decide_after_every_batch():
+    rng = random.Random(5)
+    words = "acme widget deluxe drill kit blue steel pro max".split()
+    title = lambda: " ".join(rng.sample(words, rng.randint(2, 5)))
+    for _ in range(60):
+        code = rng.choice(["", "012345678905"])
+        amazon = rng.choice([None, {"title": title(), "url": "amz", "total": rng.choice([None, round(rng.uniform(10, 60), 2)])}])
+        rows = []
+        for i in range(rng.randint(0, 60)):
+            r = {"title": title(), "url": f"u{i}", "total": rng.choice([None, round(rng.uniform(5, 70), 2), rng.randint(10, 40) * 1.0])}
+            if rng.random() < 0.2:
+                r["upc"] = rng.choice(["012345678905", "777"])
+            rows.append(r)
+        sd = StreamingDecision(amazon, code)
+        k = 0
+        while k < len(rows):
+            step = rng.randint(1, 8)
+            sd.add(rows[k:k + step])
+            k += step
+            got, want = sd.result(), decide({"amazon": amazon, "rows": rows[:k]}, code)
+            assert got["pick"] == want["pick"] and got["reference"] == want["reference"]
+            assert got["ebay_row"] is want["ebay_row"] and got["exact"] == want["exact"]
+            assert [id(r) for r in got["comp_rows"]] == [id(r) for r in want["comp_rows"]]
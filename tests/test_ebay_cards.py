@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from scraping import _ebay_rows_from_cards
+
+
+def _card(**kw):
+    c = {"href": "https://www.ebay.com/itm/123456789012?hash=x", "title": "Widget 012345678905",
+         "badge": None, "price": "$10.00", "shipping": "+$2.50 shipping", "condition": "Brand New"}
+    c.update(kw)
+    return c
+
+
+def test_cards_become_rows_with_existing_rules():
+    cards = [
+        _card(),
+        _card(href="https://www.ebay.com/itm/123456789013", shipping="Free shipping", title="Other"),
+        _card(href="https://www.ebay.com/itm/123456789014", badge="Sponsored"),
+        _card(href="https://www.ebay.com/itm/123456789015", price="$5.00 to $9.00"),
+        _card(href="https://www.ebay.com/itm/123456789016", condition="Pre-Owned"),
+        _card(href="https://www.ebay.com/p/555"),
+        _card(href=None),
+        _card(href="https://www.ebay.com/itm/123456789017", title="Shop on eBay"),
+    ]
+    rows = _ebay_rows_from_cards(cards, "q", condition="new", norm_code="12345678905")
+    assert [r["url"] for r in rows] == ["https://www.ebay.com/itm/123456789012", "https://www.ebay.com/itm/123456789013"]
+    assert rows[0]["total"] == 12.5 and rows[0]["has_code"] and rows[0]["code"] == "12345678905"
+    assert rows[1]["shipping"] == 0.0 and rows[1]["total"] == 10.0 and not rows[1]["has_code"]
+    assert set(rows[0]) >= {"source", "query", "title", "price", "shipping", "total", "condition", "url", "has_code"}
+
+
+def test_condition_all_keeps_used_cards():
+    rows = _ebay_rows_from_cards([_card(condition="Pre-Owned")], "q", condition="all")
+    assert len(rows) == 1
@@ -0,0 +1,131 @@
+import sys, asyncio
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import httpfetch, scraping
+from scraping import _ebay_cards_from_html, _ebay_rows_from_cards, fetch_ebay_query
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+SRP = (FIXTURES / "ebay_srp.html").read_text()
+LISTING = (FIXTURES / "ebay_listing.html").read_text()
+BOT_WALL = "<html><head><title>Security Measure</title></head><body><h1>Pardon Our Interruption...</h1></body></html>"
+
+
+class BrowserUsed(Exception):
+    pass
+
+
+class NoBrowserPool:
+    def context(self, *a, **kw):
+        raise BrowserUsed()
+
+
+def _serve(pages, log=None):
+    def handler(request):
+        url = str(request.url)
+        if log is not None:
+            log.append(url)
+        for prefix, (status, body) in pages.items():
+            if url.startswith(prefix):
+                return httpx.Response(status, text=body, headers={"content-type": "text/html"})
+        return httpx.Response(404, text="not found")
+    httpfetch.use_transport(httpx.MockTransport(handler))
+
+
+def _run(coro):
+    try:
+        return asyncio.run(coro)
+    finally:
+        httpfetch.use_transport(None)
+
+
+def test_cards_from_saved_srp_match_the_browser_fields():
+    cards = _ebay_cards_from_html(SRP)
+    assert len(cards) == 12 and cards[0::2] == cards[1::2]   # li.s-item and its s-item__wrapper, as in the browser
+    cards = cards[0::2]
+    assert cards[0]["title"] == "Shop on eBay"
+    assert cards[1] == {
+        "href": "https://www.ebay.com/itm/134567890123?hash=item1f5b2c:g:AbC&amdata=enc%3AAQ",
+        "title": "New ListingBrita Standard Replacement Filter 3 Pack 012345678905",
+        "badge": None, "price": "$14.99", "shipping": "+$3.50 shipping", "condition": "Brand New",
+    }
+    assert cards[3]["badge"] == "Sponsored"
+    rows = _ebay_rows_from_cards(cards, "q", condition="new", norm_code="12345678905")
+    assert [r["url"] for r in rows] == ["https://www.ebay.com/itm/134567890123", "https://www.ebay.com/itm/134567890124"]
+    assert abs(rows[0]["total"] - 18.49) < 1e-9 and rows[0]["has_code"]
+    assert rows[1]["total"] == 16.25 and rows[1]["shipping"] == 0.0 and not rows[1]["has_code"]
+
+
+def test_fast_path_skips_the_browser_and_verifies_listings_over_http():
+    log = []
+    _serve({"https://www.ebay.com/sch/": (200, SRP), "https://www.ebay.com/itm/134567890124": (200, LISTING)}, log)
+    rows = _run(fetch_ebay_query(NoBrowserPool(), "012345678905", check_code="012345678905"))
+    assert [r["url"] for r in rows] == ["https://www.ebay.com/itm/134567890123", "https://www.ebay.com/itm/134567890124"]
+    assert all(r["has_code"] for r in rows) and rows[1]["code"] == "12345678905"
+    assert log[0] == "https://www.ebay.com/sch/i.html?_nkw=012345678905&rt=nc&LH_BIN=1&LH_PrefLoc=1&LH_ItemCondition=1000"
+    assert set(rows[0]) == {"source", "query", "title", "price", "shipping", "total", "condition", "url", "has_code", "code"}
+
+
+def test_bot_wall_or_empty_srp_falls_back_to_the_browser():
+    httpfetch.reset_stats()
+    for status, body in ((200, BOT_WALL), (503, "busy"), (200, "<html><body><ul class='srp-results'></ul></body></html>")):
+        _serve({"https://www.ebay.com/sch/": (status, body)})
+        try:
+            _run(fetch_ebay_query(NoBrowserPool(), "brita filter"))
+            assert False, "browser path not taken"
+        except BrowserUsed:
+            pass
+    st = httpfetch.stats()
+    assert st["fallbacks"] == {"ebay.search": 3} and st["bot_walls"] == 2
+
+
+def test_listing_bot_wall_uses_a_browser_page(monkeypatch):
+    seen = []
+
+    class Ctx:
+        async def __aenter__(self):
+            return "ctx"
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Pool:
+        def context(self, *a, **kw):
+            return Ctx()
+
+    async def fake_listing_has_code(context, url, norm_code, timeout_ms=8000):
+        seen.append((context, url))
+        return True
+
+    monkeypatch.setattr(scraping, "_listing_has_code", fake_listing_has_code)
+    _serve({"https://www.ebay.com/sch/": (200, SRP), "https://www.ebay.com/itm/": (200, BOT_WALL)})
+    rows = _run(fetch_ebay_query(Pool(), "012345678905", check_code="012345678905"))
+    assert seen == [("ctx", "https://www.ebay.com/itm/134567890124")]
+    assert all(r["has_code"] for r in rows)
+
+
+def test_is_bot_wall():
+    assert httpfetch.is_bot_wall(200, "https://www.ebay.com/splashui/challenge?ap=1", "")
+    assert httpfetch.is_bot_wall(429, "https://www.ebay.com/sch/i.html", "")
+    assert httpfetch.is_bot_wall(200, "https://www.amazon.com/dp/X", "<p>Enter the characters you see below</p>")
+    assert not httpfetch.is_bot_wall(200, "https://www.ebay.com/sch/i.html", SRP)
+
+
+def test_a_new_event_loop_closes_the_previous_client():
+    _serve({})
+    seen = []
+
+    async def fetch():
+        seen.append(httpfetch.get_client())
+        await httpfetch.get_page("https://www.ebay.com/")
+
+    try:
+        asyncio.run(fetch())
+        asyncio.run(fetch())
+    finally:
+        httpfetch.use_transport(None)
+    assert seen[0] is not seen[1]
+    assert [c.is_closed for c in seen] == [True, False]
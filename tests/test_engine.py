@@ -0,0 +1,53 @@
+import sys, random
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from decision import decide
+from engine import RowBatch, decide_batch
+
+WORDS = "acme widget deluxe filter pack blue steel cordless drill kit pro max mini".split()
+
+
+def _title(rng):
+    return " ".join(rng.sample(WORDS, rng.randint(2, 6)))
+
+
+def _item(rng):
+    code = rng.choice(["", "012345678905", "B000000001"])
+    amazon = None
+    if rng.random() < 0.85:
+        amazon = {"title": _title(rng) if rng.random() < 0.9 else "", "url": "https://www.amazon.com/dp/B000000001",
+                  "total": rng.choice([None, round(rng.uniform(5, 60), 2), float(rng.randint(5, 60))])}
+    rows = []
+    for i in range(rng.randint(0, 25)):
+        r = {"title": _title(rng), "url": f"https://www.ebay.com/itm/{i}",
+             "total": rng.choice([None, rng.randint(10, 120) / 2.0, round(rng.uniform(5, 70), 2)])}
+        if rng.random() < 0.3:
+            r["has_code"] = True
+            r["code"] = rng.choice(["12345678905", "999"])
+        if rng.random() < 0.1:
+            r["upc"] = rng.choice(["012345678905", "777"])
+        rows.append(r)
+    return {"amazon": amazon, "rows": rows}, code
+
+
+def test_decide_batch_matches_per_item_decide():
+    rng = random.Random(7)
+    items = [_item(rng) for _ in range(400)]
+    picks = decide_batch(RowBatch.from_items(items))
+    for (data, code), got in zip(items, picks):
+        want = decide(data, code)
+        assert got["suggested"] == want["pick"]["suggested"]
+        assert got["source"] == want["pick"]["source"]
+        assert got["ebay_total"] == want["ebay_total"]
+        assert got["ebay_row"] is want["ebay_row"]
+        assert got["exact"] == want["exact"]
+        assert got["reference"] == want["reference"]
+        assert got["n_comp_rows"] == len(want["comp_rows"])
+
+
+def test_decide_batch_empty_inputs():
+    assert decide_batch(RowBatch.from_items([])) == []
+    picks = decide_batch(RowBatch.from_items([({"amazon": None, "rows": []}, "")]))
+    assert picks[0]["suggested"] is None and picks[0]["ebay_row"] is None
@@ -0,0 +1,105 @@
+import sys, json, threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import app as app_mod
+from jobs import JobQueue, QueueFull
+
+
+def test_job_queue_runs_bounded_and_rejects_when_full():
+    gate = threading.Event()
+    seen = []
+
+    def runner(params, on_event):
+        on_event("amazon", {"amazon": None})
+        gate.wait(5)
+        if params["code"] == "bad":
+            raise ValueError("boom")
+        seen.append(params["code"])
+        return {"suggestion": params["code"]}
+
+    q = JobQueue(runner, workers=1, max_queue=2)
+    first = q.submit({"code": "a"})
+    q.wait(first, 0.05)                       # let the worker pick it up
+    second, third = q.submit({"code": "b"}), q.submit({"code": "bad"})
+    try:
+        q.submit({"code": "c"})
+        assert False, "queue should be full"
+    except QueueFull:
+        pass
+    st = q.stats()
+    assert st["running"] == 1 and st["queue_depth"] == 2 and st["rejected"] == 1
+    gate.set()
+    assert q.wait(second, 5).to_dict()["result"] == {"suggestion": "b"}
+    assert q.wait(third, 5).to_dict()["error"] == "Search failed: boom"
+    events = list(q.follow(first))
+    assert events[0] == ("amazon", {"amazon": None}) and events[-1][0] == "done"
+    st = q.stats()
+    assert st["completed"] == 2 and st["failed"] == 1 and st["wait_ms"]["count"] >= 3
+    q.stop()
+
+
+def test_follow_keeps_events_that_arrive_after_idle_ticks():
+    gate = threading.Event()
+
+    def runner(params, on_event):
+        gate.wait(5)
+        on_event("amazon", {"amazon": None})
+        on_event("ebay", {"rows": []})
+        return {"suggestion": "1.00"}
+
+    q = JobQueue(runner, workers=1, max_queue=1)
+    job = q.submit({"code": "a"})
+    got = []
+    for kind, payload in q.follow(job, timeout=0.05):
+        got.append(kind)
+        if got.count(None) == 3:
+            gate.set()
+    assert [k for k in got if k is not None] == ["amazon", "ebay", "done"]
+    q.stop()
+
+
+def test_job_api_submit_poll_and_429(monkeypatch):
+    gate = threading.Event()
+
+    def runner(params, on_event):
+        gate.wait(5)
+        return {"suggestion": "9.99", "code": params["code"]}
+
+    q = JobQueue(runner, workers=1, max_queue=1)
+    monkeypatch.setattr(app_mod, "_jobs", q)
+    client = app_mod.app.test_client()
+    r = client.post("/api/jobs", json={"code": 12345})
+    assert r.status_code == 202
+    job_id = r.get_json()["id"]
+    assert r.get_json()["poll"] == f"/api/jobs/{job_id}"
+    q.wait(q.get(job_id), 0.05)
+    assert client.post("/api/jobs", json={"code": "2"}).status_code == 202
+    r = client.post("/api/jobs", json={"code": "3"})
+    assert r.status_code == 429 and r.headers["Retry-After"]
+    assert client.post("/api/jobs", json={}).status_code == 400
+    assert client.get("/api/jobs/nope").status_code == 404
+    assert client.get(f"/api/jobs/{job_id}").get_json()["status"] == "running"
+    gate.set()
+    body = client.get(f"/api/jobs/{job_id}?wait=5").get_json()
+    assert body["status"] == "done" and body["result"] == {"suggestion": "9.99", "code": "12345"}
+    stream = client.get(f"/api/jobs/{job_id}/events").get_data(as_text=True)
+    assert stream.startswith("event: done") and json.loads(stream.split("data: ", 1)[1])["id"] == job_id
+    assert client.get("/api/jobs").get_json()["submitted"] == 2
+    q.stop()
+
+
+def test_job_api_rejects_bad_input_with_400(monkeypatch):
+    q = JobQueue(lambda params, on_event: {}, workers=1, max_queue=1)
+    monkeypatch.setattr(app_mod, "_jobs", q)
+    client = app_mod.app.test_client()
+    for body in ({"code": "1", "pages": "two"}, {"code": "1", "min_price": "cheap"}, {"code": "1", "iqr_mult": [1]}, ["1"]):
+        r = client.post("/api/jobs", json=body)
+        assert r.status_code == 400 and r.get_json()["error"], body
+    assert client.post("/api/jobs", data={"code": "1", "retries": "x"}).status_code == 400
+    job_id = client.post("/api/jobs", json={"code": "1"}).get_json()["id"]
+    r = client.get(f"/api/jobs/{job_id}?wait=abc")
+    assert r.status_code == 400 and "wait" in r.get_json()["error"]
+    assert q.stats()["submitted"] == 1
+    q.stop()
@@ -0,0 +1,40 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import scraping
+
+
+def _rows(n):
+    return [{"url": f"https://www.ebay.com/itm/{100000000000 + i}", "has_code": False} for i in range(n)]
+
+
+def test_verify_stops_once_enough_rows_carry_the_code(monkeypatch):
+    opened = []
+
+    async def fake_listing_has_code(context, url, norm_code, timeout_ms=8000):
+        opened.append(url)
+        await asyncio.sleep(0.001)
+        return True
+
+    monkeypatch.setattr(scraping, "_listing_has_code", fake_listing_has_code)
+    rows = _rows(60)
+    rows[0]["has_code"] = True  # title hit counts toward the target
+    n = asyncio.run(scraping._verify_listing_codes(None, rows, "12345678", concurrency=4, enough=3))
+    assert n == 2
+    assert sum(r["has_code"] for r in rows) == 3
+    assert len(opened) < 60
+    assert all(r.get("code") == "12345678" for r in rows if r["has_code"] and r is not rows[0])
+
+
+def test_verify_respects_time_budget(monkeypatch):
+    async def slow_listing_has_code(context, url, norm_code, timeout_ms=8000):
+        await asyncio.sleep(5)
+        return True
+
+    monkeypatch.setattr(scraping, "_listing_has_code", slow_listing_has_code)
+    rows = _rows(10)
+    n = asyncio.run(scraping._verify_listing_codes(None, rows, "12345678", budget_ms=50))
+    assert n == 0
+    assert not any(r["has_code"] for r in rows)
@@ -0,0 +1,69 @@
+import sys, re, itertools
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import scraping
+from packqty import detect_pack_qty, WORD_NUM
+
+
+def legacy_detect_pack_qty(text):
+    """The per-pattern implementation detect_pack_qty replaced (kept verbatim as the oracle)."""
+    if not text:
+        return None
+    t = text.lower()
+    for pat in [
+        r"pack of\s*(\d+)",
+        r"(\d+)\s*-\s*pack\b",
+        r"(\d+)\s*pack\b",
+        r"(\d+)\s*pk\b",
+        r"(\d+)\s*count\b",
+        r"(\d+)\s*ct\b",
+        r"(\d+)\s*pcs\b",
+        r"(\d+)\s*pieces\b",
+        r"(\d+)\s*capsules\b",
+    ]:
+        m = re.search(pat, t)
+        if m:
+            try:
+                return int(m.group(1))
+            except Exception:
+                pass
+    for w, n in WORD_NUM.items():
+        if re.search(rf"\b{re.escape(w)}[-\s]?pack\b", t):
+            return n
+    m = re.search(r"\b(\d+)\s*(?:pk|ct)\b", t)
+    if m:
+        try:
+            return int(m.group(1))
+        except Exception:
+            pass
+    m = re.search(r"\bx\s*(\d+)\b", t)
+    if m:
+        try:
+            return int(m.group(1))
+        except Exception:
+            pass
+    return None
+
+
+# one phrase per pattern, in the legacy priority order
+PHRASES = ["Pack of 6", "3-Pack", "4 pack", "2pk", "24 Count", "12 ct", "10 pcs", "8 pieces", "30 capsules",
+           *[f"{w.title()} Pack" for w in WORD_NUM], "Twin-pack", "double-pack", "x 5", "X2", "someone pack", "packs of 7"]
+
+
+def test_matches_legacy_on_pattern_corpus():
+    fillers = ["Brita Standard Water Filter", "", "BPA-free\nreplacement"]
+    corpus = [None, "", "no quantity here", "Filter 35557"]
+    for a, b in itertools.permutations(PHRASES, 2):
+        for f in fillers:
+            corpus.append(f"{f} {a} {b}")
+            corpus.append(f"{a}, {f}, {b}")
+    for text in corpus:
+        assert detect_pack_qty(text) == legacy_detect_pack_qty(text), text
+
+
+def test_scraping_uses_shared_detector():
+    assert scraping.detect_pack_qty is detect_pack_qty
+    assert detect_pack_qty("Two Pack - 3 pack") == 3     # digit patterns outrank number words
+    assert detect_pack_qty("TWO PACK") == 2
@@ -0,0 +1,51 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import metrics
+from scraping import _extract_until, FIRST_PRICE_TEXT_JS
+
+
+class FakeHandle:
+    def __init__(self, value):
+        self.value = value
+
+    async def json_value(self):
+        return self.value
+
+
+class FakePage:
+    def __init__(self, text=None):
+        self.text = text
+        self.calls = []
+
+    async def wait_for_function(self, expression, arg=None, polling=None, timeout=None):
+        self.calls.append((expression, arg, polling, timeout))
+        if self.text is None:
+            raise TimeoutError("Timeout exceeded")
+        return FakeHandle(self.text)
+
+
+def test_extract_until_single_in_page_wait_and_metric():
+    metrics.reset()
+    page = FakePage("$1,234.50")
+    assert asyncio.run(_extract_until(page, ["#a", "#b"], total_ms=500, metric="t.wait")) == 1234.5
+    assert page.calls == [(FIRST_PRICE_TEXT_JS, ["#a", "#b"], "mutation", 500)]
+    assert metrics.snapshot()["t.wait.hit"]["count"] == 1
+
+
+def test_extract_until_timeout_records_miss():
+    metrics.reset()
+    assert asyncio.run(_extract_until(FakePage(None), ["#a"], total_ms=10, metric="t.wait")) is None
+    snap = metrics.snapshot()
+    assert "t.wait.hit" not in snap and snap["t.wait.miss"]["count"] == 1
+
+
+def test_histogram_buckets():
+    h = metrics.Histogram(buckets=(10, 100))
+    for v in (5, 50, 500):
+        h.observe(v)
+    d = h.to_dict()
+    assert d["buckets"] == {"le_10": 1, "le_100": 1, "inf": 1}
+    assert d["min_ms"] == 5 and d["max_ms"] == 500 and d["count"] == 3
@@ -0,0 +1,87 @@
+import sys, asyncio, functools
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import scraping
+from scraping import _run_query_plan
+from retry import RetryScheduler
+
+
+def test_query_plan_merges_in_query_order_and_cancels_the_rest():
+    started, cancelled = [], []
+    delays = {"a": 0.05, "b": 0.01, "c": 0.0, "d": 0.2}
+    sizes = {"a": 1, "b": 2, "c": 5, "d": 5}
+
+    async def run_one(q, prior):
+        started.append(q)
+        try:
+            await asyncio.sleep(delays[q])
+        except asyncio.CancelledError:
+            cancelled.append(q)
+            raise
+        return [{"url": f"{q}{i}"} for i in range(sizes[q])]
+
+    rows = asyncio.run(_run_query_plan(["a", "b", "c", "d"], run_one, limit=4, enough=3))
+    # "c" finished first but a+b already make 3 rows, so only their rows are kept
+    assert [r["url"] for r in rows] == ["a0", "b0", "b1"]
+    assert "d" in cancelled
+
+
+def test_query_plan_respects_concurrency_limit():
+    active, peak = [], []
+
+    async def run_one(q, prior):
+        active.append(q)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.remove(q)
+        return []
+
+    asyncio.run(_run_query_plan(list("abcdef"), run_one, limit=2))
+    assert max(peak) == 2
+
+
+def test_prior_returns_earlier_rows_in_query_order_without_holding_a_slot():
+    seen = {}
+
+    async def run_one(q, prior):
+        await asyncio.sleep({"a": 0.03, "b": 0.0, "c": 0.01}[q])
+        seen[q] = [r["url"] for r in await prior()]
+        return [{"url": q}]
+
+    rows = asyncio.run(_run_query_plan(["a", "b", "c"], run_one, limit=1, enough=10))
+    assert [r["url"] for r in rows] == ["a", "b", "c"]
+    assert seen == {"a": [], "b": ["a"], "c": ["a", "b"]}
+
+
+def _retry_calls(monkeypatch, delays):
+    """scrape_multi's eBay calls when each fetch of a query returns one row and takes delays[query] seconds."""
+    calls = []
+
+    async def no_amazon(pool, code, **kw):
+        return None
+
+    async def fake_ebay(pool, q, **kw):
+        calls.append(q)
+        await asyncio.sleep(delays[q])
+        return [{"title": "x", "url": f"https://www.ebay.com/itm/{q}-{calls.count(q)}", "total": 10.0}]
+
+    async def no_sleep(s):
+        pass
+
+    monkeypatch.setattr(scraping, "fetch_amazon_by_search", no_amazon)
+    monkeypatch.setattr(scraping, "fetch_ebay_query", fake_ebay)
+    monkeypatch.setattr(scraping, "RetryScheduler", functools.partial(RetryScheduler, sleep=no_sleep))
+    res = asyncio.run(scraping.scrape_multi("012345678905", None, pool=object(), attempts=6, query_concurrency=4))
+    return calls, [r["url"] for r in res["rows"]]
+
+
+def test_retries_gate_on_cumulative_rows_in_query_order(monkeypatch):
+    # raw code first: its retries stop once it alone holds 3 rows; the stripped code's
+    # first fetch is already merged-out, it never retries (old one-by-one loop behaviour)
+    slow_first, rows1 = _retry_calls(monkeypatch, {"012345678905": 0.02, "12345678905": 0.0})
+    fast_first, rows2 = _retry_calls(monkeypatch, {"012345678905": 0.0, "12345678905": 0.02})
+    for calls in (slow_first, fast_first):
+        assert calls.count("012345678905") == 3 and calls.count("12345678905") == 1
+    assert rows1 == rows2 == [f"https://www.ebay.com/itm/012345678905-{i}" for i in (1, 2, 3)]
@@ -0,0 +1,101 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from replay import fixture_key, FixtureStore, ReplayPolicy, RecordPolicy, synth_fixtures
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url, method="GET"):
+        self.resource_type = resource_type
+        self.url = url
+        self.method = method
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.headers = {"content-type": "text/html"}
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url, live=None):
+        self.request = FakeRequest(resource_type, url)
+        self.live = live
+        self.outcome = None
+        self.fulfilled = None
+
+    async def abort(self, error_code=None):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+    async def fetch(self):
+        return FakeResponse(200, self.live)
+
+    async def fulfill(self, status=None, headers=None, body=None, response=None):
+        self.outcome = "fulfill"
+        self.fulfilled = (status if response is None else response.status, body)
+
+
+def test_fixture_key_ignores_volatile_params_and_order():
+    a = fixture_key("get", "https://www.amazon.com/s?k=brita&ref=nb_sb_noss&qid=123")
+    b = fixture_key("GET", "https://WWW.amazon.com/s?qid=999&k=brita")
+    assert a == b == "GET www.amazon.com/s?k=brita"
+    assert fixture_key("GET", "https://www.ebay.com/itm/1?hash=abc") == "GET www.ebay.com/itm/1"
+    assert fixture_key("GET", "https://www.ebay.com/sch/i.html?_nkw=x&_pgn=2") != fixture_key("GET", "https://www.ebay.com/sch/i.html?_nkw=x")
+
+
+def test_store_round_trip(tmp_path):
+    st = FixtureStore(str(tmp_path))
+    st.put("GET", "https://www.amazon.com/dp/B000000001?psc=1", 200, "text/html", b"<html>x</html>")
+    st.add_lookup("012345678905")
+    st.save()
+    again = FixtureStore(str(tmp_path))
+    assert len(again) == 1 and again.lookups == [{"code": "012345678905", "title": None}]
+    status, headers, body = again.get("GET", "https://www.amazon.com/dp/B000000001?psc=1&ref_=x")
+    assert status == 200 and body == b"<html>x</html>" and headers["content-type"] == "text/html"
+    assert again.get("GET", "https://www.amazon.com/dp/B000000002?psc=1") is None
+
+
+def test_replay_serves_fixtures_and_counts_misses(tmp_path):
+    st = FixtureStore(str(tmp_path))
+    codes = synth_fixtures(st, n_items=2, rows_per_query=5)
+    assert len(codes) == 2 and len(FixtureStore(str(tmp_path)).lookups) == 2
+    pol = ReplayPolicy(st)
+    routes = [FakeRoute("document", f"https://www.amazon.com/s?k={codes[0]}&ref=nb_sb_noss"),
+              FakeRoute("document", f"https://www.ebay.com/sch/i.html?_nkw={codes[1]}&rt=nc&LH_BIN=1&LH_PrefLoc=1&LH_ItemCondition=1000"),
+              FakeRoute("image", "https://i.ebayimg.com/a.webp"),
+              FakeRoute("document", "https://www.ebay.com/itm/404")]
+
+    async def run():
+        for r in routes:
+            await pol.handle(r)
+    asyncio.run(run())
+    assert [r.outcome for r in routes] == ["fulfill", "fulfill", "abort", "abort"]
+    assert b"s-search-result" in routes[0].fulfilled[1] and b"s-item__link" in routes[1].fulfilled[1]
+    s = pol.stats()
+    assert (s["served"], s["missing"], s["blocked"]) == (2, 1, 1)
+    assert s["missing_urls"] == ["https://www.ebay.com/itm/404"]
+
+
+def test_record_saves_responses(tmp_path):
+    st = FixtureStore(str(tmp_path))
+    pol = RecordPolicy(st)
+    routes = [FakeRoute("document", "https://www.ebay.com/itm/1", live=b"<html>UPC 012345678905</html>"),
+              FakeRoute("font", "https://x/f.woff2"),
+              FakeRoute("ping", "https://www.ebay.com/beacon")]
+
+    async def run():
+        for r in routes:
+            await pol.handle(r)
+    asyncio.run(run())
+    assert [r.outcome for r in routes] == ["fulfill", "abort", "continue"]
+    assert pol.stats()["recorded"] == 1
+    assert st.get("GET", "https://www.ebay.com/itm/1")[2] == b"<html>UPC 012345678905</html>"
@@ -0,0 +1,84 @@
+import sys, asyncio, functools, random
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import scraping
+from retry import RetryScheduler
+
+
+def _rows(*ids):
+    return [{"url": f"https://www.ebay.com/itm/{i}", "total": 10.0} for i in ids]
+
+
+def _sched(budget, waits=None):
+    async def sleep(s):
+        if waits is not None:
+            waits.append(s)
+    return RetryScheduler(budget=budget, rng=random.Random(0), sleep=sleep)
+
+
+def test_stops_when_a_retry_brings_only_duplicate_urls():
+    s = _sched(10)
+    assert s.observe("q", _rows(1, 2)) == 2
+    assert asyncio.run(s.should_retry("q"))
+    assert s.observe("q", _rows(2, 1)) == 0
+    assert not asyncio.run(s.should_retry("q"))
+    assert s.summary()["stopped_duplicates"] == 1 and s.used == 1
+
+
+def test_novelty_is_per_query_so_completion_order_does_not_matter():
+    for order in (("raw", "stripped"), ("stripped", "raw")):
+        s = _sched(10)
+        assert [s.observe(q, _rows(1, 2)) for q in order] == [2, 2]
+        assert asyncio.run(s.should_retry("raw")) and asyncio.run(s.should_retry("stripped"))
+        assert s.summary()["unique_urls"] == 2
+
+
+def test_empty_fetches_retry_until_the_shared_budget_is_spent():
+    s = _sched(3)
+    for q in ("a", "b"):
+        s.observe(q, [])
+    assert asyncio.run(s.should_retry("a")) and asyncio.run(s.should_retry("b")) and asyncio.run(s.should_retry("a"))
+    assert not asyncio.run(s.should_retry("b"))
+    sm = s.summary()
+    assert (sm["used"], sm["budget"], sm["stopped_budget"]) == (3, 3, 1)
+    assert [e.get("stop") for e in sm["events"] if "stop" in e] == ["budget"]
+
+
+def test_backoff_is_exponential_capped_and_jittered():
+    s = RetryScheduler(budget=0, base_delay=0.5, max_delay=4.0, jitter=0.5, rng=random.Random(1))
+    for n, cap in ((1, 0.5), (2, 1.0), (3, 2.0), (4, 4.0), (7, 4.0)):
+        for _ in range(20):
+            assert cap * 0.5 <= s.delay(n) <= cap
+    waits = []
+    s = _sched(2, waits)
+    s.observe("q", [])
+    asyncio.run(s.should_retry("q"))
+    s.observe("q", [])
+    asyncio.run(s.should_retry("q"))
+    assert len(waits) == 2 and 0.25 <= waits[0] <= 0.5 and 0.5 <= waits[1] <= 1.0
+
+
+def test_scrape_multi_shares_one_budget_and_skips_duplicate_retries(monkeypatch):
+    calls = []
+
+    async def fake_amazon(pool, code, **kw):
+        return None
+
+    async def fake_ebay(pool, q, **kw):
+        calls.append(q)
+        return _rows(7) if q == "012345678905" else []
+
+    async def no_sleep(s):
+        pass
+
+    monkeypatch.setattr(scraping, "fetch_amazon_by_search", fake_amazon)
+    monkeypatch.setattr(scraping, "fetch_ebay_query", fake_ebay)
+    monkeypatch.setattr(scraping, "RetryScheduler", functools.partial(RetryScheduler, sleep=no_sleep))
+    res = asyncio.run(scraping.scrape_multi("012345678905", None, pool=object(), attempts=4, query_concurrency=1))
+    # the code query repeats one URL, so it retries once; the stripped-code query gets the rest of the budget
+    assert calls.count("012345678905") == 2
+    assert calls.count("12345678905") == 3
+    rs = res["meta"]["retries"]
+    assert (rs["budget"], rs["used"], rs["stopped_duplicates"], rs["stopped_budget"], rs["unique_urls"]) == (3, 3, 1, 1, 1)
@@ -0,0 +1,71 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from routing import RoutePolicy
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = FakeRequest(resource_type, url)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+def test_should_block_types_and_third_party_hosts():
+    pol = RoutePolicy()
+    assert pol.should_block("image", "https://m.media-amazon.com/images/x.jpg")
+    assert pol.should_block("script", "https://securepubads.g.doubleclick.net/tag/js/gpt.js")
+    assert not pol.should_block("document", "https://www.amazon.com/dp/B000000001")
+    assert not pol.should_block("stylesheet", "https://ir.ebaystatic.com/x.css")
+    assert not pol.should_block("script", "https://notdoubleclick.net/x.js")
+    assert not RoutePolicy(enabled=False).should_block("image", "https://x/y.png")
+
+
+def test_handle_counts_blocked_and_allowed():
+    pol = RoutePolicy()
+    routes = [FakeRoute("image", "https://i.ebayimg.com/a.webp"),
+              FakeRoute("document", "https://www.ebay.com/sch/i.html"),
+              FakeRoute("font", "https://x/f.woff2")]
+
+    async def run():
+        for r in routes:
+            await pol.handle(r)
+    asyncio.run(run())
+    assert [r.outcome for r in routes] == ["abort", "continue", "abort"]
+    st = pol.stats()
+    assert st["blocked"] == 2 and st["allowed"] == 1
+    assert st["blocked_by_type"] == {"image": 1, "font": 1}
+
+
+def test_policy_from_env_reads_switch_and_lists():
+    from routing import policy_from_env, BLOCKED_RESOURCE_TYPES
+    pol = policy_from_env({})
+    assert pol.enabled and pol.block_types == BLOCKED_RESOURCE_TYPES and pol.should_block("script", "https://ad.doubleclick.net/x.js")
+    assert not policy_from_env({"PRICER_BLOCK": "0"}).should_block("image", "https://x/y.png")
+    pol = policy_from_env({"PRICER_BLOCK_RESOURCES": "image, media", "PRICER_BLOCK_HOSTS": ""})
+    assert pol.block_types == {"image", "media"} and not pol.should_block("font", "https://x/f.woff")
+    assert not pol.should_block("script", "https://ad.doubleclick.net/x.js")
+
+
+def test_nav_wait_from_env():
+    import scraping
+    assert scraping._nav_wait_from_env({}) == "domcontentloaded"
+    assert scraping._nav_wait_from_env({"PRICER_NAV_WAIT": "Load"}) == "load"
+    try:
+        scraping._nav_wait_from_env({"PRICER_NAV_WAIT": "idle"})
+        assert False, "unknown wait state accepted"
+    except ValueError:
+        pass
@@ -0,0 +1,36 @@
+import sys, asyncio, threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from runtime import ScrapeRuntime
+from tests.test_browser_pool import FakePlay
+
+
+@asynccontextmanager
+async def fake_playwright():
+    yield FakePlay()
+
+
+def test_runtime_shares_one_loop_and_pool_across_threads():
+    rt = ScrapeRuntime(play_factory=fake_playwright).start()
+    try:
+        async def job(pool):
+            async with pool.context("ebay"):
+                await asyncio.sleep(0.01)
+            return id(asyncio.get_running_loop()), pool
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(rt.run(job))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len({loop_id for loop_id, _ in results}) == 1
+        assert len({id(pool) for _, pool in results}) == 1
+        assert rt.stats()["jobs_submitted"] == 4
+        assert rt.stats()["pool"]["launches"] == 1
+    finally:
+        rt.stop()
+    assert not rt.running
@@ -0,0 +1,39 @@
+import sys, random
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+from simindex import SimilarityIndex, MinHashLSH, brute_force
+from tokenizer import token_ids, jaccard
+
+VOCAB = "acme widget deluxe blue steel cordless drill kit pro max mini case black red charger battery".split()
+
+
+def _titles(rng, n):
+    return [" ".join(rng.sample(VOCAB, rng.randint(0, 7))) for _ in range(n)]
+
+
+def test_index_matches_brute_force_exactly():
+    rng = random.Random(3)
+    titles = _titles(rng, 300)
+    docs = [token_ids(t) for t in titles]
+    idx = SimilarityIndex.from_titles(titles)
+    for ref in _titles(rng, 50):
+        ids = token_ids(ref)
+        for t in (0.0, 0.45, 0.75, 1.0):
+            assert idx.query(ids, t) == brute_force(docs, ids, t)
+        assert idx.scores(ids) == [jaccard(ids, d) for d in docs]
+
+
+def test_lsh_results_are_verified_subset():
+    rng = random.Random(5)
+    titles = _titles(rng, 200)
+    docs = [token_ids(t) for t in titles]
+    idx = SimilarityIndex(docs, lsh=MinHashLSH())
+    for ref in titles[:30]:
+        ids = token_ids(ref)
+        got = idx.query(ids, 0.45)
+        exact = dict(brute_force(docs, ids, 0.45))
+        assert all(exact[n] == s for n, s in got)
+        if ids:
+            assert any(docs[n] == ids for n, _ in got)   # identical titles always collide
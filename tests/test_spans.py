@@ -0,0 +1,54 @@
+import sys, asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import metrics
+import scraping
+
+
+def test_spans_feed_histograms_and_trace_across_tasks():
+    metrics.reset()
+
+    @metrics.timed("stage.child")
+    async def child():
+        await asyncio.sleep(0.001)
+
+    async def run():
+        with metrics.trace() as tr:
+            with metrics.span("stage.parent"):
+                await asyncio.gather(child(), child())
+        return tr
+
+    tr = asyncio.run(run()).to_dict()
+    assert tr["stage.child"]["count"] == 2 and tr["stage.parent"]["count"] == 1
+    snap = metrics.snapshot()
+    assert snap["stage.child"]["count"] == 2 and snap["stage.parent"]["count"] == 1
+    with metrics.span("stage.outside"):
+        pass
+    assert "stage.outside" not in tr
+
+
+def test_scrape_multi_returns_stage_timings(monkeypatch):
+    async def fake_amazon(pool, code, **kw):
+        return {"title": "acme drill", "total": 20.0, "url": "u", "asin": "B000000001"}
+
+    async def fake_ebay(pool, q, **kw):
+        with metrics.span("ebay.page"):
+            pass
+        return [{"title": "acme drill", "total": 19.0, "url": f"https://www.ebay.com/itm/{q}"}]
+
+    monkeypatch.setattr(scraping, "fetch_amazon_by_search", fake_amazon)
+    monkeypatch.setattr(scraping, "fetch_ebay_query", fake_ebay)
+    res = asyncio.run(scraping.scrape_multi("012345678905", None, pool=object(), attempts=1, timings=True))
+    t = res["meta"]["timings"]
+    assert {"scrape.total", "amazon.lookup", "ebay.lookup", "ebay.page", "filter"} <= set(t)
+    assert "timings" not in asyncio.run(scraping.scrape_multi("012345678905", None, pool=object(), attempts=1))["meta"]
+
+
+def test_metrics_endpoint():
+    from app import app
+    metrics.observe("app.decide", 1.0)
+    body = app.test_client().get("/metrics").get_json()
+    assert body["stages"]["app.decide"]["count"] >= 1
+    assert "cache" in body and "runtime" in body
@@ -0,0 +1,116 @@
+import sys, asyncio, json, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import app as app_mod
+import scraping
+
+AMAZON = {"title": "acme cordless drill", "total": 50.0, "url": "https://www.amazon.com/dp/B000000001", "asin": "B000000001"}
+
+
+def _row(i, total):
+    return {"source": "eBay", "title": "acme cordless drill", "price": total, "shipping": 0.0, "total": total,
+            "url": f"https://www.ebay.com/itm/{i}"}
+
+
+def test_scrape_multi_emits_amazon_then_ebay_batches(monkeypatch):
+    async def fake_amazon(pool, code, **kw):
+        return dict(AMAZON)
+
+    async def fake_ebay(pool, q, **kw):
+        return [_row(q, 45.0)]
+
+    monkeypatch.setattr(scraping, "fetch_amazon_by_search", fake_amazon)
+    monkeypatch.setattr(scraping, "fetch_ebay_query", fake_ebay)
+    events = []
+    res = asyncio.run(scraping.scrape_multi("012345678905", None, pool=object(), attempts=1,
+                                            on_event=lambda k, p: events.append((k, p))))
+    kinds = [k for k, _ in events]
+    assert kinds[0] == "amazon" and events[0][1]["amazon"]["asin"] == "B000000001"
+    assert kinds[1:] == ["ebay"] * (len(kinds) - 1) and len(kinds) > 2
+    assert len(events[-1][1]["rows"]) == len(res["rows"])
+    assert events[-1][1]["rows"][0] is not res["rows"][0]       # listeners get copies
+    last = events[-1][1]                                        # ...and the incremental provisional decision
+    assert last["decision"]["pick"] == app_mod.decide({k: last[k] for k in ("rows", "amazon", "meta")}, "012345678905")["pick"]
+
+
+class FakeRuntime:
+    def __init__(self):
+        self.ex = ThreadPoolExecutor(1)
+
+    def submit(self, job):
+        return self.ex.submit(lambda: asyncio.run(job(None)))
+
+
+def test_stream_endpoint_sends_progressive_events(monkeypatch):
+    async def fake_scrape(code, title, on_event=None, **kw):
+        on_event("amazon", {"amazon": AMAZON})
+        on_event("ebay", {"rows": [_row(1, 48.0)], "amazon": AMAZON, "meta": {}, "query": code})
+        return {"rows": [_row(1, 48.0), _row(2, 45.0)], "amazon": AMAZON, "meta": {}}
+
+    monkeypatch.setattr(app_mod, "scrape_multi", fake_scrape)
+    monkeypatch.setattr(app_mod, "get_runtime", lambda: FakeRuntime())
+    body = app_mod.app.test_client().get("/stream?code=012345678905").get_data(as_text=True)
+    events = [(b.split("\n")[0][7:], json.loads(b.split("\n")[1][6:])) for b in body.strip().split("\n\n")]
+    assert [e for e, _ in events] == ["amazon", "ebay", "done"]
+    assert events[1][1]["suggestion"] == "46.99" and events[2][1]["suggestion"] == "43.99"
+    assert events[2][1]["counts"] == {"raw": 2, "used": 2}
+
+    body = app_mod.app.test_client().get("/stream?code=").get_data(as_text=True)
+    assert body.startswith("event: error")
+    r = app_mod.app.test_client().get("/stream?code=012345678905&pages=abc")
+    assert r.status_code == 200 and r.get_data(as_text=True).startswith("event: error")
+    assert "pages must be a number" in r.get_data(as_text=True)
+
+
+def test_job_runner_decides_off_the_runtime_thread(monkeypatch):
+    async def fake_scrape(code, title, on_event=None, **kw):
+        on_event("amazon", {"amazon": AMAZON})
+        on_event("ebay", {"rows": [_row(1, 48.0)], "amazon": AMAZON, "meta": {}, "query": code})
+        return {"rows": [_row(1, 48.0), _row(2, 45.0)], "amazon": AMAZON, "meta": {}}
+
+    decided_on = []
+    real_decide = app_mod.decide
+
+    def spy_decide(data, code):
+        decided_on.append(threading.current_thread())
+        return real_decide(data, code)
+
+    monkeypatch.setattr(app_mod, "scrape_multi", fake_scrape)
+    monkeypatch.setattr(app_mod, "decide", spy_decide)
+    monkeypatch.setattr(app_mod, "get_runtime", lambda: FakeRuntime())
+    events = []
+    p = app_mod.read_params({"code": "012345678905"})
+    out = app_mod.run_pricing_job(p, lambda kind, payload: events.append((kind, payload)))
+    assert [k for k, _ in events] == ["amazon", "ebay"] and events[1][1]["suggestion"] == "46.99"
+    assert out["suggestion"] == "43.99"
+    assert decided_on == [threading.current_thread()] * 2
+
+
+def test_read_params_parses_refresh_flag():
+    for v, want in [("1", True), ("on", True), ("true", True), (True, True),
+                    ("0", False), ("false", False), ("", False), (None, False), (False, False)]:
+        assert app_mod.read_params({"code": "1", "refresh": v})["refresh"] is want, v
+
+
+def test_stream_and_job_runner_share_the_timeout(monkeypatch):
+    async def slow_scrape(code, title, on_event=None, **kw):
+        on_event("amazon", {"amazon": AMAZON})
+        await asyncio.sleep(0.6)
+        return {"rows": [], "amazon": AMAZON, "meta": {}}
+
+    monkeypatch.setattr(app_mod, "scrape_multi", slow_scrape)
+    monkeypatch.setattr(app_mod, "get_runtime", lambda: FakeRuntime())
+    monkeypatch.setattr(app_mod, "JOB_TIMEOUT_S", 0.2)
+    body = app_mod.app.test_client().get("/stream?code=012345678905").get_data(as_text=True)
+    assert [b.split("\n")[0] for b in body.strip().split("\n\n")] == ["event: amazon", "event: error"]
+    assert "Search failed: timed out" in body
+    events = []
+    try:
+        app_mod.run_pricing_job(app_mod.read_params({"code": "1"}), lambda kind, payload: events.append(kind))
+        assert False, "job should time out"
+    except TimeoutError:
+        pass
+    assert events == ["amazon"]
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "eBay_pricing_v6_5"))
+
+import tokenizer, pricing, scraping
+from tokenizer import tokens, token_ids, words, jaccard
+
+
+def test_single_tokenizer_shared_and_memoized():
+    assert pricing.tokens is scraping.tokens is tokens
+    assert pricing.STOP is scraping.STOP is tokenizer.STOP
+    t = tokens("Acme Widget Filter Box, 2 pack - Blue")
+    assert t == {"acme", "widget", "blue"}
+    assert tokens("Acme Widget Filter Box, 2 pack - Blue") is t   # cached
+    assert words(token_ids("Acme Widget Filter Box, 2 pack - Blue")) == t
+    assert tokens("") == frozenset() and token_ids(None) == frozenset()
+
+
+def test_jaccard_same_on_words_and_ids():
+    a, b = "acme cordless drill kit", "acme drill kit case"
+    assert jaccard(tokens(a), tokens(b)) == jaccard(token_ids(a), token_ids(b)) == 3 / 5
+    assert jaccard(tokens(a), frozenset()) == 0.0
+
+
+def test_set_stop_words_clears_caches():
+    saved = set(tokenizer.STOP)
+    try:
+        tokens("acme drill kit")
+        tokenizer.set_stop_words(saved | {"kit"})
+        assert tokens("acme drill kit") == {"acme", "drill"}
+    finally:
+        tokenizer.set_stop_words(saved)
+    assert tokens("acme drill kit") == {"acme", "drill", "kit"}